@@ -0,0 +1,122 @@
+"""
+Parity check of the kernel backends (see `dice_roller.backend`).
+
+Usage (from the repository root):
+
+    python benchmarks/backend_parity.py                 # check and time all available backends
+    python benchmarks/backend_parity.py --items 100000
+
+Every case is generated with every available backend under the same seed, results must be identical.
+Kernels are also checked against plain Python loops on random segments, so the numpy backend is verified
+even without numba installed. Fails (exit code 1) on any mismatch.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dice_roller import BaseDice, d, rng  # noqa: E402
+from dice_roller.backend import Kernels, available_backends, kernels, use_backend  # noqa: E402
+from dice_roller.random import use_rng  # noqa: E402
+
+SEED = 20240501
+
+CASES: list[tuple[str, BaseDice]] = [
+    ("explode-dice-compare", d(6).explode(explode_depth=20) >= rng(5, 7)),
+    ("explode-nested", (d(6).explode(explode_depth=10) == 6).explode(explode_depth=5) >= 8),
+    ("explode-lt", d(6).explode(explode_depth=10) < 2),
+    ("reroll-dice-compare", d(20).reroll(reroll_limit=5) <= d(4)),
+    ("reroll-nested", (d(6).r == 1).reroll(reroll_limit=3) < 3),
+    ("many-dice-total", d(4) @ d(6)),
+    ("many-exploding", d(6) @ (d(6).explode(explode_depth=10) == 6)),
+    ("keep-highest-dice-of", (d(6) @ d(20)).kh(2)),
+    ("keep-lowest-dice-keep", (d(6) @ d(20)).kl(d(3))),
+    ("drop-highest-dice-of", (d(6) @ d(20)).dh()),
+    ("drop-lowest-dice-drop", (d(8) @ d(10)).dl(d(4))),
+]
+
+
+def _reference_segment_keep(values: np.ndarray, counts: np.ndarray, keep: np.ndarray, highest: bool) -> np.ndarray:
+    result, start = [], 0
+    for count, k in zip(counts, keep):
+        segment = sorted(values[start : start + count])
+        result.append(sum(segment[count - k :] if highest else segment[:k]))
+        start += count
+    return np.array(result)
+
+
+def check_kernels(backend: Kernels, rounds: int = 20) -> list[str]:
+    failures = []
+    random = np.random.default_rng(SEED)
+    for _ in range(rounds):
+        counts = random.integers(0, 12, size=200)
+        values = random.integers(-50, 50, size=int(counts.sum()))
+        keep = np.minimum(random.integers(0, 12, size=200), counts)
+        expected_sums = np.array([segment.sum() for segment in np.split(values, np.cumsum(counts)[:-1])])
+        if not np.array_equal(backend.segment_sum(values, counts), expected_sums):
+            failures.append("segment_sum")
+        for highest in (True, False):
+            expected = _reference_segment_keep(values, counts, keep, highest)
+            if not np.array_equal(backend.segment_keep(values, counts, keep, highest), expected):
+                failures.append(f"segment_keep(highest={highest})")
+
+        index = random.permutation(len(values))[: len(values) // 2]
+        updates = random.integers(-5, 5, size=len(index))
+        expected, actual = values.copy(), values.copy()
+        expected[index] += updates
+        backend.scatter_add(actual, index, updates)
+        if not np.array_equal(actual, expected):
+            failures.append("scatter_add")
+        expected[index] = updates
+        backend.scatter(actual, index, updates)
+        if not np.array_equal(actual, expected):
+            failures.append("scatter")
+    return sorted(set(failures))
+
+
+def generate(dice: BaseDice, items: int) -> tuple[np.ndarray, float]:
+    with use_rng(SEED):
+        dice.generate(min(items, 100))  # Warm up (numba compiles kernels on the first call)
+    with use_rng(SEED):
+        start = time.perf_counter()
+        result = np.asarray(dice.generate(items))
+        return result, time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    print(f"Backends: {', '.join(backends)}")
+    failed = False
+    for name in backends:
+        with use_backend(name):
+            failures = check_kernels(kernels())
+        print(f"kernels|{name}: {'FAILED ' + ', '.join(failures) if failures else 'ok'}")
+        failed |= bool(failures)
+
+    print(f"{'case':<30}" + "".join(f"{name:>14}" for name in backends) + "  parity")
+    for case, dice in CASES:
+        results = {}
+        for name in backends:
+            with use_backend(name):
+                results[name] = generate(dice, args.items)
+        reference = results[backends[0]][0]
+        same = all(np.array_equal(reference, result) for result, _ in results.values())
+        failed |= not same
+        timings = "".join(f"{results[name][1] * 1000:>11.2f} ms" for name in backends)
+        print(f"{case:<30}{timings}  {'ok' if same else 'MISMATCH'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
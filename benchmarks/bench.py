@@ -0,0 +1,221 @@
+"""
+Benchmarks of `generate()` and `histogram()` for every dice node type.
+
+Usage (from the repository root):
+
+    python benchmarks/bench.py                              # run and print results
+    python benchmarks/bench.py --save baseline.json         # store results as the baseline
+    python benchmarks/bench.py --compare baseline.json      # fail (exit code 1) on regressions
+    python benchmarks/bench.py --filter explode --sizes 1 1000
+
+Every case records best wall time (`time.perf_counter`), peak traced memory (`tracemalloc`, numpy buffers included)
+and generated samples per second. Cases which loop over individual items are capped by `max_items`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dice_roller import BaseDice, FacesDice, WeightedDice, d, lim, rng  # noqa: E402
+
+SIZES = (1, 1_000, 100_000, 10_000_000)
+# Benchmark is repeated until it runs at least `MIN_TIME` seconds in total (but at least `MIN_REPEAT` times)
+MIN_TIME = 0.2
+MIN_REPEAT = 3
+MAX_REPEAT = 1000
+# Baseline comparison: slower or bigger than `threshold` times the baseline is a regression
+THRESHOLD = 1.25
+
+
+@dataclass(slots=True, frozen=True)
+class Case:
+    name: str
+    dice: BaseDice
+    max_items: int = SIZES[-1]
+    histogram: bool = True
+
+
+CASES = [
+    # Basic dices
+    Case("dice", d(20)),
+    Case("range", rng(1, 100, 3)),
+    Case("faces", FacesDice((0, 0, 1, 1, 2, 3))),
+    Case("weighted", WeightedDice((1, 2, 3, 4, 5, 6), (1, 1, 1, 1, 1, 5))),
+    Case("many", 10 @ d(6)),
+    Case("many-dice-total", d(4) @ d(6)),
+    # Keep / drop
+    Case("keep-highest", (4 @ d(6)).kh(3)),
+    Case("keep-lowest", (4 @ d(6)).kl(3)),
+    Case("drop-highest", (4 @ d(6)).dh()),
+    Case("drop-lowest", (4 @ d(6)).dl()),
+    Case("keep-highest-dice-keep", (5 @ d(20)).kh(d(3))),
+    Case("keep-highest-dice-total", (d(4) @ d(20)).kh()),
+    Case("drop-lowest-dice-total", (d(4) @ d(20)).dl(), histogram=False),
+    # Explode
+    Case("explode-eq", d(6).x == 6),
+    Case("explode-gt", d(6).explode(explode_depth=10) > 4),
+    Case("explode-ge", d(6).explode(explode_depth=10) >= 5),
+    Case("explode-lt", d(6).explode(explode_depth=10) < 2),
+    Case("explode-le", d(6).explode(explode_depth=10) <= 2),
+    Case("explode-dice-compare", d(6).explode(explode_depth=5) >= rng(5, 7)),
+    # Reroll
+    Case("reroll-eq", d(20).r == 1),
+    Case("reroll-gt", d(20).r > 18),
+    Case("reroll-ge", d(20).r >= 19),
+    Case("reroll-lt", d(20).r < 3),
+    Case("reroll-le", d(20).reroll(reroll_limit=10) <= 2),
+    Case("reroll-dice-compare", d(6).r == d(2)),
+    # Limits
+    Case("limit-gt", (d(20) - 4).lim > 0),
+    Case("limit-ge", (d(20) - 4).lim >= 1),
+    Case("limit-lt", d(20).lim < 18),
+    Case("limit-le", d(20).lim <= 17),
+    Case("limit-dice-compare", (lim() >= d(4))(d(20))),
+    # Pools
+    Case("pool-successes", (10 @ (d(10).explode(explode_depth=10) == 10)).pool().successes(8, botch=1)),
+    Case("pool-largest-set", (5 @ d(6)).pool().largest_set()),
+    # Math
+    Case("add", d(20) + d(4) + 5),
+    Case("sub", d(20) - d(4) - 1),
+    Case("mul", d(20) * d(4) * 2),
+    Case("div", d(20) / d(4)),
+    # Composition
+    Case("attack", (2 @ d(20)).kh() + d(4) + 5),
+    Case("complex", ((d(20) - d(4)).lim >= 1) * 2 + (d(6).x == 6) - (d(6).r == d(2)), histogram=False),
+]
+
+
+@dataclass(slots=True)
+class Result:
+    time: float
+    peak_bytes: int
+    samples_per_sec: float | None = None
+
+    def to_json(self) -> dict:
+        return {"time": self.time, "peak_bytes": self.peak_bytes, "samples_per_sec": self.samples_per_sec}
+
+
+def _timeit(fn: Callable[[], object]) -> float:
+    best, total, repeat = float("inf"), 0.0, 0
+    while repeat < MIN_REPEAT or (total < MIN_TIME and repeat < MAX_REPEAT):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best, total, repeat = min(best, elapsed), total + elapsed, repeat + 1
+        if elapsed > MIN_TIME * 5:
+            break  # Slow cases are measured a single time after warmup
+    return best
+
+
+def _peak_memory(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(fn: Callable[[], object], items: int | None = None) -> Result:
+    fn()  # Warmup: memoized bounds, lazy imports, ...
+    elapsed = _timeit(fn)
+    return Result(elapsed, _peak_memory(fn), items / elapsed if items else None)
+
+
+def run(cases: list[Case], sizes: tuple[int, ...], histograms: bool) -> dict[str, Result]:
+    results = {}
+    for case in cases:
+        for items in sizes:
+            if items > case.max_items:
+                continue
+            key = f"{case.name}|generate|{items}"
+            results[key] = measure(lambda: case.dice.generate(items), items)
+            _report(key, results[key])
+        if histograms and case.histogram:
+            key = f"{case.name}|histogram"
+            results[key] = measure(case.dice.histogram)
+            _report(key, results[key])
+    return results
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def _report(key: str, result: Result, baseline: dict | None = None) -> None:
+    rate = f"{result.samples_per_sec:12.3e}/s" if result.samples_per_sec else " " * 14
+    line = f"{key:44} {_format_time(result.time)} {result.peak_bytes / 2**20:10.2f} MiB {rate}"
+    if baseline is not None:
+        line += f"  x{result.time / baseline['time']:.2f} time, x{result.peak_bytes / max(baseline['peak_bytes'], 1):.2f} mem"
+    print(line, flush=True)
+
+
+def _meta() -> dict:
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine()}
+
+
+def compare(results: dict[str, Result], baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for key, result in results.items():
+        if (base := baseline["results"].get(key)) is None:
+            continue
+        if result.time > base["time"] * threshold:
+            regressions.append(f"{key}: time {_format_time(base['time'])} -> {_format_time(result.time)}")
+        # Tiny allocations are noisy, only report memory regressions above 1 MiB
+        if result.peak_bytes > max(base["peak_bytes"] * threshold, 2**20):
+            regressions.append(f"{key}: peak memory {base['peak_bytes']} -> {result.peak_bytes} bytes")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="run only cases with this substring in the name")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="amounts of generated items")
+    parser.add_argument("--no-histogram", action="store_true", help="skip histogram() benchmarks")
+    parser.add_argument("--save", type=Path, help="save results as JSON baseline")
+    parser.add_argument("--compare", type=Path, help="compare results with JSON baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown ratio")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if args.filter in case.name]
+    print(f"{'case':44} {'time':>11} {'peak memory':>14} {'samples':>14}")
+    results = run(cases, tuple(args.sizes), not args.no_histogram)
+
+    if args.save:
+        data = {"meta": _meta(), "results": {key: result.to_json() for key, result in results.items()}}
+        args.save.write_text(json.dumps(data, indent=2))
+        print(f"Saved {len(results)} results to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline.get("meta") != _meta():
+            print(f"Warning: baseline recorded on {baseline.get('meta')}, running on {_meta()}")
+        print(f"\nCompared with {args.compare}:")
+        for key, result in results.items():
+            if key in baseline["results"]:
+                _report(key, result, baseline["results"][key])
+        if regressions := compare(results, baseline, args.threshold):
+            print(f"\n{len(regressions)} regression(s) over x{args.threshold}:")
+            print("\n".join(regressions))
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Full vs cache-blocked evaluation (see `dice_roller.bulk.generate_blocked`).
+
+Usage (from the repository root):
+
+    python benchmarks/blocked.py                        # 10M samples, default 64K tiles
+    python benchmarks/blocked.py --items 100000000 --block-size 32768
+
+Every case reports best wall time and peak traced memory (`tracemalloc`, numpy buffers included) of `generate()`
+and `generate_blocked()`. Blocked peak memory should be close to the result size (8 bytes per sample) for any
+amount of items.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dice_roller import BaseDice, d, generate_blocked  # noqa: E402
+from dice_roller.bulk import DEFAULT_BLOCK_SIZE  # noqa: E402
+
+CASES: list[tuple[str, BaseDice]] = [
+    ("sum", d(20) + d(8) + d(6) + d(4) + 5),
+    ("arithmetic", (d(6) + d(6)) * d(4) - d(10)),
+    ("keep-highest", (4 @ d(6)).kh(3) + d(4)),
+    ("explode", (d(6).x == 6) + (d(6).x == 6)),
+    ("limit", (d(20) + d(20) - d(10)).lim >= 1),
+]
+
+
+def measure(run: Callable[[], object], repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10_000_000)
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'case':<16}{'full':>12}{'blocked':>12}{'full peak':>14}{'blocked peak':>14}")
+    for name, dice in CASES:
+        full_time, full_peak = measure(lambda: dice.generate(args.items), args.repeat)
+        blocked_time, blocked_peak = measure(
+            lambda: generate_blocked(dice, args.items, args.block_size), args.repeat
+        )
+        print(
+            f"{name:<16}{full_time * 1000:>9.1f} ms{blocked_time * 1000:>9.1f} ms"
+            f"{full_peak / 2**20:>11.1f} MB{blocked_peak / 2**20:>11.1f} MB"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Import time check of the package, using `python -X importtime`.
+
+Usage (from the repository root):
+
+    python benchmarks/import_time.py                  # report and check the overhead over numpy
+    python benchmarks/import_time.py --budget 0.15    # also check absolute budget, seconds
+
+Fails (exit code 1), if importing `dice_roller` and generating rolls imports any of the `HEAVY_MODULES`
+(they must only be imported on first `histogram()`), or if the package adds more than `OVERHEAD` (ratio)
+on top of bare numpy import, or if the package import takes longer than optional absolute budget.
+Time is measured in a fresh interpreter, best of several runs. Overhead is relative to numpy measured on
+the same machine, so the check does not depend on how fast the machine is.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Imported only for histograms and imported lazily
+HEAVY_MODULES = ("dyce",)
+# Allowed package import time on top of bare numpy import, as fraction of numpy import time
+OVERHEAD = 1.0
+RUNS = 5
+
+_SCRIPT = "import dice_roller; dice_roller.d(20).generate(10); (dice_roller.d(20) + 4).generate(10)"
+_BASELINE = "import numpy, numpy.random"
+
+
+def _importtime(script: str) -> list[tuple[int, str]]:
+    # (cumulative microseconds, indented module name) for each import
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    lines = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        lines.append((int(cumulative), module[1:]))
+    return lines
+
+
+def import_times() -> dict[str, float]:
+    # Module -> cumulative import time in seconds
+    return {module.strip(): cumulative / 1e6 for cumulative, module in _importtime(_SCRIPT)}
+
+
+def baseline_time() -> float:
+    # Bare numpy import in seconds, summing top level numpy imports (numpy.random is lazy since numpy 2)
+    lines = _importtime(_BASELINE)
+    return sum(cumulative for cumulative, module in lines if module.split(".")[0] == "numpy") / 1e6
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--overhead", type=float, default=OVERHEAD, help="allowed overhead over numpy import, ratio")
+    parser.add_argument("--budget", type=float, default=None, help="absolute package import budget, seconds")
+    parser.add_argument("--top", type=int, default=10, help="show slowest imported modules")
+    args = parser.parse_args(argv)
+
+    runs = [import_times() for _ in range(RUNS)]
+    times = min(runs, key=lambda t: t["dice_roller"])
+    total = times["dice_roller"]
+    baseline = min(baseline_time() for _ in range(RUNS))
+
+    print(f"dice_roller imported in {total * 1e3:.1f}ms, numpy in {baseline * 1e3:.1f}ms (best of {RUNS})")
+    print("Slowest modules:")
+    for module, elapsed in sorted(times.items(), key=lambda i: i[1], reverse=True)[: args.top]:
+        print(f"  {elapsed * 1e3:8.1f}ms  {module}")
+
+    failed = False
+    if heavy := sorted({m for m in times if m.split(".")[0] in HEAVY_MODULES}):
+        print(f"Imported without calling histogram(): {', '.join(heavy)}")
+        failed = True
+    if total - baseline > args.overhead * baseline:
+        print(
+            f"Import overhead {(total - baseline) * 1e3:.1f}ms is over {args.overhead:.0%} "
+            f"of numpy import ({baseline * 1e3:.1f}ms)"
+        )
+        failed = True
+    if args.budget is not None and total > args.budget:
+        print(f"Import time {total * 1e3:.1f}ms is over budget {args.budget * 1e3:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
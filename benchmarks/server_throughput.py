@@ -0,0 +1,87 @@
+"""
+Throughput of the local roll server (see `dice_roller.server`) compared to in-process `generate()`.
+
+Usage (from the repository root):
+
+    python benchmarks/server_throughput.py
+    python benchmarks/server_throughput.py --batch 100000 --seconds 5 "2d20kh + 5" "4d6kh3"
+
+The server is started as a separate process on a temporary socket. For every expression the client claims
+`batch` rolls, reads them (sum) and releases them in a loop, in-process loop generates and sums the same amount.
+Reported are rolls per second of both and the server time to the first roll.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dice_roller import parse  # noqa: E402
+from dice_roller.client import RollClient  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+EXPRESSIONS = ["d20", "2d20kh + 5", "4d6kh3", "d6x6 + d8"]
+
+
+def throughput(step: Callable[[], object], batch: int, seconds: float) -> float:
+    step()  # Warm up
+    rolls, start = 0, time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        step()
+        rolls += batch
+    return rolls / elapsed
+
+
+def wait_for(path: Path, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while not path.exists():
+        if process.poll() is not None or time.perf_counter() > deadline:
+            raise RuntimeError("Roll server did not start")
+        time.sleep(0.01)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("expressions", nargs="*", default=EXPRESSIONS)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--capacity", type=int, default=1 << 22)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket = Path(directory) / "dice_roller.sock"
+        command = [sys.executable, "-m", "dice_roller.server", "--socket", str(socket)]
+        command += ["--capacity", str(args.capacity)]
+        server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL)
+        try:
+            wait_for(socket, server)
+            print(f"{'expression':<20}{'in-process':>16}{'server':>16}{'first roll':>14}")
+            with RollClient(socket) as client:
+                for expression in args.expressions:
+                    start = time.perf_counter()
+                    client.take(expression, 1)
+                    first = time.perf_counter() - start
+
+                    def claim() -> None:
+                        with client.claim(expression, args.batch) as lease:
+                            lease.rolls.sum()
+
+                    dice = parse(expression)
+                    local = throughput(lambda: dice.generate(args.batch).sum(), args.batch, args.seconds)
+                    served = throughput(claim, args.batch, args.seconds)
+                    print(f"{expression:<20}{local:>12.3g} r/s{served:>12.3g} r/s{first * 1000:>11.1f} ms")
+        finally:
+            server.terminate()
+            server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
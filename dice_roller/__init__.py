@@ -1,33 +1,145 @@
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 from . import random
-from .callback import WithGenerateCallback, WithRollCallback
-from .compare import Ge, Gt, Le, Limit, Lt
-from .core import BaseDice, Dice, DiceMany, RangeDice, Scalar, many
-from .explode import Explode
-from .math import (
-    DiceAdd,
-    DiceDiv,
-    DiceMul,
-    DiceSub,
-)
-from .reroll import Reroll
-from .transformations import DropHighest, DropLowest, KeepHighest, KeepLowest
+from .core import BaseDice, Dice, DiceMany, FacesDice, RangeDice, Scalar, WeightedDice, many
+
+if TYPE_CHECKING:
+    from .backend import get_backend, set_backend, use_backend
+    from .audit import AuditLog, AuditRecord, read_audit
+    from .bulk import generate_blocked, generate_to
+    from .cache import Distribution, DistributionCache
+    from .callback import WithGenerateCallback, WithRollCallback
+    from .client import RollClient
+    from .compare import Ge, Gt, Le, Limit, Lt
+    from .estimation import AtLeast, Mean, Quantile, estimate
+    from .explode import Explode
+    from .interning import intern
+    from .keyed import RollKey, generate_range
+    from .math import (
+        DiceAdd,
+        DiceDiv,
+        DiceMul,
+        DiceSub,
+    )
+    from .parser import parse
+    from .pools import Pool, PoolRolls, pool
+    from .profiler import dice_profiler
+    from .query import CdfTable, cdf, prob_ge, prob_le, quantile
+    from .reroll import Reroll
+    from .serialization import dumps, loads
+    from .server import RollServer
+    from .shared import Shared, generate_many
+    from .simulation import simulate
+    from .tail import TailEstimate, tail_probability
+    from .transformations import DropHighest, DropLowest, KeepHighest, KeepLowest
+
+    kh = KeepHighest
+    kl = KeepLowest
+    dh = DropHighest
+    dl = DropLowest
+    x = Explode
+    r = Reroll
+    lim = Limit
 
 s = Scalar
 d = Dice
-kh = KeepHighest
-kl = KeepLowest
-dh = DropHighest
-dl = DropLowest
-x = Explode
-r = Reroll
 rng = RangeDice
-lim = Limit
+
+# Only `core` (numpy) is imported with the package, everything else (and dyce, needed for histograms)
+# is imported on first use. Name -> (submodule, attribute)
+_LAZY = {
+    "get_backend": ("backend", "get_backend"),
+    "set_backend": ("backend", "set_backend"),
+    "use_backend": ("backend", "use_backend"),
+    "AuditLog": ("audit", "AuditLog"),
+    "AuditRecord": ("audit", "AuditRecord"),
+    "read_audit": ("audit", "read_audit"),
+    "generate_blocked": ("bulk", "generate_blocked"),
+    "generate_to": ("bulk", "generate_to"),
+    "Distribution": ("cache", "Distribution"),
+    "DistributionCache": ("cache", "DistributionCache"),
+    "WithGenerateCallback": ("callback", "WithGenerateCallback"),
+    "WithRollCallback": ("callback", "WithRollCallback"),
+    "RollClient": ("client", "RollClient"),
+    "Ge": ("compare", "Ge"),
+    "Gt": ("compare", "Gt"),
+    "Le": ("compare", "Le"),
+    "Limit": ("compare", "Limit"),
+    "Lt": ("compare", "Lt"),
+    "AtLeast": ("estimation", "AtLeast"),
+    "Mean": ("estimation", "Mean"),
+    "Quantile": ("estimation", "Quantile"),
+    "estimate": ("estimation", "estimate"),
+    "Explode": ("explode", "Explode"),
+    "intern": ("interning", "intern"),
+    "RollKey": ("keyed", "RollKey"),
+    "generate_range": ("keyed", "generate_range"),
+    "DiceAdd": ("math", "DiceAdd"),
+    "DiceDiv": ("math", "DiceDiv"),
+    "DiceMul": ("math", "DiceMul"),
+    "DiceSub": ("math", "DiceSub"),
+    "parse": ("parser", "parse"),
+    "Pool": ("pools", "Pool"),
+    "PoolRolls": ("pools", "PoolRolls"),
+    "pool": ("pools", "pool"),
+    "dice_profiler": ("profiler", "dice_profiler"),
+    "CdfTable": ("query", "CdfTable"),
+    "cdf": ("query", "cdf"),
+    "prob_ge": ("query", "prob_ge"),
+    "prob_le": ("query", "prob_le"),
+    "quantile": ("query", "quantile"),
+    "Reroll": ("reroll", "Reroll"),
+    "RollServer": ("server", "RollServer"),
+    "dumps": ("serialization", "dumps"),
+    "loads": ("serialization", "loads"),
+    "Shared": ("shared", "Shared"),
+    "generate_many": ("shared", "generate_many"),
+    "simulate": ("simulation", "simulate"),
+    "TailEstimate": ("tail", "TailEstimate"),
+    "tail_probability": ("tail", "tail_probability"),
+    "DropHighest": ("transformations", "DropHighest"),
+    "DropLowest": ("transformations", "DropLowest"),
+    "KeepHighest": ("transformations", "KeepHighest"),
+    "KeepLowest": ("transformations", "KeepLowest"),
+    "kh": ("transformations", "KeepHighest"),
+    "kl": ("transformations", "KeepLowest"),
+    "dh": ("transformations", "DropHighest"),
+    "dl": ("transformations", "DropLowest"),
+    "x": ("explode", "Explode"),
+    "r": ("reroll", "Reroll"),
+    "lim": ("compare", "Limit"),
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attribute = _LAZY[name]
+    value = getattr(import_module(f".{module}", __name__), attribute)
+    globals()[name] = value  # Next lookups don't reach `__getattr__`
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY))
 
 
 __all__ = [
     "random",
+    "get_backend",
+    "set_backend",
+    "use_backend",
+    "AuditLog",
+    "AuditRecord",
+    "read_audit",
+    "generate_blocked",
+    "generate_to",
+    "Distribution",
+    "DistributionCache",
     "WithGenerateCallback",
     "WithRollCallback",
+    "RollClient",
     "Ge",
     "Gt",
     "Le",
@@ -36,15 +148,42 @@ __all__ = [
     "BaseDice",
     "Dice",
     "DiceMany",
+    "FacesDice",
     "RangeDice",
     "Scalar",
+    "WeightedDice",
     "many",
+    "AtLeast",
+    "Mean",
+    "Quantile",
+    "estimate",
     "Explode",
+    "intern",
+    "RollKey",
+    "generate_range",
     "DiceAdd",
     "DiceDiv",
     "DiceMul",
     "DiceSub",
+    "parse",
+    "Pool",
+    "PoolRolls",
+    "pool",
+    "dice_profiler",
+    "CdfTable",
+    "cdf",
+    "prob_ge",
+    "prob_le",
+    "quantile",
     "Reroll",
+    "RollServer",
+    "dumps",
+    "loads",
+    "Shared",
+    "generate_many",
+    "simulate",
+    "TailEstimate",
+    "tail_probability",
     "DropHighest",
     "DropLowest",
     "KeepHighest",
@@ -0,0 +1,181 @@
+"""
+Bulk dice roller.
+
+    python -m dice_roller "2d20kh + 5" -n 10                         # CSV to stdout
+    python -m dice_roller "4d6kh3" -n 1000000000 -f npy -o rolls.npy --dtype int8 --workers 8 --seed 42
+    python -m dice_roller "d6x6" "d20" -n 1000000 -f stats            # summary of every expression
+    python -m dice_roller --file expressions.txt -n 100000 -f hist
+
+Rolls are generated `--chunk-size` rows at a time, so memory does not depend on `--count`. With several
+expressions every row has one roll of each (CSV columns, `(count, expressions)` npy array, interleaved raw).
+Output depends only on `--seed` and `--chunk-size`, not on `--workers`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+from .bulk import DEFAULT_CHUNK_SIZE, _check_dtype
+from .core import BaseDice
+from .estimation import _Tally
+from .parser import parse
+from .random import use_rng
+
+FORMATS = ("csv", "raw", "npy", "stats", "hist")
+# Width of the histogram bars
+_BAR = 50
+
+
+def _read_expressions(args: argparse.Namespace) -> list[str]:
+    expressions = list(args.expressions)
+    if args.file is not None:
+        with open(args.file) as file:
+            for line in file:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    expressions.append(line)
+    return expressions
+
+
+def _roll_chunk(dices: list[BaseDice], rows: int, dtype: np.dtype, seed: np.random.SeedSequence) -> np.ndarray:
+    chunk = np.empty((rows, len(dices)), dtype=dtype)
+    with use_rng(seed):
+        for column, dice in enumerate(dices):
+            chunk[:, column] = dice.generate(rows)
+    return chunk
+
+
+def _chunks(
+    dices: list[BaseDice], count: int, chunk_size: int, dtype: np.dtype, seed: int | None, workers: int
+) -> Iterator[np.ndarray]:
+    # Every chunk has its own random stream, derived from the seed and the chunk index
+    entropy = np.random.SeedSequence(seed).entropy
+    bounds = [(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+    seeds = (np.random.SeedSequence(entropy, spawn_key=(index,)) for index in range(len(bounds)))
+    if workers == 1:
+        for (start, stop), chunk_seed in zip(bounds, seeds):
+            yield _roll_chunk(dices, stop - start, dtype, chunk_seed)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Only a couple of chunks per worker are in flight, so memory stays bounded
+        pending = []
+        for (start, stop), chunk_seed in zip(bounds, seeds):
+            pending.append(executor.submit(_roll_chunk, dices, stop - start, dtype, chunk_seed))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _write_csv(out: BinaryIO, chunks: Iterator[np.ndarray], expressions: list[str]) -> None:
+    out.write((",".join(expressions) + "\n").encode())
+    for chunk in chunks:
+        if chunk.shape[1] == 1:
+            lines = map(str, chunk[:, 0].tolist())
+        else:
+            lines = (",".join(map(str, row)) for row in chunk.tolist())
+        out.write(("\n".join(lines) + "\n").encode())
+
+
+def _write_npy(out: BinaryIO, chunks: Iterator[np.ndarray], count: int, columns: int, dtype: np.dtype) -> None:
+    # Header holds the final shape, data is streamed after it (works for pipes too)
+    shape = (count,) if columns == 1 else (count, columns)
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape}
+    np.lib.format.write_array_header_1_0(out, header)
+    for chunk in chunks:
+        out.write(np.ascontiguousarray(chunk).tobytes())
+
+
+def _summary(chunks: Iterator[np.ndarray], dices: list[BaseDice]) -> list[_Tally]:
+    tallies = [_Tally(dice.min(), dice.max()) for dice in dices]
+    for chunk in chunks:
+        for column, tally in enumerate(tallies):
+            tally.add(chunk[:, column].astype(np.int64))
+    return tallies
+
+
+def _write_stats(out: BinaryIO, tallies: list[_Tally], expressions: list[str], histogram: bool) -> None:
+    lines = []
+    for expression, tally in zip(expressions, tallies):
+        outcomes, counts = tally.distribution()
+        if not tally.samples:
+            lines += [f"{expression}: no rolls", ""]
+            continue
+        p = counts / tally.samples
+        mean = float(p @ outcomes)
+        stdev = float(p @ (outcomes - mean) ** 2) ** 0.5
+        cumulative = np.cumsum(counts)
+        q1, median, q3 = (int(outcomes[np.searchsorted(cumulative, q * tally.samples)]) for q in (0.25, 0.5, 0.75))
+        lines.append(
+            f"{expression}: rolls={tally.samples} mean={mean:.4f} stdev={stdev:.4f} "
+            f"min={outcomes[0]} q1={q1} median={median} q3={q3} max={outcomes[-1]}"
+        )
+        if histogram:
+            width = max(len(str(outcome)) for outcome in (outcomes[0], outcomes[-1]))
+            for outcome, probability in zip(outcomes.tolist(), p.tolist()):
+                bar = "#" * round(probability / p.max() * _BAR)
+                lines.append(f"  {outcome:>{width}} {probability * 100:8.4f}% {bar}")
+        lines.append("")
+    out.write("\n".join(lines).encode())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m dice_roller", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("expressions", nargs="*", metavar="EXPRESSION", help="dice notation, e.g. '2d20kh + 5'")
+    parser.add_argument("--file", help="file with expressions, one per line ('#' starts a comment)")
+    parser.add_argument("-n", "--count", type=int, default=1, help="rolls of every expression")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="csv")
+    parser.add_argument("-o", "--output", default="-", help="output file, '-' for stdout")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--dtype", default="int64", help="numpy integer type of the rolls, e.g. int8, int16")
+    parser.add_argument("--workers", type=int, default=1, help="processes rolling chunks")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rolls per chunk")
+    args = parser.parse_args(argv)
+
+    expressions = _read_expressions(args)
+    if not expressions:
+        parser.error("no expressions given")
+    if args.count < 0 or args.workers <= 0 or args.chunk_size <= 0:
+        parser.error("'count' suppose to be non-negative, 'workers' and 'chunk-size' positive")
+    try:
+        dices = [parse(expression) for expression in expressions]
+        dtype = np.dtype(args.dtype)
+        if not np.issubdtype(dtype, np.integer):
+            raise ValueError(f"'dtype' suppose to be integer type, not {dtype}")
+        for dice in dices:
+            _check_dtype(dice, dtype)
+    except (ValueError, TypeError) as error:
+        parser.error(str(error))
+
+    chunks = _chunks(dices, args.count, args.chunk_size, dtype, args.seed, args.workers)
+    target = nullcontext(sys.stdout.buffer) if args.output == "-" else open(args.output, "wb")
+    try:
+        with target as out:
+            if args.format == "csv":
+                _write_csv(out, chunks, expressions)
+            elif args.format == "raw":
+                for chunk in chunks:
+                    out.write(chunk.tobytes())
+            elif args.format == "npy":
+                _write_npy(out, chunks, args.count, len(dices), dtype)
+            else:
+                _write_stats(out, _summary(chunks, dices), expressions, histogram=args.format == "hist")
+            out.flush()
+    except BrokenPipeError:
+        # Output piped into `head` and alike: reading side is gone, silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .core import BaseDice, Cumulants, FacesDice, RangeDice, WeightedDice, _child_nodes
+from .math import DiceDiv, DiceMul
+from .random import use_rng
+
+# Confidence level of the Monte Carlo error bounds
+CONFIDENCE = 0.95
+# Series approximations cover mean +- _SPREAD standard deviations (clipped by dice min and max)
+_SPREAD = 8.0
+_CHUNK = 1 << 20
+# With time budget chunks grow from this size, so the deadline is checked often for slow expressions
+_FIRST_CHUNK = 1 << 12
+_METHODS = ("auto", "normal", "edgeworth", "monte_carlo")
+
+_erf = np.vectorize(math.erf, otypes=[np.float64])
+
+
+@dataclass(slots=True, frozen=True)
+class ApproxHistogram:
+    """
+    Approximate distribution of the dice outcome.
+
+    `error` bounds the absolute error of cumulative probabilities. For Monte Carlo estimate it holds with
+    `CONFIDENCE` probability (Dvoretzky-Kiefer-Wolfowitz inequality), for normal and Edgeworth approximations
+    it is the size of the first series terms left out, so it is an estimate rather than a strict bound.
+    """
+
+    outcomes: np.ndarray
+    probabilities: np.ndarray
+    error: float
+    method: str
+    samples: int = 0
+
+    def cdf(self) -> np.ndarray:
+        return np.cumsum(self.probabilities)
+
+    def cdf_bounds(self) -> tuple[np.ndarray, np.ndarray]:
+        cdf = self.cdf()
+        return np.clip(cdf - self.error, 0, 1), np.clip(cdf + self.error, 0, 1)
+
+    def mean(self) -> float:
+        return float(self.probabilities @ self.outcomes)
+
+
+def _analytic_cumulants(dice: BaseDice) -> Cumulants | None:
+    # Cumulants of the expression, only if all of its parts have closed form (no histogram fallback)
+    if type(dice)._cumulants is BaseDice._cumulants:
+        return None
+    if any(_analytic_cumulants(child) is None for child in _child_nodes(dice)):
+        return None
+    return dice._cumulants()
+
+
+def _consecutive_outcomes(dice: BaseDice) -> bool:
+    # Series approximations spread the probability over every integer between the bounds, products and stepped
+    # ranges leave gaps which the error estimate does not account for
+    if isinstance(dice, (DiceMul, DiceDiv)) or (isinstance(dice, RangeDice) and abs(dice.step_value) != 1):
+        return False
+    if isinstance(dice, (FacesDice, WeightedDice)) and np.any(np.diff(np.unique(dice._values)) != 1):
+        return False
+    return all(_consecutive_outcomes(child) for child in _child_nodes(dice))
+
+
+def _edgeworth_terms(z: np.ndarray, skew: float, kurtosis: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Corrections to the normal CDF, grouped by order; all are multiplied by the normal density and subtracted.
+    # Last group is only used as the error estimate: the known terms of the next two orders (fifth and sixth
+    # cumulants are not propagated).
+    he2 = z**2 - 1
+    he3 = z**3 - 3 * z
+    he5 = z**5 - 10 * z**3 + 15 * z
+    he6 = z**6 - 15 * z**4 + 45 * z**2 - 15
+    he7 = z**7 - 21 * z**5 + 105 * z**3 - 105 * z
+    he8 = z**8 - 28 * z**6 + 210 * z**4 - 420 * z**2 + 105
+    return (
+        skew / 6 * he2,
+        kurtosis / 24 * he3 + skew**2 / 72 * he5,
+        skew * kurtosis / 144 * he6 + skew**3 / 1296 * he8 + kurtosis**2 / 1152 * he7,
+    )
+
+
+def _series(dice: BaseDice, cumulants: Cumulants, method: str) -> ApproxHistogram:
+    mean, variance, third, fourth = cumulants
+    if variance <= 0:
+        return ApproxHistogram(np.array([round(mean)]), np.array([1.0]), 0.0, method)
+
+    sd = math.sqrt(variance)
+    low = max(dice.min(), math.floor(mean - _SPREAD * sd))
+    high = max(low, min(dice.max(), math.ceil(mean + _SPREAD * sd)))
+    outcomes = np.arange(low, high + 1)
+
+    # Continuity correction: probability of outcome k is F(k + 0.5) - F(k - 0.5)
+    z = (np.append(outcomes - 0.5, high + 0.5) - mean) / sd
+    density = np.exp(-(z**2) / 2) / math.sqrt(2 * math.pi)
+    first, second, third_order = _edgeworth_terms(z, third / sd**3, fourth / variance**2)
+    cdf = 0.5 * (1 + _erf(z / math.sqrt(2)))
+    if method == "edgeworth":
+        cdf -= density * (first + second)
+        error = float(np.max(np.abs(density * third_order)))
+    else:
+        error = float(np.max(np.abs(density * (first + second))))
+
+    cdf[0], cdf[-1] = 0.0, 1.0
+    cdf = np.maximum.accumulate(np.clip(cdf, 0.0, 1.0))
+    return ApproxHistogram(outcomes, np.diff(cdf), error, method)
+
+
+def _monte_carlo_error(samples: int) -> float:
+    return math.sqrt(math.log(2 / (1 - CONFIDENCE)) / (2 * samples))
+
+
+def _monte_carlo_samples(tolerance: float) -> int:
+    return math.ceil(math.log(2 / (1 - CONFIDENCE)) / (2 * tolerance**2))
+
+
+def _count_outcomes(dice: BaseDice, samples: int, deadline: float | None) -> tuple[np.ndarray, np.ndarray, int]:
+    # Outcomes, their counts and amount of generated rolls: at least one chunk is rolled before the deadline
+    outcomes, counts = [], []
+    generated, chunk = 0, _CHUNK if deadline is None else _FIRST_CHUNK
+    while generated < samples:
+        size = min(chunk, samples - generated)
+        chunk_outcomes, chunk_counts = np.unique(dice.generate(size), return_counts=True)
+        outcomes.append(chunk_outcomes)
+        counts.append(chunk_counts)
+        generated += size
+        chunk = min(chunk * 2, _CHUNK)
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    merged, inverse = np.unique(np.concatenate(outcomes), return_inverse=True)
+    return merged, np.bincount(inverse, weights=np.concatenate(counts)), generated
+
+
+def _monte_carlo(dice: BaseDice, samples: int, seed: int | None, deadline: float | None) -> ApproxHistogram:
+    samples = max(samples, 1)
+    if seed is None:
+        outcomes, counts, samples = _count_outcomes(dice, samples, deadline)
+    else:
+        with use_rng(seed):
+            outcomes, counts, samples = _count_outcomes(dice, samples, deadline)
+    return ApproxHistogram(outcomes, counts / samples, _monte_carlo_error(samples), "monte_carlo", samples)
+
+
+def approx_histogram(
+    dice: BaseDice,
+    method: str = "auto",
+    *,
+    tolerance: float = 0.01,
+    max_samples: int = 1_000_000,
+    time_budget: float | None = None,
+    seed: int | None = None,
+) -> ApproxHistogram:
+    """
+    Approximate distribution of the dice, for expressions too large for exact `histogram()`.
+
+    Methods:
+    - "normal" - normal approximation from the mean and variance, spread over consecutive integers
+    - "edgeworth" - normal approximation corrected by skewness and kurtosis
+    - "monte_carlo" - frequencies of the generated rolls; enough rolls for `tolerance` error, but not more than
+      `max_samples`, are generated (seeded with `seed`, if provided). With `time_budget` (seconds) generation
+      also stops when the budget is spent, `error` and `samples` of the result tell the reached accuracy
+    - "auto" - the cheapest of the above within `tolerance`. Series approximations are only considered when all
+      parts of the expression have analytic moments and consecutive outcomes, otherwise rolls are generated.
+    """
+    if method not in _METHODS:
+        raise ValueError(f"'method' suppose to be one of {_METHODS}, not {method!r}")
+    if time_budget is not None and time_budget <= 0:
+        raise ValueError(f"'time_budget' suppose to be positive, not {time_budget}")
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    if method in ("normal", "edgeworth"):
+        return _series(dice, dice.cumulants(), method)
+
+    samples = min(_monte_carlo_samples(tolerance), max_samples)
+    if method == "monte_carlo":
+        return _monte_carlo(dice, samples, seed, deadline)
+
+    cumulants = _analytic_cumulants(dice)
+    if cumulants is not None and _consecutive_outcomes(dice):
+        best = None
+        for series_method in ("normal", "edgeworth"):
+            best = _series(dice, cumulants, series_method)
+            if best.error <= tolerance:
+                return best
+        if best is not None and best.error <= _monte_carlo_error(samples):
+            return best
+    return _monte_carlo(dice, samples, seed, deadline)
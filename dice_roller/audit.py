@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import atexit
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from .callback import WithGenerateCallback
+from .core import BaseDice
+
+POLICIES = ("block", "drop", "sample")
+
+# Log file: `_MAGIC`, then frames of `_FRAME` header (frame magic, compressed size, crc32 of compressed payload)
+# followed by zlib-compressed records. Every record is `_RECORD` header (timestamp, rolled items, stored rolls,
+# label size, roll size in bytes), utf-8 label and stored rolls as little-endian integers of the smallest fitting size.
+_MAGIC = b"DRAUDIT1"
+_FRAME = struct.Struct("<4sII")
+_FRAME_MAGIC = b"DRAF"
+_RECORD = struct.Struct("<dQQHB")
+_SIZES = (1, 2, 4, 8)
+
+
+@dataclass(slots=True, frozen=True)
+class AuditRecord:
+    """
+    One logged roll batch. `items` is the amount of rolled items, `rolls` may be shorter when the batch was
+    sampled under the "sample" policy.
+    """
+
+    time: float
+    label: str
+    items: int
+    rolls: np.ndarray
+
+    @property
+    def sampled(self) -> bool:
+        return len(self.rolls) != self.items
+
+
+@dataclass(slots=True)
+class _Batch:
+    time: float
+    label: str
+    items: int
+    rolls: np.ndarray
+
+
+def _encode(batches: list[_Batch]) -> bytes:
+    chunks = []
+    for batch in batches:
+        label = batch.label.encode()[:0xFFFF]
+        rolls = np.asarray(batch.rolls)
+        low, high = (int(rolls.min()), int(rolls.max())) if len(rolls) else (0, 0)
+        size = next(s for s in _SIZES if np.iinfo(f"i{s}").min <= low and high <= np.iinfo(f"i{s}").max)
+        rolls = np.ascontiguousarray(rolls, dtype=f"<i{size}")
+        chunks += [_RECORD.pack(batch.time, batch.items, len(rolls), len(label), size), label, rolls.tobytes()]
+    return b"".join(chunks)
+
+
+def _decode(payload: bytes) -> Iterator[AuditRecord]:
+    offset = 0
+    while offset < len(payload):
+        timestamp, items, stored, label_size, size = _RECORD.unpack_from(payload, offset)
+        offset += _RECORD.size
+        label = payload[offset : offset + label_size].decode()
+        offset += label_size
+        rolls = np.frombuffer(payload, dtype=f"<i{size}", count=stored, offset=offset).astype(np.int64)
+        offset += stored * size
+        yield AuditRecord(timestamp, label, items, rolls)
+
+
+class AuditLog:
+    """
+    Append-only log of generated rolls for fairness audits.
+
+    Logging only enqueues rolls, a background thread batches pending rolls and writes them as zlib-compressed
+    frames, so file writes are kept out of `generate()`. Log is flushed on `close()` and on interpreter exit.
+
+    Use `log.wrap(dice)` (or `dice.audit(log)`) to log every `roll()`/`generate()` of the dice, or call
+    `log(rolls, label)` directly. When more than `max_pending` rolls are waiting for the writer, `policy` decides:
+
+    - "block" - caller waits for the writer (nothing is lost)
+    - "drop" - the batch is discarded, counted in `dropped`
+    - "sample" - evenly spaced part of the batch fitting into free space is kept, the rest is counted in `dropped`
+
+    Rolls are copied on enqueue, because parent dices modify generated arrays in place. With `copy=False` arrays
+    are logged zero-copy, which is safe only for the root dice whose results are not modified by the caller.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        *,
+        policy: str = "block",
+        max_pending: int = 1 << 24,
+        batch_size: int = 1 << 20,
+        flush_interval: float = 1.0,
+        level: int = 1,
+        copy: bool = True,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"'policy' suppose to be one of {POLICIES}, not {policy!r}")
+        if max_pending <= 0 or batch_size <= 0:
+            raise ValueError("'max_pending' and 'batch_size' suppose to be positive")
+
+        self.path = Path(path)
+        self.policy = policy
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.level = level
+        self.copy = copy
+        self.written = 0
+        self.dropped = 0
+
+        self._file: BinaryIO = open(self.path, "ab+")
+        self._file.seek(0)
+        header = self._file.read(len(_MAGIC))
+        if not header:
+            self._file.write(_MAGIC)
+            self._file.flush()
+        elif header != _MAGIC:
+            self._file.close()
+            raise ValueError(f"'{self.path}' is not an audit log")
+
+        self._pending: deque[_Batch] = deque()
+        self._pending_rolls = 0
+        self._writing = False
+        self._flush_requested = False
+        self._closed = False
+        self._error: BaseException | None = None
+        self._condition = threading.Condition()
+        self._writer = threading.Thread(target=self._run, name=f"audit-writer:{self.path.name}", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> AuditLog:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    # Producer side
+
+    def wrap(self, dice: BaseDice, label: str | None = None) -> BaseDice:
+        return WithGenerateCallback(dice, partial(self, label=str(dice) if label is None else label))
+
+    def __call__(self, rolls: ArrayLike, label: str = "") -> None:
+        rolls = np.array(rolls, copy=self.copy or None, ndmin=1)
+        items = len(rolls)
+        with self._condition:
+            self._check()
+            free = self.max_pending - self._pending_rolls
+            if items > free:
+                if self.policy == "block":
+                    # Oversized batch is accepted into the empty queue
+                    limit = max(self.max_pending, items)
+                    self._condition.wait_for(
+                        lambda: self._closed or self._error is not None or self._pending_rolls + items <= limit
+                    )
+                    self._check()
+                elif self.policy == "drop" or free <= 0:
+                    self.dropped += items
+                    return
+                else:
+                    rolls = rolls[:: -(-items // free)]
+                    self.dropped += items - len(rolls)
+            self._pending.append(_Batch(time.time(), label, items, rolls))
+            self._pending_rolls += len(rolls)
+            if self._pending_rolls >= self.batch_size:
+                self._condition.notify_all()
+
+    def flush(self) -> None:
+        """
+        Wait until all pending rolls are written to the file.
+        """
+        with self._condition:
+            self._check()
+            self._flush_requested = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: (not self._pending and not self._writing) or self._error is not None)
+            self._check()
+
+    def close(self) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        atexit.unregister(self.close)
+        self._writer.join()
+        self._file.close()
+        if self._error is not None:
+            raise self._error
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise ValueError(f"Audit log '{self.path}' is closed")
+
+    # Writer thread
+
+    def _ready(self) -> bool:
+        return self._closed or self._flush_requested or self._pending_rolls >= self.batch_size
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._ready, timeout=self.flush_interval)
+                batches = list(self._pending)
+                self._pending.clear()
+                self._pending_rolls = 0
+                self._flush_requested = False
+                self._writing = bool(batches)
+                closed = self._closed
+                # Blocked producers can enqueue while the frame is written
+                self._condition.notify_all()
+
+            if batches:
+                try:
+                    self._write(batches)
+                except BaseException as error:  # Reported to the producer on the next call
+                    with self._condition:
+                        self._error = error
+                        self._writing = False
+                        self._condition.notify_all()
+                    return
+            with self._condition:
+                self.written += sum(len(batch.rolls) for batch in batches)
+                self._writing = False
+                self._condition.notify_all()
+                if closed and not self._pending:
+                    return
+
+    def _write(self, batches: list[_Batch]) -> None:
+        payload = zlib.compress(_encode(batches), self.level)
+        self._file.write(_FRAME.pack(_FRAME_MAGIC, len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+
+
+def read_audit(path: str | os.PathLike) -> Iterator[AuditRecord]:
+    """
+    Iterate over the records of the audit log. Incomplete frame at the end (interrupted write) is skipped,
+    damaged frames raise ValueError.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"'{path}' is not an audit log")
+        while True:
+            offset = file.tell()
+            header = file.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                return
+            magic, size, crc = _FRAME.unpack(header)
+            if magic != _FRAME_MAGIC:
+                raise ValueError(f"Damaged audit frame at offset {offset} of '{path}'")
+            payload = file.read(size)
+            if len(payload) < size:
+                return
+            if zlib.crc32(payload) != crc:
+                raise ValueError(f"Damaged audit frame at offset {offset} of '{path}'")
+            yield from _decode(zlib.decompress(payload))
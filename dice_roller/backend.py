@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import cache
+from importlib.util import find_spec
+from typing import Callable, Iterator
+
+import numpy as np
+
+BACKENDS = ("auto", "numpy", "numba")
+
+
+@dataclass(slots=True, frozen=True)
+class Kernels:
+    """
+    Loop-heavy parts of the dice nodes. Kernels never draw random numbers, so all backends give identical
+    results under the same seed.
+
+    - `segment_sum(values, counts)` - sums of consecutive segments of `counts[i]` values
+    - `segment_keep(values, counts, keep, highest)` - sums of `keep[i]` highest (or lowest) values of each segment
+    - `scatter_add(out, index, values)` - `out[index] += values`, for unique `index`
+    - `scatter(out, index, values)` - `out[index] = values`
+    """
+
+    name: str
+    segment_sum: Callable[[np.ndarray, np.ndarray], np.ndarray]
+    segment_keep: Callable[[np.ndarray, np.ndarray, np.ndarray, bool], np.ndarray]
+    scatter_add: Callable[[np.ndarray, np.ndarray, np.ndarray], None]
+    scatter: Callable[[np.ndarray, np.ndarray, np.ndarray], None]
+
+
+def _segment_sum(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    totals = np.concatenate([[0], np.cumsum(values, dtype=np.int_)])
+    ends = np.cumsum(counts)
+    return totals[ends] - totals[ends - counts]
+
+
+def _segment_keep(values: np.ndarray, counts: np.ndarray, keep: np.ndarray, highest: bool) -> np.ndarray:
+    # Segments are rows of the padded matrix, padding is sorted away from the kept side
+    width = int(counts.max(initial=0))
+    columns = np.arange(width)
+    info = np.iinfo(np.int_)
+    pools = np.full((len(counts), width), info.min if highest else info.max, dtype=np.int_)
+    pools[columns < counts[:, None]] = values
+    pools.sort(axis=1)
+    kept = columns >= width - keep[:, None] if highest else columns < keep[:, None]
+    return np.where(kept, pools, 0).sum(axis=1)
+
+
+def _scatter_add(out: np.ndarray, index: np.ndarray, values: np.ndarray) -> None:
+    out[index] += values
+
+
+def _scatter(out: np.ndarray, index: np.ndarray, values: np.ndarray) -> None:
+    out[index] = values
+
+
+NUMPY_KERNELS = Kernels("numpy", _segment_sum, _segment_keep, _scatter_add, _scatter)
+
+
+def _numba_kernels() -> Kernels:
+    from numba import njit
+
+    @njit(cache=True)
+    def segment_sum(values, counts):
+        out = np.zeros(len(counts), dtype=np.int64)
+        start = 0
+        for i in range(len(counts)):
+            total = 0
+            for j in range(start, start + counts[i]):
+                total += values[j]
+            out[i] = total
+            start += counts[i]
+        return out
+
+    @njit(cache=True)
+    def segment_keep(values, counts, keep, highest):
+        out = np.zeros(len(counts), dtype=np.int64)
+        start = 0
+        for i in range(len(counts)):
+            segment = np.sort(values[start : start + counts[i]])
+            first = counts[i] - keep[i] if highest else 0
+            total = 0
+            for j in range(first, first + keep[i]):
+                total += segment[j]
+            out[i] = total
+            start += counts[i]
+        return out
+
+    @njit(cache=True)
+    def scatter_add(out, index, values):
+        for i in range(len(index)):
+            out[index[i]] += values[i]
+
+    @njit(cache=True)
+    def scatter(out, index, values):
+        for i in range(len(index)):
+            out[index[i]] = values[i]
+
+    return Kernels("numba", segment_sum, segment_keep, scatter_add, scatter)
+
+
+_backend = "auto"
+_loaded: dict[str, Kernels] = {"numpy": NUMPY_KERNELS}
+
+
+@cache
+def available_backends() -> tuple[str, ...]:
+    return ("numpy", "numba") if find_spec("numba") is not None else ("numpy",)
+
+
+def get_backend() -> str:
+    """
+    Name of the backend in use, "auto" is resolved to "numba" when it is installed.
+    """
+    if _backend == "auto":
+        return available_backends()[-1]
+    return _backend
+
+
+def set_backend(name: str) -> None:
+    global _backend
+
+    if name not in BACKENDS:
+        raise ValueError(f"'backend' suppose to be one of {BACKENDS}, not {name!r}")
+    if name != "auto" and name not in available_backends():
+        raise ValueError(f"Backend {name!r} is not available, is {name} installed?")
+    _backend = name
+
+
+@contextmanager
+def use_backend(name: str) -> Iterator[None]:
+    previous = _backend
+    set_backend(name)
+    try:
+        yield
+    finally:
+        set_backend(previous)
+
+
+def kernels() -> Kernels:
+    # Numba is imported (and kernels compiled) on the first use only
+    name = get_backend()
+    if name not in _loaded:
+        _loaded[name] = _numba_kernels()
+    return _loaded[name]
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from .core import BaseDice
+from .random import Rng, use_rng
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Tile of 64K int64 samples (512KB) keeps temporaries of the whole tree inside L2 cache
+DEFAULT_BLOCK_SIZE = 1 << 16
+
+
+def _check_dtype(dice: BaseDice, dtype: np.dtype) -> None:
+    if not np.issubdtype(dtype, np.integer):
+        return
+    info = np.iinfo(dtype)
+    if dice.min() < info.min or dice.max() > info.max:
+        raise ValueError(f"Outcomes of '{dice}' ({dice.min()}..{dice.max()}) does not fit into {dtype}")
+
+
+def _fill(out: np.ndarray, dice: BaseDice, start: int, stop: int, chunk_size: int) -> None:
+    for chunk_start in range(start, stop, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, stop)
+        out[chunk_start:chunk_stop] = dice.generate(chunk_stop - chunk_start)
+
+
+def generate_blocked(
+    dice: BaseDice, items: int, block_size: int = DEFAULT_BLOCK_SIZE, out: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Generate `items` rolls of the dice tile by tile: the whole tree is evaluated (with plain `generate`) for
+    `block_size` samples before moving to the next tile, so intermediate arrays of all nodes stay cache-sized.
+    They are still allocated for every tile, only the result array is shared.
+
+    Peak memory besides the result does not depend on `items`. Pass `out` (1-d array of `items` length) to fill
+    preallocated or memory-mapped array, otherwise int64 array is allocated.
+    """
+    if items < 0:
+        raise ValueError(f"'items' suppose to be non-negative, not {items}")
+    if block_size <= 0:
+        raise ValueError(f"'block_size' suppose to be positive, not {block_size}")
+    if out is None:
+        out = np.empty(items, dtype=np.int64)
+    elif out.shape != (items,):
+        raise ValueError(f"'out' suppose to be array of shape ({items},), not {out.shape}")
+    _check_dtype(dice, out.dtype)
+    _fill(out, dice, 0, items, block_size)
+    return out
+
+
+def _fill_slice(
+    path: str, dice: BaseDice, start: int, stop: int, chunk_size: int, seed: np.random.SeedSequence
+) -> None:
+    # Worker process: maps the file created by the parent and writes its own slice
+    out = np.load(path, mmap_mode="r+")
+    with use_rng(np.random.default_rng(seed)):
+        _fill(out, dice, start, stop, chunk_size)
+    out.flush()
+
+
+def generate_to(
+    dice: BaseDice,
+    path: str | os.PathLike,
+    items: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dtype: DTypeLike = np.int64,
+    *,
+    workers: int = 1,
+    seed: int | None = None,
+) -> Path:
+    """
+    Generate `items` rolls of the dice straight into `.npy` file, `chunk_size` rolls at a time.
+
+    Result can be opened without loading it into memory with `np.load(path, mmap_mode="r")`.
+    With `workers > 1` the file is split into contiguous slices, filled by separate processes (the dice must be
+    picklable). Each worker gets its own random stream spawned from `seed`, so output is reproducible for the same
+    `seed`, `workers` and `chunk_size`. Without `seed` rolls come from the current generator (see `use_rng`).
+    """
+    if items < 0:
+        raise ValueError(f"'items' suppose to be non-negative, not {items}")
+    if chunk_size <= 0 or workers <= 0:
+        raise ValueError("'chunk_size' and 'workers' suppose to be positive")
+    dtype = np.dtype(dtype)
+    _check_dtype(dice, dtype)
+
+    path = Path(path)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(items,))
+    if workers == 1:
+        # Seeded output is the same as the first worker stream of the seed
+        generator = Rng().rng if seed is None else np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+        with use_rng(generator):
+            _fill(out, dice, 0, items, chunk_size)
+        out.flush()
+        return path
+
+    # Worker streams are spawned from the seed, or from entropy drawn from the current generator
+    entropy = Rng().rng.integers(0, 1 << 63, size=4).tolist() if seed is None else seed
+    seeds = np.random.SeedSequence(entropy).spawn(workers)
+
+    # Header is written, workers map the same file and fill disjoint slices
+    out.flush()
+    del out
+    bounds = np.linspace(0, items, workers + 1, dtype=np.int64)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_fill_slice, str(path), dice, int(start), int(stop), chunk_size, worker_seed)
+            for start, stop, worker_seed in zip(bounds[:-1], bounds[1:], seeds)
+            if stop > start
+        ]
+        for future in futures:
+            future.result()
+    return path
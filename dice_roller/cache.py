@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from glob import escape as glob_escape
+from importlib import metadata
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .core import BaseDice
+
+if TYPE_CHECKING:
+    from dyce import H
+
+# File layout: magic, little-endian int64 outcome offset, float64 probabilities of consecutive outcomes
+_MAGIC = b"DRDIST01"
+_HEADER = np.dtype([("magic", "S8"), ("offset", "<i8")])
+_SUFFIX = ".dist"
+
+
+def _library_version() -> str:
+    try:
+        return metadata.version("pydiceroll")
+    except metadata.PackageNotFoundError:
+        return "dev"
+
+
+@dataclass(slots=True, frozen=True)
+class Distribution:
+    """
+    Probabilities of consecutive outcomes, starting from `offset`.
+    """
+
+    offset: int
+    probabilities: np.ndarray
+
+    @classmethod
+    def from_histogram(cls, h: H) -> Distribution:
+        # Outcomes are indexes of the table, truncating non-integer ones would merge (and lose) them
+        for outcome in h:
+            if not float(outcome).is_integer():
+                raise ValueError(f"Distribution suppose to have integer outcomes, not {outcome!r}")
+        outcomes = [int(outcome) for outcome in h]
+        offset = min(outcomes)
+        total = h.total
+        probabilities = np.zeros(max(outcomes) - offset + 1, dtype=np.float64)
+        for outcome, count in h.items():
+            # Python integers division keeps precision for huge counts
+            probabilities[int(outcome) - offset] += count / total
+        if not math.isclose(probabilities.sum(), 1.0, rel_tol=1e-9):
+            raise ValueError(f"Probabilities of the distribution sum to {probabilities.sum()}, not 1")
+        return cls(offset, probabilities)
+
+    def outcomes(self) -> np.ndarray:
+        return np.arange(self.offset, self.offset + len(self.probabilities))
+
+    def mean(self) -> float:
+        return float(self.probabilities @ self.outcomes())
+
+    def probability(self, outcome: int) -> float:
+        index = outcome - self.offset
+        return float(self.probabilities[index]) if 0 <= index < len(self.probabilities) else 0.0
+
+
+class DistributionCache:
+    """
+    Persistent cache of the dice distributions, computed with `histogram()`.
+
+    Distributions are stored in `directory`, one file per expression, keyed by the hash of the expression
+    structure (its `serialization` encoding, the same in every process) and the library version. The version
+    is also a prefix of the file names, so entries of other versions are not loaded (`clear` removes them).
+    Files are memory-mapped on load, so processes using the same directory share pages instead of holding
+    private copies. Trees with custom callbacks or operators can't be keyed, their distributions are not stored.
+    """
+
+    def __init__(self, directory: str | os.PathLike, version: str | None = None) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.version = version if version is not None else _library_version()
+        self._prefix = re.sub(r"[^A-Za-z0-9.+]", "_", self.version) + "-"
+        self._loaded: dict[str, Distribution] = {}
+
+    def key(self, dice: BaseDice) -> str | None:
+        # Encoding of the interned tree has all fields of all nodes (e.g. explode depth, which is not a part of
+        # the notation) and no process specific values, None for trees which can't be encoded
+        from .interning import intern
+        from .serialization import dumps
+
+        try:
+            encoded = dumps(intern(dice))
+        except TypeError:
+            return None
+        return hashlib.sha256(self.version.encode() + b"\n" + encoded).hexdigest()  # type: ignore
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{self._prefix}{key}{_SUFFIX}"
+
+    def _load(self, key: str) -> Distribution | None:
+        if (distribution := self._loaded.get(key)) is not None:
+            return distribution
+        path = self._path(key)
+        if not path.exists():
+            return None
+        header = np.fromfile(path, dtype=_HEADER, count=1)
+        if len(header) != 1 or header["magic"][0] != _MAGIC:
+            return None
+        probabilities = np.memmap(path, dtype="<f8", mode="r", offset=_HEADER.itemsize)
+        distribution = self._loaded[key] = Distribution(int(header["offset"][0]), probabilities)
+        return distribution
+
+    def get(self, dice: BaseDice) -> Distribution | None:
+        key = self.key(dice)
+        return None if key is None else self._load(key)
+
+    def put(self, dice: BaseDice, distribution: Distribution) -> None:
+        key = self.key(dice)
+        if key is None:
+            return
+        header = np.array([(_MAGIC, distribution.offset)], dtype=_HEADER)
+        # Write to temporary file and rename, so concurrent readers never see partial files
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(header.tobytes())
+                file.write(np.ascontiguousarray(distribution.probabilities, dtype="<f8").tobytes())
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._loaded.pop(key, None)
+
+    def distribution(self, dice: BaseDice) -> Distribution:
+        """
+        Cached distribution of the dice, computed from `histogram()` and stored on the first request.
+        """
+        distribution = self.get(dice)
+        if distribution is None:
+            distribution = Distribution.from_histogram(dice.histogram())
+            self.put(dice, distribution)
+            # Mapped file, if it was stored
+            distribution = self.get(dice) or distribution
+        return distribution
+
+    def preload(self) -> int:
+        """
+        Map all stored distributions of the current version, returns amount of mapped files.
+        """
+        for path in self.directory.glob(f"{glob_escape(self._prefix)}*{_SUFFIX}"):
+            self._load(path.stem.removeprefix(self._prefix))
+        return len(self._loaded)
+
+    def clear(self) -> None:
+        # Entries of all versions are removed
+        self._loaded.clear()
+        for path in self.directory.glob(f"*{_SUFFIX}"):
+            path.unlink()
@@ -5,10 +5,10 @@ from typing import Callable
 
 from numpy.typing import ArrayLike
 
-from .core import BaseDice
+from .core import BaseDice, Cumulants
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class WithRollCallback(BaseDice):
     dice: BaseDice
     roll_callback: Callable[[int], None]
@@ -22,6 +22,9 @@ class WithRollCallback(BaseDice):
     def min(self) -> int:
         return self.dice.min()
 
+    def _cumulants(self) -> Cumulants:
+        return self.dice.cumulants()
+
     def roll(self) -> int:
         result = self.dice.roll()
         if self.roll_callback is not None:
@@ -32,7 +35,7 @@ class WithRollCallback(BaseDice):
         return self.dice.generate(items)
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class WithGenerateCallback(BaseDice):
     dice: BaseDice
     generate_callback: Callable[[ArrayLike], None]
@@ -46,6 +49,9 @@ class WithGenerateCallback(BaseDice):
     def min(self) -> int:
         return self.dice.min()
 
+    def _cumulants(self) -> Cumulants:
+        return self.dice.cumulants()
+
     def generate(self, items: int) -> ArrayLike:
         result = self.dice.generate(items)
         if self.generate_callback is not None:
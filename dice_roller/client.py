@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+import threading
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def _attach(name: str, server_pid: int) -> SharedMemory:
+    # Memory is owned by the server: the client must not unlink it on exit
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, track=False)  # type: ignore[call-arg]
+    shm = SharedMemory(name)
+    if server_pid != os.getpid():
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    return shm
+
+
+@dataclass(slots=True)
+class _Expression:
+    id: int
+    shm: SharedMemory
+    data: np.ndarray
+
+
+@dataclass(slots=True, eq=False)
+class Lease:
+    """
+    Rolls claimed from the server. `segments` are views of the server ring, valid until `release()`, after that
+    the server refills them. Use it as a context manager to release on exit.
+    """
+
+    client: RollClient
+    id: int
+    segments: list[np.ndarray] = field(default_factory=list)
+    released: bool = False
+
+    @property
+    def rolls(self) -> np.ndarray:
+        # Zero-copy, unless the lease wraps around the ring end
+        if len(self.segments) == 1:
+            return self.segments[0]
+        return np.concatenate(self.segments)
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.segments = []
+            self.client._request({"op": "release", "lease": self.id})
+
+    def __enter__(self) -> Lease:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+class RollClient:
+    """
+    Client of the local roll server (see `dice_roller.server`). Rolls are read straight from the server shared
+    memory:
+
+        with RollClient("/tmp/dice_roller.sock") as client:
+            with client.claim("2d20kh + 5", 10_000) as lease:
+                process(lease.rolls)         # zero-copy view, valid inside `with`
+            rolls = client.take("d6x6", 1000)  # copy, no release needed
+
+    Client is thread-safe, requests are serialized over one connection.
+    """
+
+    def __init__(self, path: str | os.PathLike = "/tmp/dice_roller.sock") -> None:
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(os.fspath(path))
+        self._file = self._socket.makefile("rwb")
+        self._lock = threading.Lock()
+        self._expressions: dict[str, _Expression] = {}
+
+    def __enter__(self) -> RollClient:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _request(self, request: dict) -> dict:
+        with self._lock:
+            self._file.write(json.dumps(request).encode() + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("Roll server closed the connection")
+        response = json.loads(line)
+        if not response.pop("ok"):
+            raise (TimeoutError if response["kind"] == "timeout" else ValueError)(response["error"])
+        return response
+
+    def _expression(self, expression: str) -> _Expression:
+        if (known := self._expressions.get(expression)) is not None:
+            return known
+        response = self._request({"op": "register", "expression": expression})
+        shm = _attach(response["name"], response["pid"])
+        data = np.ndarray((response["capacity"],), dtype=np.dtype(response["dtype"]), buffer=shm.buf)
+        data.flags.writeable = False
+        known = self._expressions[expression] = _Expression(response["id"], shm, data)
+        return known
+
+    def register(self, expression: str) -> None:
+        """
+        Make the server start prefilling rolls of the expression.
+        """
+        self._expression(expression)
+
+    def claim(self, expression: str, count: int) -> Lease:
+        known = self._expression(expression)
+        response = self._request({"op": "claim", "id": known.id, "count": count})
+        segments = [known.data[start : start + length] for start, length in response["segments"]]
+        return Lease(self, response["lease"], segments)
+
+    def take(self, expression: str, count: int) -> np.ndarray:
+        with self.claim(expression, count) as lease:
+            return lease.rolls.copy() if len(lease.segments) == 1 else lease.rolls
+
+    def stats(self) -> dict:
+        return self._request({"op": "stats"})
+
+    def close(self) -> None:
+        for known in self._expressions.values():
+            del known.data
+            try:
+                known.shm.close()
+            except BufferError:
+                pass  # Views of unreleased leases are still alive, memory is unmapped with them
+        self._expressions.clear()
+        self._file.close()
+        self._socket.close()
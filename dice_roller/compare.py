@@ -1,17 +1,38 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
 from functools import partial
-from typing import Protocol
+from typing import TYPE_CHECKING, Protocol
 
 import numpy as np
-from dyce import H
-from dyce.evaluation import HResult, expandable
 from numpy.typing import ArrayLike
 
-from .core import BaseDice
+from .core import BaseDice, _cumulative_at, _from_sparse, _generate_operand, _sparse_counts
 from .misc import DiceModifier, _wrap_scalar
 
+if TYPE_CHECKING:
+    from dyce import H
+    from dyce.evaluation import HResult
+
+
+def _max_histogram(dice: H, compare: H) -> H | None:
+    # P(max(X, Y) <= k) = F_X(k) * F_Y(k), evaluated at the outcomes of both operands only
+    sparse = [_sparse_counts(dice), _sparse_counts(compare)]
+    if None in sparse:
+        return None
+    points = np.union1d(sparse[0][0], sparse[1][0])  # type: ignore
+    joint = np.ones(len(points), dtype=object)
+    for outcomes, counts in sparse:  # type: ignore
+        joint = joint * _cumulative_at(outcomes, counts, points)
+    return _from_sparse(points, np.diff(joint, prepend=0))
+
+
+def _min_histogram(dice: H, compare: H) -> H | None:
+    result = _max_histogram(-dice, -compare)  # type: ignore
+    return None if result is None else -result  # type: ignore
 
-@dataclass(slots=True)
+
+@dataclass(slots=True, frozen=True, eq=False)
 class BaseCompare(BaseDice, Protocol):
     dice: BaseDice
     compare: BaseDice
@@ -26,22 +47,33 @@ class BaseCompare(BaseDice, Protocol):
     def _modify_input_histogram(dice: H, compare: H) -> tuple[H, H]:
         return dice, compare
 
+    @staticmethod
+    def _limit_histogram(dice: H, compare: H) -> H | None: ...
+
     def histogram(self) -> H:
+        from dyce.evaluation import expandable
+
+        dice, compare = self._modify_input_histogram(self.dice.histogram(), self.compare.histogram())
+        result = self._limit_histogram(dice, compare)
+        if result is not None:
+            return result
+
         @expandable
         def cmp(dice: HResult, compare: HResult):
             if not self._compare_histogram_outcome(dice.outcome, compare.outcome):  # type: ignore
                 return compare.outcome
             return dice.outcome
 
-        return cmp(*self._modify_input_histogram(self.dice.histogram(), self.compare.histogram()))
+        # Non-integer outcomes are enumerated pair by pair
+        return cmp(dice, compare)
 
     def generate(self, items: int) -> ArrayLike:
         result_rolls = self.dice.generate(items)
-        cmp_rolls = self.compare.generate(items)
+        cmp_rolls = _generate_operand(self.compare, items)
         return self._with_cap(result_rolls, cmp_rolls)  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class Lt(BaseCompare):
     def __str__(self) -> str:
         return f"{self.dice}<{self.compare}"
@@ -56,6 +88,10 @@ class Lt(BaseCompare):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice < compare
 
+    @staticmethod
+    def _limit_histogram(dice: H, compare: H) -> H | None:
+        return _min_histogram(dice, compare)
+
     @staticmethod
     def _modify_input_histogram(dice: H, compare: H) -> tuple[H, H]:
         return dice, compare - 1  # type: ignore
@@ -65,7 +101,7 @@ class Lt(BaseCompare):
         return np.minimum(roll_values, (cmp_values - 1))  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class Le(BaseCompare):
     def __str__(self) -> str:
         return f"{self.dice}<={self.compare}"
@@ -80,12 +116,16 @@ class Le(BaseCompare):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice <= compare
 
+    @staticmethod
+    def _limit_histogram(dice: H, compare: H) -> H | None:
+        return _min_histogram(dice, compare)
+
     @staticmethod
     def _with_cap(roll_values: ArrayLike, cmp_values: ArrayLike) -> tuple[ArrayLike, ArrayLike]:
         return np.minimum(roll_values, cmp_values)  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class Gt(BaseCompare):
     def __str__(self) -> str:
         return f"{self.dice}>{self.compare}"
@@ -100,6 +140,10 @@ class Gt(BaseCompare):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice > compare
 
+    @staticmethod
+    def _limit_histogram(dice: H, compare: H) -> H | None:
+        return _max_histogram(dice, compare)
+
     @staticmethod
     def _modify_input_histogram(dice: H, compare: H) -> tuple[H, H]:
         return dice, compare + 1  # type: ignore
@@ -109,7 +153,7 @@ class Gt(BaseCompare):
         return np.maximum(roll_values, (cmp_values + 1))  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class Ge(BaseCompare):
     def __str__(self) -> str:
         return f"{self.dice}>={self.compare}"
@@ -124,6 +168,10 @@ class Ge(BaseCompare):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice >= compare
 
+    @staticmethod
+    def _limit_histogram(dice: H, compare: H) -> H | None:
+        return _max_histogram(dice, compare)
+
     @staticmethod
     def _with_cap(roll_values: ArrayLike, cmp_values: ArrayLike) -> tuple[ArrayLike, ArrayLike]:
         return np.maximum(roll_values, cmp_values)  # type: ignore
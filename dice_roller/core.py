@@ -1,20 +1,197 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from functools import cached_property
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from functools import wraps
 from operator import add
-from typing import Callable, Protocol, runtime_checkable
+from typing import TYPE_CHECKING, Callable, Iterator, Protocol, runtime_checkable
 
 import numpy as np
-from dyce import H
-from dyce.evaluation import expandable
 from numpy.typing import ArrayLike
 
+from .backend import kernels
 from .random import Rng
 
+if TYPE_CHECKING:
+    import os
+    from pathlib import Path
+
+    from dyce import H
+    from dyce.evaluation import HResult
+
+    from .approx import ApproxHistogram
+    from .audit import AuditLog
+    from .keyed import RollKey
+    from .pools import Pool
+    from .profiler import Profiler
+
+# Methods of the dice nodes, which results are computed once per (immutable) node
+_MEMOIZED_METHODS = ("min", "max", "__str__")
+
+
+def _memoized(method):
+    key = f"_memo{method.__name__}"
+
+    @wraps(method)
+    def wrapper(self):
+        cache = self.__dict__
+        if key in cache:
+            return cache[key]
+        value = cache[key] = method(self)
+        return value
+
+    wrapper.__memoized__ = True  # type: ignore
+    return wrapper
+
+
+# Methods of the dice nodes, which are reported to the active profiler
+_PROFILED_METHODS = ("generate", "histogram")
+# Active profiler (see `profiler.dice_profiler`), hooks only check it when profiling is off
+_profiler: Profiler | None = None
+
+
+def _profiled(method):
+    @wraps(method)
+    def wrapper(self, *args):
+        profiler = _profiler
+        if profiler is None:
+            return method(self, *args)
+        return profiler.call(self, method, args)
+
+    wrapper.__profiled__ = True  # type: ignore
+    return wrapper
+
+
+# Depth of the rolls made several times per sample or for a part of the samples: explodes, rerolls, pools, ...
+# Shared nodes (see `shared.Shared`) are rolled independently inside of them
+_inner_depth = 0
+
+
+@contextmanager
+def _inner_rolls() -> Iterator[None]:
+    global _inner_depth
+    _inner_depth += 1
+    try:
+        yield
+    finally:
+        _inner_depth -= 1
+
+
+def _count_loop() -> None:
+    # One iteration of the generate loop (explodes, rerolls, dice amount of dices)
+    if _profiler is not None:
+        _profiler.count_loop()
+
+
+def _histogram_distribution(h: H) -> tuple[np.ndarray, np.ndarray]:
+    outcomes, counts = zip(*h.items())
+    total = sum(counts)
+    # Python integers division keeps precision for huge counts (e.g. deep explodes)
+    return np.array(outcomes, dtype=np.float64), np.array([c / total for c in counts])
+
+
+def _sparse_counts(h: H) -> tuple[np.ndarray, np.ndarray] | None:
+    # Sorted outcomes and their exact counts (object array of Python integers), None for non-integer outcomes
+    # and outcomes out of int64
+    if not h or not all(float(outcome).is_integer() for outcome in h):
+        return None
+    items = sorted((int(outcome), count) for outcome, count in h.items())
+    try:
+        outcomes = np.array([outcome for outcome, _ in items], dtype=np.int64)
+    except OverflowError:
+        return None
+    counts = np.empty(len(items), dtype=object)
+    counts[:] = [count for _, count in items]
+    return outcomes, counts
+
+
+def _cumulative_at(outcomes: np.ndarray, counts: np.ndarray, points: np.ndarray) -> np.ndarray:
+    # Counts of outcomes <= points
+    cumulative = np.concatenate([np.zeros(1, dtype=object), np.cumsum(counts)])
+    return cumulative[np.searchsorted(outcomes, points, side="right")]
+
+
+def _from_sparse(outcomes: np.ndarray, counts: np.ndarray) -> H:
+    from dyce import H
+
+    return H({outcome: count for outcome, count in zip(outcomes.tolist(), counts.tolist()) if count})  # type: ignore
+
+
+# Mean, variance, third and fourth cumulants
+Cumulants = tuple[float, float, float, float]
+
+
+def _distribution_cumulants(values: np.ndarray, probabilities: np.ndarray) -> Cumulants:
+    mean = float(probabilities @ values)
+    centered = values - mean
+    variance = float(probabilities @ centered**2)
+    return mean, variance, float(probabilities @ centered**3), float(probabilities @ centered**4) - 3 * variance**2
+
+
+def _raw_moments(k1: ArrayLike, k2: ArrayLike, k3: ArrayLike, k4: ArrayLike) -> tuple[ArrayLike, ...]:
+    return (
+        k1,
+        k2 + k1**2,  # type: ignore
+        k3 + 3 * k1 * k2 + k1**3,  # type: ignore
+        k4 + 4 * k3 * k1 + 3 * k2**2 + 6 * k2 * k1**2 + k1**4,  # type: ignore
+    )
+
+
+def _from_raw_moments(m1: float, m2: float, m3: float, m4: float) -> Cumulants:
+    return (
+        m1,
+        m2 - m1**2,
+        m3 - 3 * m1 * m2 + 2 * m1**3,
+        m4 - 4 * m3 * m1 - 3 * m2**2 + 12 * m2 * m1**2 - 6 * m1**4,
+    )
+
+
+def _child_nodes(dice: BaseDice) -> Iterator[BaseDice]:
+    for f in fields(dice):  # type: ignore
+        value = getattr(dice, f.name)
+        if isinstance(value, BaseDice):
+            yield value
+        elif isinstance(value, tuple):
+            yield from (i for i in value if isinstance(i, BaseDice))
+
 
 @runtime_checkable
 class BaseDice(Protocol):
+    # Dice nodes are frozen dataclasses. Bounds, string and structural hash are memoized on the node,
+    # so nested expressions don't recompute them recursively on every call.
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in _MEMOIZED_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "__memoized__", False):
+                setattr(cls, name, _memoized(method))
+        for name in _PROFILED_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "__profiled__", False):
+                setattr(cls, name, _profiled(method))
+
+    # Identity
+
+    def _key(self) -> tuple:
+        return (type(self), *(getattr(self, f.name) for f in fields(self) if f.compare))  # type: ignore
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        return self._key() == other._key()  # type: ignore
+
+    @_memoized
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __reduce_ex__(self, protocol):
+        # Trees are pickled in compact encoding (see `serialization`), unless they hold custom callables
+        from .serialization import _reduce
+
+        return _reduce(self) or super().__reduce_ex__(protocol)
 
     # Interface methods
 
@@ -34,6 +211,61 @@ class BaseDice(Protocol):
     def roll(self) -> int:
         return np.sum(self.generate(1))
 
+    def generate_to(self, path: str | os.PathLike, items: int, **kwargs) -> Path:
+        from .bulk import generate_to
+
+        return generate_to(self, path, items, **kwargs)
+
+    def generate_blocked(self, items: int, **kwargs) -> np.ndarray:
+        from .bulk import generate_blocked
+
+        return generate_blocked(self, items, **kwargs)
+
+    def generate_range(self, start: int, stop: int, key: RollKey | int, **kwargs) -> np.ndarray:
+        from .keyed import generate_range
+
+        return generate_range(self, start, stop, key, **kwargs)
+
+    # Statistics
+
+    @_memoized
+    def cumulants(self) -> Cumulants:
+        """
+        First four cumulants of the outcome: mean, variance, third central moment and fourth cumulant.
+
+        Calculated analytically where dice provides closed form (see `_cumulants`), otherwise from the histogram.
+        """
+        closed_form = self._cumulants()
+        if closed_form is not None:
+            return closed_form
+        return _distribution_cumulants(*_histogram_distribution(self.histogram()))
+
+    def _cumulants(self) -> Cumulants | None:
+        return None
+
+    def mean(self) -> float:
+        return self.cumulants()[0]
+
+    def variance(self) -> float:
+        return self.cumulants()[1]
+
+    def stdev(self) -> float:
+        return self.variance() ** 0.5
+
+    def skewness(self) -> float:
+        _, variance, third, _ = self.cumulants()
+        return third / variance**1.5 if variance > 0 else 0.0
+
+    def kurtosis(self) -> float:
+        # Excess kurtosis
+        _, variance, _, fourth = self.cumulants()
+        return fourth / variance**2 if variance > 0 else 0.0
+
+    def approx_histogram(self, method: str = "auto", **kwargs) -> ApproxHistogram:
+        from .approx import approx_histogram
+
+        return approx_histogram(self, method, **kwargs)
+
     # Modifiers
 
     def kh(self, keep: BaseDice | int = 1) -> BaseDice:
@@ -56,6 +288,14 @@ class BaseDice(Protocol):
 
         return DropLowest(self, drop=drop)  # type: ignore
 
+    def shared(self, name: str = "") -> BaseDice:
+        from .shared import Shared
+
+        return Shared(self, name)
+
+    def audit(self, log: AuditLog, label: str | None = None) -> BaseDice:
+        return log.wrap(self, label)
+
     @property
     def r(self):
         return self.reroll()
@@ -194,11 +434,13 @@ class BaseDice(Protocol):
     __rfloordiv__ = __rtruediv__  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class Scalar(BaseDice):
     value: int
 
     def histogram(self) -> H:
+        from dyce import H
+
         return H([self.value])  # type: ignore
 
     def __str__(self) -> str:
@@ -210,16 +452,28 @@ class Scalar(BaseDice):
     def min(self) -> int:
         return self.value
 
+    def _cumulants(self) -> Cumulants:
+        return float(self.value), 0.0, 0.0, 0.0
+
     def generate(self, items: int) -> ArrayLike:
         return np.full(items, self.value)
 
 
-@dataclass(slots=True)
+def _generate_operand(dice: BaseDice, items: int) -> ArrayLike | int:
+    # Constant operands are left to numpy broadcasting instead of materializing `items`-long array
+    if isinstance(dice, Scalar):
+        return dice.value
+    return dice.generate(items)
+
+
+@dataclass(slots=True, frozen=True, eq=False)
 class Dice(BaseDice):
     sides: int
     minimal: int = field(default=1)
 
     def histogram(self) -> H:
+        from dyce import H
+
         return H(range(self.minimal, self.sides + 1))  # type: ignore
 
     def __str__(self) -> str:
@@ -233,22 +487,27 @@ class Dice(BaseDice):
     def min(self) -> int:
         return self.minimal
 
+    def _cumulants(self) -> Cumulants:
+        sides = self.sides - self.minimal + 1
+        return (self.minimal + self.sides) / 2, (sides**2 - 1) / 12, 0.0, -(sides**4 - 1) / 120
+
     def generate(self, items: int) -> ArrayLike:
         return Rng().rng.integers(low=self.minimal, high=self.sides + 1, size=items)
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class RangeDice(BaseDice):
     min_value: int
     max_value: int
     step_value: int = field(default=1)
 
-    @cached_property
-    def __range(self):
+    def _range(self) -> range:
         return range(self.min_value, self.max_value, self.step_value)
 
     def histogram(self) -> H:
-        return H(list(self.__range))  # type: ignore
+        from dyce import H
+
+        return H(list(self._range()))  # type: ignore
 
     def __str__(self) -> str:
         if self.step_value == 1:
@@ -256,20 +515,140 @@ class RangeDice(BaseDice):
         return f"rng({self.min_value},{self.max_value},{self.step_value})"
 
     def max(self) -> int:
-        # Calculate the number of steps
-        num_steps = (self.max_value - self.min_value - 1) // self.step_value + 1
-        # Calculate the actual max value in the range
-        actual_max = self.min_value + (num_steps - 1) * self.step_value
-        return actual_max
+        values = self._range()
+        return max(values[0], values[-1])
 
     def min(self) -> int:
-        return self.min_value
+        values = self._range()
+        return min(values[0], values[-1])
+
+    def _cumulants(self) -> Cumulants:
+        sides = len(self._range())
+        return (
+            self.min_value + self.step_value * (sides - 1) / 2,
+            self.step_value**2 * (sides**2 - 1) / 12,
+            0.0,
+            -(self.step_value**4) * (sides**4 - 1) / 120,
+        )
 
     def generate(self, items: int) -> ArrayLike:
-        return Rng().rng.choice(self.__range, size=items, replace=True)
+        # Arithmetic instead of choice over materialized range
+        sides = len(self._range())
+        return self.min_value + self.step_value * Rng().rng.integers(low=0, high=sides, size=items)
+
+
+def _alias_table(weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Vose's alias method: column `i` keeps `i` with `probability[i]`, otherwise gives `alias[i]`
+    sides = len(weights)
+    scaled = weights * sides / weights.sum()
+    probability = np.ones(sides)
+    alias = np.arange(sides)
+    small = [i for i in range(sides) if scaled[i] < 1]
+    large = [i for i in range(sides) if scaled[i] >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probability[less], alias[less] = scaled[less], more
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+    return probability, alias
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class FacesDice(BaseDice):
+    """
+    Dice with arbitrary faces, all equally likely (faces may repeat, e.g. `(0, 0, 1, 1, 2, 3)`).
+    """
+
+    faces: tuple[int, ...]
+    _values: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        faces = tuple(int(face) for face in self.faces)
+        if not faces:
+            raise ValueError("Dice suppose to have at least one face")
+        object.__setattr__(self, "faces", faces)
+        object.__setattr__(self, "_values", np.array(faces, dtype=np.int_))
+
+    def histogram(self) -> H:
+        from dyce import H
+
+        return H(self.faces)  # type: ignore
+
+    def __str__(self) -> str:
+        return "d{" + ",".join(str(face) for face in self.faces) + "}"
+
+    def max(self) -> int:
+        return max(self.faces)
+
+    def min(self) -> int:
+        return min(self.faces)
 
+    def _cumulants(self) -> Cumulants:
+        return _distribution_cumulants(self._values.astype(np.float64), np.full(len(self.faces), 1 / len(self.faces)))
 
-@dataclass(slots=True)
+    def generate(self, items: int) -> ArrayLike:
+        return self._values[Rng().rng.integers(low=0, high=len(self._values), size=items)]
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class WeightedDice(BaseDice):
+    """
+    Dice with faces rolled proportionally to their (positive integer) weights. Sampling uses the alias table,
+    so rolling costs the same for any amount of faces.
+    """
+
+    faces: tuple[int, ...]
+    weights: tuple[int, ...]
+    _values: np.ndarray = field(init=False, repr=False, compare=False)
+    _probability: np.ndarray = field(init=False, repr=False, compare=False)
+    _alias: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        faces = tuple(int(face) for face in self.faces)
+        weights = tuple(self.weights)
+        if not faces or len(faces) != len(weights):
+            raise ValueError("Dice suppose to have at least one face and one weight for each face")
+        if any(not isinstance(weight, (int, np.integer)) or weight <= 0 for weight in weights):
+            raise ValueError(f"Weights suppose to be positive integers, not {weights}")
+        object.__setattr__(self, "faces", faces)
+        object.__setattr__(self, "weights", tuple(int(weight) for weight in weights))
+        object.__setattr__(self, "_values", np.array(faces, dtype=np.int_))
+        probability, alias = _alias_table(np.array(self.weights, dtype=np.float64))
+        object.__setattr__(self, "_probability", probability)
+        object.__setattr__(self, "_alias", alias)
+
+    def histogram(self) -> H:
+        from dyce import H
+
+        counts: dict[int, int] = {}
+        for face, weight in zip(self.faces, self.weights):
+            counts[face] = counts.get(face, 0) + weight
+        return H(counts)  # type: ignore
+
+    def __str__(self) -> str:
+        return "d{" + ",".join(f"{face}:{weight}" for face, weight in zip(self.faces, self.weights)) + "}"
+
+    def max(self) -> int:
+        return max(self.faces)
+
+    def min(self) -> int:
+        return min(self.faces)
+
+    def probabilities(self) -> np.ndarray:
+        weights = np.array(self.weights, dtype=np.float64)
+        return weights / weights.sum()
+
+    def _cumulants(self) -> Cumulants:
+        return _distribution_cumulants(self._values.astype(np.float64), self.probabilities())
+
+    def generate(self, items: int) -> ArrayLike:
+        rng = Rng().rng
+        column = rng.integers(low=0, high=len(self._values), size=items)
+        kept = rng.random(items) < self._probability[column]
+        return self._values[np.where(kept, column, self._alias[column])]
+
+
+@dataclass(slots=True, frozen=True, eq=False)
 class DiceMany(BaseDice):
     total: BaseDice
     dice: BaseDice
@@ -277,7 +656,14 @@ class DiceMany(BaseDice):
     _neutral_element: int = 0
 
     def histogram(self) -> H:
-        many = expandable(lambda total, dice: total.outcome @ dice.h)
+        from dyce import H
+        from dyce.evaluation import expandable
+
+        @expandable
+        def many(total: HResult, dice: HResult):
+            # dyce gives empty histogram for zero dices
+            return total.outcome @ dice.h if total.outcome > 0 else H({self._neutral_element: 1})  # type: ignore
+
         return many(self.total.histogram(), self.dice.histogram())
 
     def __str__(self) -> str:
@@ -289,22 +675,70 @@ class DiceMany(BaseDice):
     def min(self) -> int:
         return self.dice.min() * self.total.min()
 
+    def _cumulants(self) -> Cumulants | None:
+        if self._operator is not add:
+            return None
+        # Compound sum of the `total` i.i.d. dice: K_S(t) = K_N(K_X(t)), derivatives at 0 (Wald's identity for mean)
+        n1, n2, n3, n4 = self.total.cumulants()
+        x1, x2, x3, x4 = self.dice.cumulants()
+        return (
+            self._neutral_element + n1 * x1,
+            n1 * x2 + n2 * x1**2,
+            n1 * x3 + 3 * n2 * x1 * x2 + n3 * x1**3,
+            n1 * x4 + n2 * (3 * x2**2 + 4 * x1 * x3) + 6 * n3 * x1**2 * x2 + n4 * x1**4,
+        )
+
     def generate(self, items: int) -> ArrayLike:
+        if isinstance(self.total, Scalar):
+            return self._generate_fixed(items, self.total.value)
+
         total_rolls = self.total.generate(items)
+        if self._operator is add:
+            # All dices are rolled at once and summed by segments
+            counts = np.maximum(np.asarray(total_rolls), 0).astype(np.int_)
+            with _inner_rolls():
+                rolls = np.asarray(self.dice.generate(int(counts.sum())), dtype=np.int_)
+            return kernels().segment_sum(rolls, counts) + self._neutral_element
+
         max_rolls = np.max(total_rolls)
         result = np.full(items, self._neutral_element, dtype=np.int_)
 
         for roll_count in range(1, max_rolls + 1):
+            _count_loop()
             mask = total_rolls >= roll_count  # type: ignore
             num_items_this_round = np.sum(mask)
             # If no items require processing, exit the loop early
             if num_items_this_round == 0:
                 break
             # Generate and sum the dice rolls for items requiring them
-            result[mask] = self._operator(result[mask], self.dice.generate(num_items_this_round))
+            with _inner_rolls():
+                rolls = self.dice.generate(num_items_this_round)
+            result[mask] = self._operator(result[mask], rolls)
 
         return result
 
+    def pool(self) -> Pool:
+        """
+        Same dices as a pool: kept separate for counting successes, sets, ... (see `pools.Pool`).
+        """
+        from .pools import Pool
+
+        return Pool(self.total, self.dice)
+
+    def _generate_fixed(self, items: int, total: int) -> ArrayLike:
+        # Same amount of dice for each item: roll all of them at once and reduce row by row
+        if total <= 0:
+            return np.full(items, self._neutral_element, dtype=np.int_)
+        with _inner_rolls():
+            rolls = np.reshape(self.dice.generate(items * total), (total, items))
+        if self._operator is add:
+            return rolls.sum(axis=0) + self._neutral_element
+        result = np.full(items, self._neutral_element, dtype=np.int_)
+        for row in rolls:
+            _count_loop()
+            result = self._operator(result, row)
+        return result
+
 
 def many(
     total: int | BaseDice,
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import math
+from contextlib import nullcontext
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Protocol
+
+import numpy as np
+
+from .core import BaseDice
+from .random import use_rng
+
+# Outcome spans up to this size are counted in dense array, wider ones in dict
+_MAX_DENSE_SPAN = 1 << 22
+
+
+class _Tally:
+    """
+    Counts of the generated outcomes.
+    """
+
+    def __init__(self, low: int, high: int) -> None:
+        # Bounds of the dice only size the dense counts, rolls outside of them grow the counts
+        self.samples = 0
+        self.offset = low
+        self.dense = np.zeros(max(high - low + 1, 0), dtype=np.int64) if high - low < _MAX_DENSE_SPAN else None
+        self.sparse: dict[int, int] = {}
+
+    def _grow(self, low: int, high: int) -> None:
+        low, high = min(low, self.offset), max(high, self.offset + len(self.dense) - 1)  # type: ignore
+        if high - low >= _MAX_DENSE_SPAN:
+            outcomes, counts = self.distribution()
+            self.sparse = dict(zip(outcomes.tolist(), counts.tolist()))
+            self.dense = None
+            return
+        dense = np.zeros(high - low + 1, dtype=np.int64)
+        dense[self.offset - low : self.offset - low + len(self.dense)] = self.dense  # type: ignore
+        self.offset, self.dense = low, dense
+
+    def add(self, rolls: np.ndarray) -> None:
+        if self.dense is not None and len(rolls):
+            low, high = int(rolls.min()), int(rolls.max())
+            if low < self.offset or high >= self.offset + len(self.dense):
+                self._grow(low, high)
+        self.samples += len(rolls)
+        if self.dense is not None:
+            self.dense += np.bincount(rolls - self.offset, minlength=len(self.dense))
+            return
+        for outcome, count in zip(*np.unique(rolls, return_counts=True)):
+            self.sparse[int(outcome)] = self.sparse.get(int(outcome), 0) + int(count)
+
+    def distribution(self) -> tuple[np.ndarray, np.ndarray]:
+        # Outcomes (ascending) and their counts
+        if self.dense is not None:
+            (present,) = np.nonzero(self.dense)
+            return present + self.offset, self.dense[present]
+        outcomes = np.array(sorted(self.sparse), dtype=np.int64)
+        return outcomes, np.array([self.sparse[o] for o in outcomes], dtype=np.int64)
+
+
+class Query(Protocol):
+    def interval(self, tally: _Tally, z: float) -> tuple[float, float, float]:
+        """
+        Estimate with lower and upper confidence bounds
+        """
+        ...
+
+
+@dataclass(slots=True, frozen=True)
+class Mean:
+    def interval(self, tally: _Tally, z: float) -> tuple[float, float, float]:
+        outcomes, counts = tally.distribution()
+        mean = float(counts @ outcomes) / tally.samples
+        variance = float(counts @ (outcomes - mean) ** 2) / max(tally.samples - 1, 1)
+        half_width = z * math.sqrt(variance / tally.samples)
+        return mean, mean - half_width, mean + half_width
+
+
+@dataclass(slots=True, frozen=True)
+class AtLeast:
+    """
+    Probability P(X >= value).
+    """
+
+    value: int
+
+    def interval(self, tally: _Tally, z: float) -> tuple[float, float, float]:
+        outcomes, counts = tally.distribution()
+        n = tally.samples
+        p = float(counts[outcomes >= self.value].sum()) / n
+        # Wilson score interval, stays sensible for probabilities close to 0 or 1
+        center = (p + z**2 / (2 * n)) / (1 + z**2 / n)
+        half_width = z * math.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / (1 + z**2 / n)
+        return p, max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+
+@dataclass(slots=True, frozen=True)
+class Quantile:
+    q: float
+
+    def __post_init__(self):
+        if not 0 < self.q < 1:
+            raise ValueError(f"Quantile suppose to be in (0, 1), not {self.q}")
+
+    def interval(self, tally: _Tally, z: float) -> tuple[float, float, float]:
+        outcomes, counts = tally.distribution()
+        cumulative = np.cumsum(counts)
+        n = tally.samples
+
+        def at_rank(rank: float) -> float:
+            rank = min(max(rank, 1), n)
+            return float(outcomes[np.searchsorted(cumulative, rank)])
+
+        # Distribution-free interval: ranks of the order statistics around n*q
+        spread = z * math.sqrt(n * self.q * (1 - self.q))
+        return at_rank(math.ceil(n * self.q)), at_rank(math.floor(n * self.q - spread)), at_rank(math.ceil(n * self.q + spread))
+
+
+@dataclass(slots=True, frozen=True)
+class Estimate:
+    value: float
+    low: float
+    high: float
+    samples: int
+    # Target precision was reached before `max_samples`
+    converged: bool
+
+    @property
+    def half_width(self) -> float:
+        return max(self.value - self.low, self.high - self.value)
+
+
+def estimate(
+    dice: BaseDice,
+    query: Query | None = None,
+    *,
+    rel_err: float | None = None,
+    abs_err: float | None = None,
+    max_samples: int = 10_000_000,
+    confidence: float = 0.95,
+    batch_size: int = 10_000,
+    seed: int | None = None,
+) -> Estimate:
+    """
+    Estimate `query` (`Mean()` by default, `AtLeast(k)` or `Quantile(q)`) of the dice by simulation.
+
+    Rolls are generated in growing batches (starting from `batch_size`, doubling), sampling stops as soon as
+    the confidence interval half-width is within `abs_err` or within `rel_err` of the estimate, or when
+    `max_samples` rolls were generated.
+    """
+    if rel_err is None and abs_err is None:
+        raise ValueError("At least one of 'rel_err' and 'abs_err' is required")
+    query = query if query is not None else Mean()
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    tally = _Tally(dice.min(), dice.max())
+
+    with use_rng(seed) if seed is not None else nullcontext():
+        batch = batch_size
+        while True:
+            batch = min(batch, max_samples - tally.samples)
+            tally.add(np.asarray(dice.generate(batch)))
+            value, low, high = query.interval(tally, z)
+            half_width = max(value - low, high - value)
+            target = max(abs_err or 0.0, (rel_err or 0.0) * abs(value))
+            if half_width <= target or tally.samples >= max_samples:
+                return Estimate(value, low, high, tally.samples, half_width <= target)
+            batch *= 2
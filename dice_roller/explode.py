@@ -1,17 +1,33 @@
+from __future__ import annotations
+
 from dataclasses import dataclass, field
 from functools import partial
-from typing import Protocol
+from typing import TYPE_CHECKING, Protocol
 
 import numpy as np
-from dyce import H
-from dyce.evaluation import HResult, expandable
 from numpy.typing import ArrayLike
 
-from .core import BaseDice
+from .backend import kernels
+from .core import (
+    BaseDice,
+    Scalar,
+    Cumulants,
+    _count_loop,
+    _distribution_cumulants,
+    _from_raw_moments,
+    _generate_operand,
+    _histogram_distribution,
+    _inner_rolls,
+    _raw_moments,
+)
 from .misc import DiceModifier, _wrap_scalar
 
+if TYPE_CHECKING:
+    from dyce import H
+    from dyce.evaluation import HResult
+
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class BaseExplode(BaseDice, Protocol):
     dice: BaseDice
     compare: BaseDice
@@ -24,6 +40,8 @@ class BaseExplode(BaseDice, Protocol):
     def _calculate_explode_mask(roll_values: ArrayLike, cmp_values: ArrayLike) -> ArrayLike: ...
 
     def histogram(self) -> H:
+        from dyce.evaluation import expandable
+
         dice_hist = self.dice.histogram()
 
         @expandable(sentinel=dice_hist)
@@ -42,26 +60,53 @@ class BaseExplode(BaseDice, Protocol):
     def min(self) -> int:
         return self.dice.min()
 
+    def _cumulants(self) -> Cumulants | None:
+        if not isinstance(self.compare, Scalar):
+            return None
+
+        outcomes, probabilities = _histogram_distribution(self.dice.histogram())
+        mask = np.asarray(self._calculate_explode_mask(outcomes, self.compare.value), dtype=bool)
+        p = float(probabilities[mask].sum())
+        rolled = np.array(_distribution_cumulants(outcomes, probabilities))
+        if p == 0:
+            return tuple(rolled)  # type: ignore
+        exploded = np.array(_distribution_cumulants(outcomes[mask], probabilities[mask] / p))
+
+        # Mixture over amount of explosions: k explosions followed by non-exploding roll with probability p^k * (1 - p),
+        # or `explode_depth - 1` explosions followed by the last (any) roll.
+        depth = self.explode_depth - 1
+        raw = p**depth * np.array(_raw_moments(*(depth * exploded + rolled)))
+        if p < 1:
+            stopped = np.array(_distribution_cumulants(outcomes[~mask], probabilities[~mask] / (1 - p)))
+            explosions = np.arange(depth)
+            weights = p**explosions * (1 - p)
+            cumulants = explosions[:, None] * exploded + stopped
+            raw += weights @ np.column_stack(_raw_moments(*cumulants.T))
+        return _from_raw_moments(*(float(m) for m in raw))
+
     def generate(self, items: int) -> ArrayLike:
-        results = np.zeros(items, dtype=np.int_)
-        current_rolls = self.dice.generate(items)
+        # All rolls inside are independent of shared nodes
+        with _inner_rolls():
+            results = np.array(self.dice.generate(items), dtype=np.int_)
+            # Items rolled in the last round and their rolls, only they can explode further
+            rolled, current_rolls = np.arange(items), results
 
-        for _ in range(self.explode_depth + 1):
-            results += current_rolls  # type: ignore
-            compare_rolls = self.compare.generate(items)
-            explode_mask = self._calculate_explode_mask(current_rolls, compare_rolls)
+            for _ in range(self.explode_depth - 1):
+                _count_loop()
+                compare_rolls = _generate_operand(self.compare, len(rolled))
+                explode_mask = np.asarray(self._calculate_explode_mask(current_rolls, compare_rolls), dtype=bool)
 
-            if not np.any(explode_mask):
-                break  # Exit if no dice explode in this iteration
+                if not np.any(explode_mask):
+                    break  # Exit if no dice explode in this iteration
 
-            # Calculate how many dice need to be rerolled based on the explode_mask
-            current_rolls = np.zeros(items, dtype=np.int_)
-            current_rolls[explode_mask] = self.dice.generate(np.sum(explode_mask))  # type: ignore
+                rolled = rolled[explode_mask]
+                current_rolls = np.asarray(self.dice.generate(len(rolled)), dtype=np.int_)
+                kernels().scatter_add(results, rolled, current_rolls)
 
-        return results
+            return results
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class ExplodeEq(BaseExplode):
     def __str__(self) -> str:
         return f"{self.dice}x{self.compare}"
@@ -75,7 +120,7 @@ class ExplodeEq(BaseExplode):
         return roll_values == cmp_values
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class ExplodeIfGreater(BaseExplode):
 
     def __str__(self) -> str:
@@ -90,7 +135,7 @@ class ExplodeIfGreater(BaseExplode):
         return roll_values > cmp_values  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class ExplodeIfGreaterOrEq(BaseExplode):
     def __str__(self) -> str:
         return f"{self.dice}x>={self.compare}"
@@ -104,7 +149,7 @@ class ExplodeIfGreaterOrEq(BaseExplode):
         return roll_values >= cmp_values  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class ExplodeIfLess(BaseExplode):
     def __str__(self) -> str:
         return f"{self.dice}x<{self.compare}"
@@ -118,7 +163,7 @@ class ExplodeIfLess(BaseExplode):
         return roll_values < cmp_values  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class ExplodeIfLessOrEq(BaseExplode):
     def __str__(self) -> str:
         return f"{self.dice}x<={self.compare}"
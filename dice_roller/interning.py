@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from dataclasses import fields, replace
+from typing import TypeVar
+from weakref import WeakValueDictionary
+
+from .core import BaseDice
+
+T = TypeVar("T", bound=BaseDice)
+
+_INTERNED = "_interned"
+
+# Structural key (type and already interned children) -> canonical node.
+# Entries are dropped as soon as the canonical node is not referenced anymore.
+_table: WeakValueDictionary[tuple, BaseDice] = WeakValueDictionary()
+
+
+def _is_dice(value) -> bool:
+    # All nodes subclass BaseDice explicitly, MRO lookup is much cheaper than the protocol isinstance check
+    return BaseDice in type(value).__mro__
+
+
+def _intern_value(value):
+    if _is_dice(value):
+        return intern(value)
+    if isinstance(value, tuple) and any(_is_dice(i) for i in value):
+        return tuple(_intern_value(i) for i in value)
+    return value
+
+
+def intern(dice: T) -> T:
+    """
+    Return canonical instance of the dice expression.
+
+    Structurally equal expressions (and all of their equal subexpressions) are interned into the same
+    objects, so they share memoized bounds, strings and hashes, and can be compared by identity.
+    """
+    if dice.__dict__.get(_INTERNED, False):
+        return dice
+
+    changes = {}
+    for f in fields(dice):  # type: ignore
+        if not f.init:
+            continue
+        value = getattr(dice, f.name)
+        interned = _intern_value(value)
+        if interned is not value:
+            changes[f.name] = interned
+    if changes:
+        dice = replace(dice, **changes)  # type: ignore
+
+    canonical = _table.setdefault(dice._key(), dice)
+    canonical.__dict__[_INTERNED] = True
+    return canonical  # type: ignore
+
+
+def interned_count() -> int:
+    return len(_table)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .bulk import _check_dtype
+from .core import BaseDice
+from .random import use_rng
+
+# Samples of one counter block. Part of the key: the same key with other block size gives other rolls
+KEYED_BLOCK_SIZE = 1 << 16
+
+_MAX_WORD = (1 << 64) - 1
+
+
+@dataclass(slots=True, frozen=True)
+class RollKey:
+    """
+    Key of the counter-based (Philox) roll sequence: `seed` and `stream` are the Philox key, so different streams
+    of one seed are independent sequences (e.g. one per session, table or machine).
+    """
+
+    seed: int
+    stream: int = 0
+
+    def __post_init__(self):
+        for name in ("seed", "stream"):
+            value = getattr(self, name)
+            if not 0 <= value <= _MAX_WORD:
+                raise ValueError(f"'{name}' suppose to be in 0..2**64-1, not {value}")
+
+    def generator(self, block: int) -> np.random.Generator:
+        # Every block starts at its own point of the counter space, 2**192 draws apart
+        key = np.array([self.seed, self.stream], dtype=np.uint64)
+        counter = np.array([0, 0, 0, block], dtype=np.uint64)
+        return np.random.Generator(np.random.Philox(key=key, counter=counter))
+
+
+def generate_range(
+    dice: BaseDice,
+    start: int,
+    stop: int,
+    key: RollKey | int | np.integer,
+    *,
+    block_size: int = KEYED_BLOCK_SIZE,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Samples `start..stop` of the keyed roll sequence of the dice.
+
+    Sequence is split into blocks of `block_size` samples, every block is rolled with its own Philox generator,
+    positioned by the block number. So any range (a shard of the big simulation, a single audited roll) gives
+    exactly the samples of the full `generate_range(dice, 0, n, key)` run, in O(stop - start + block_size) time.
+    Integer `key` is a seed of the stream 0.
+    """
+    if isinstance(key, (int, np.integer)):
+        key = RollKey(int(key))
+    elif not isinstance(key, RollKey):
+        raise TypeError(f"'key' suppose to be RollKey or integer seed, not {type(key).__name__}")
+    if not 0 <= start <= stop:
+        raise ValueError(f"'start' and 'stop' suppose to be 0 <= start <= stop, not {start}, {stop}")
+    if block_size <= 0:
+        raise ValueError(f"'block_size' suppose to be positive, not {block_size}")
+    if out is None:
+        out = np.empty(stop - start, dtype=np.int64)
+    elif out.shape != (stop - start,):
+        raise ValueError(f"'out' suppose to be array of shape ({stop - start},), not {out.shape}")
+    _check_dtype(dice, out.dtype)
+
+    for block in range(start // block_size, -(-stop // block_size)):
+        block_start = block * block_size
+        with use_rng(key.generator(block)):
+            rolls = np.asarray(dice.generate(block_size))
+        low, high = max(start, block_start), min(stop, block_start + block_size)
+        out[low - start : high - start] = rolls[low - block_start : high - block_start]
+    return out
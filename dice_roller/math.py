@@ -1,13 +1,18 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 import numpy as np
-from dyce import H
 from numpy.typing import ArrayLike
 
-from .core import BaseDice
+from .core import BaseDice, Cumulants, Scalar, _from_raw_moments, _generate_operand, _raw_moments
+
+if TYPE_CHECKING:
+    from dyce import H
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class DiceAdd(BaseDice):
     items: tuple[BaseDice, ...]
 
@@ -23,14 +28,29 @@ class DiceAdd(BaseDice):
     def min(self) -> int:
         return np.sum([i.min() for i in self.items])
 
+    def _cumulants(self) -> Cumulants:
+        # Cumulants of independent summands are additive
+        return tuple(float(k) for k in np.sum([i.cumulants() for i in self.items], axis=0))  # type: ignore
+
     def generate(self, items: int) -> ArrayLike:
-        res = np.zeros(items, dtype=np.int_)
+        # Constants are folded together and added once, rolls are accumulated into the first rolled array
+        constant = 0
+        res = None
         for i in self.items:
-            res += i.generate(items)  # type: ignore
+            if isinstance(i, Scalar):
+                constant += i.value
+            elif res is None:
+                res = i.generate(items)
+            else:
+                res += i.generate(items)  # type: ignore
+        if res is None:
+            return np.full(items, constant, dtype=np.int_)
+        if constant:
+            res += constant  # type: ignore
         return res
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class DiceSub(BaseDice):
     items: tuple[BaseDice, ...]
 
@@ -56,14 +76,22 @@ class DiceSub(BaseDice):
         min_value = min_first_item - sum_of_max_of_others
         return min_value
 
+    def _cumulants(self) -> Cumulants:
+        # Negation flips the sign of odd cumulants
+        k1, k2, k3, k4 = self.items[0].cumulants()
+        for i in self.items[1:]:
+            i1, i2, i3, i4 = i.cumulants()
+            k1, k2, k3, k4 = k1 - i1, k2 + i2, k3 - i3, k4 + i4
+        return k1, k2, k3, k4
+
     def generate(self, items: int) -> ArrayLike:
         result = self.items[0].generate(items)
         for item in self.items[1:]:
-            result -= item.generate(items)  # type: ignore
+            result -= _generate_operand(item, items)  # type: ignore
         return result
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class DiceMul(BaseDice):
     items: tuple[BaseDice, ...]
 
@@ -76,52 +104,82 @@ class DiceMul(BaseDice):
     def __str__(self) -> str:
         return "(" + " * ".join(str(i) for i in self.items) + ")"
 
+    def _bounds(self) -> tuple[int, int]:
+        # Interval product: negative factors swap the bounds, so every pair of bounds is a candidate
+        low, high = int(self.items[0].min()), int(self.items[0].max())
+        for i in self.items[1:]:
+            products = [low * int(i.min()), low * int(i.max()), high * int(i.min()), high * int(i.max())]
+            low, high = min(products), max(products)
+        return low, high
+
     def max(self) -> int:
-        # Calculate the maximum possible outcome by multiplying the maximum values of all included dice.
-        return int(np.prod([i.max() for i in self.items]))
+        return self._bounds()[1]
 
     def min(self) -> int:
-        # Calculate the minimum possible outcome by multiplying the minimum values of all included dice.
-        return int(np.prod([i.min() for i in self.items]))
+        return self._bounds()[0]
+
+    def _cumulants(self) -> Cumulants:
+        # Raw moments of independent factors are multiplicative
+        moments = np.prod([_raw_moments(*i.cumulants()) for i in self.items], axis=0)
+        return _from_raw_moments(*(float(m) for m in moments))
 
     def generate(self, items: int) -> ArrayLike:
-        res = np.ones(items, dtype=np.int_)
+        # Constants are folded together and applied once, rolls are accumulated into the first rolled array
+        constant = 1
+        res = None
         for i in self.items:
-            res *= i.generate(items)  # type: ignore
+            if isinstance(i, Scalar):
+                constant *= i.value
+            elif res is None:
+                res = i.generate(items)
+            else:
+                res *= i.generate(items)  # type: ignore
+        if res is None:
+            return np.full(items, constant, dtype=np.int_)
+        if constant != 1:
+            res *= constant  # type: ignore
         return res
 
 
-@dataclass(slots=True)
+def _floordiv(left: int, right: int) -> int:
+    return left // right if right else 0
+
+
+@dataclass(slots=True, frozen=True, eq=False)
 class DiceDiv(BaseDice):
     items: tuple[BaseDice, ...]
 
     def histogram(self) -> H:
+        # Floor division as in `generate`, including 0 for zero divisor (numpy)
         result = self.items[0].histogram()
         for i in self.items[1:]:
-            result /= i.histogram()  # type: ignore
+            result = result.map(_floordiv, i.histogram())  # type: ignore
         return result  # type: ignore
 
     def __str__(self) -> str:
         return "(" + " / ".join(str(i) for i in self.items) + ")"
 
+    def _bounds(self) -> tuple[int, int]:
+        # Floor division is monotonic in the divisor on each side of zero, so the extremes are at the bounds of
+        # the dividend and the divisor values closest to and farthest from zero. Division by zero gives 0 (numpy)
+        low, high = int(self.items[0].min()), int(self.items[0].max())
+        for i in self.items[1:]:
+            divisor_low, divisor_high = int(i.min()), int(i.max())
+            divisors = [d for d in (divisor_low, -1, 1, divisor_high) if d and divisor_low <= d <= divisor_high]
+            quotients = [x // d for x in (low, high) for d in divisors]
+            if divisor_low <= 0 <= divisor_high:
+                quotients.append(0)
+            low, high = min(quotients), max(quotients)
+        return low, high
+
     def max(self) -> int:
-        # Divide the max value of the first item by the product of min values of the rest.
-        numerator = self.items[0].max()
-        # Calculate the product of min values for the rest of the items.
-        denominators_product = np.prod([i.min() for i in self.items[1:]])
-        # Perform division, ensuring no division by zero.
-        return int(numerator // denominators_product if denominators_product else 0)
+        return self._bounds()[1]
 
     def min(self) -> int:
-        # Divide the min value of the first item by the product of max values of the rest.
-        numerator = self.items[0].min()
-        # Calculate the product of max values for the rest of the items.
-        denominators_product = np.prod([i.max() for i in self.items[1:]])
-        # Perform division, ensuring no division by zero.
-        return int(numerator // denominators_product if denominators_product else 0)
+        return self._bounds()[0]
 
     def generate(self, items: int) -> ArrayLike:
         result = self.items[0].generate(items)
         for item in self.items[1:]:
-            result //= item.generate(items)  # type: ignore
+            result //= _generate_operand(item, items)  # type: ignore
         return result
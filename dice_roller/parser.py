@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+from .core import BaseDice, Dice, FacesDice, RangeDice, Scalar, WeightedDice
+from .interning import intern
+
+PARSE_CACHE_SIZE = 1024
+
+_TOKEN = re.compile(r"\d+|kh|kl|dh|dl|rng|to|>=|<=|[dfkxr!%<>()\[\]{}+\-*/,:]")
+
+
+def normalize(notation: str) -> str:
+    return "".join(notation.split()).lower()
+
+
+class _Parser:
+    """
+    Recursive descent parser for the dice notation.
+
+    expr     := term (('+' | '-') term)*
+    term     := unary (('*' | '/') unary)*
+    unary    := '-' unary | postfix
+    postfix  := primary (dice | rng | keep | drop | explode | reroll | limit)*
+    primary  := INT | dice | rng | '(' expr ')'
+    dice     := 'd' (INT | '%' | 'f' | '[' ['-'] INT 'to' ['-'] INT ']' | '{' face (',' face)* '}')
+    face     := ['-'] INT [':' INT]
+    keep     := ('kh' | 'kl' | 'k') [operand]
+    drop     := ('dh' | 'dl') [operand]
+    explode  := ('x' | '!') [('>' | '>=' | '<' | '<=')] [operand]
+    reroll   := 'r' [('>' | '>=' | '<' | '<=')] [operand]
+    limit    := ('>' | '>=' | '<' | '<=') operand
+    operand  := ['-'] INT ['d' ...] | dice | rng | '(' expr ')'
+
+    Explodes and rerolls right after `NdM` apply to every dice (`10d10x>=8` is `10 @ (d(10).x >= 8)`),
+    after parentheses or keep/drop to the whole result.
+    """
+
+    __slots__ = ("text", "tokens", "pos")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens: list[str] = []
+        position = 0
+        for match in _TOKEN.finditer(text):
+            if match.start() != position:
+                break
+            self.tokens.append(match.group())
+            position = match.end()
+        if position != len(text):
+            raise ValueError(f"Unexpected character {text[position]!r} at position {position} in {text!r}")
+        self.pos = 0
+
+    # Token helpers
+
+    def _peek(self, offset: int = 0) -> str | None:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def _next(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise ValueError(f"Unexpected end of notation {self.text!r}")
+        self.pos += 1
+        return token
+
+    def _expect(self, expected: str) -> None:
+        token = self._next()
+        if token != expected:
+            raise ValueError(f"Expected {expected!r}, got {token!r} in {self.text!r}")
+
+    def _int(self) -> int:
+        negative = self._peek() == "-"
+        if negative:
+            self.pos += 1
+        token = self._next()
+        if not token.isdigit():
+            raise ValueError(f"Expected integer, got {token!r} in {self.text!r}")
+        return -int(token) if negative else int(token)
+
+    def _starts_operand(self) -> bool:
+        token = self._peek()
+        return token is not None and (token.isdigit() or token in ("d", "rng", "("))
+
+    # Grammar
+
+    def parse(self) -> BaseDice:
+        result = self._expr()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected token {self._peek()!r} in {self.text!r}")
+        return result
+
+    def _expr(self) -> BaseDice:
+        result = self._term()
+        while self._peek() in ("+", "-"):
+            if self._next() == "+":
+                result = result + self._term()
+            else:
+                result = result - self._term()
+        return result
+
+    def _term(self) -> BaseDice:
+        result = self._unary()
+        while self._peek() in ("*", "/"):
+            if self._next() == "*":
+                result = result * self._unary()
+            else:
+                result = result / self._unary()
+        return result
+
+    def _unary(self) -> BaseDice:
+        if self._peek() == "-":
+            self.pos += 1
+            if (token := self._peek()) is not None and token.isdigit() and self._peek(1) != "d":
+                return self._postfix(Scalar(-int(self._next())))
+            return 0 - self._unary()
+        return self._postfix(self._primary())
+
+    def _primary(self) -> BaseDice:
+        token = self._next()
+        if token.isdigit():
+            return Scalar(int(token))
+        if token == "d":
+            return self._sides()
+        if token == "rng":
+            return self._range()
+        if token == "(":
+            result = self._expr()
+            self._expect(")")
+            return result
+        raise ValueError(f"Unexpected token {token!r} in {self.text!r}")
+
+    def _sides(self) -> BaseDice:
+        token = self._next()
+        if token.isdigit():
+            return Dice(int(token))
+        if token == "%":
+            return Dice(100)
+        if token == "f":
+            return RangeDice(-1, 2)
+        if token == "[":
+            minimal = self._int()
+            self._expect("to")
+            sides = self._int()
+            self._expect("]")
+            return Dice(sides, minimal)
+        if token == "{":
+            return self._faces()
+        raise ValueError(f"Expected dice sides, got {token!r} in {self.text!r}")
+
+    def _faces(self) -> BaseDice:
+        faces, weights = [], []
+        while True:
+            faces.append(self._int())
+            if self._peek() == ":":
+                self.pos += 1
+                weights.append(self._int())
+            if self._peek() != ",":
+                break
+            self.pos += 1
+        self._expect("}")
+        if not weights:
+            return FacesDice(tuple(faces))
+        if len(weights) != len(faces):
+            raise ValueError(f"Expected weights for all faces or none of them in {self.text!r}")
+        return WeightedDice(tuple(faces), tuple(weights))
+
+    def _range(self) -> BaseDice:
+        self._expect("(")
+        args = [self._int()]
+        while self._peek() == ",":
+            self.pos += 1
+            args.append(self._int())
+        self._expect(")")
+        if len(args) not in (2, 3):
+            raise ValueError(f"rng() expects 2 or 3 arguments, got {len(args)} in {self.text!r}")
+        return RangeDice(*args)
+
+    def _operand(self) -> BaseDice:
+        if self._peek() == "-":
+            return Scalar(self._int())
+        result = self._primary()
+        if self._peek() == "d" and isinstance(result, Scalar):
+            self.pos += 1
+            result = result @ self._sides()
+        return result
+
+    def _postfix(self, result: BaseDice) -> BaseDice:
+        # Amount and dice of `NdM` built right before: explodes and rerolls apply to each of the dices
+        many: tuple[BaseDice, BaseDice] | None = None
+        while (token := self._peek()) is not None:
+            if token in ("d", "rng"):
+                self.pos += 1
+                many = (result, self._sides() if token == "d" else self._range())
+                result = many[0] @ many[1]
+            elif token in ("kh", "k", "kl", "dh", "dl"):
+                self.pos += 1
+                count = self._operand() if self._starts_operand() else 1
+                result = getattr(result, "kh" if token == "k" else token)(count)
+                many = None
+            elif token in ("x", "!", "r"):
+                self.pos += 1
+                target = result if many is None else many[1]
+                if token == "r":
+                    target = self._compare(target.r, default=target.min)
+                else:
+                    target = self._compare(target.x, default=target.max)
+                if many is None:
+                    result = target
+                else:
+                    many = (many[0], target)
+                    result = many[0] @ target
+            elif token in (">", ">=", "<", "<="):
+                self.pos += 1
+                result = self._apply(result.lim, token, self._operand())
+                many = None
+            else:
+                break
+        return result
+
+    def _compare(self, factory, default) -> BaseDice:
+        token = self._peek()
+        if token in (">", ">=", "<", "<="):
+            self.pos += 1
+            return self._apply(factory, token, self._operand())
+        if self._starts_operand():
+            return factory == self._operand()
+        return factory == int(default())
+
+    @staticmethod
+    def _apply(factory, token: str, value: BaseDice) -> BaseDice:
+        if token == ">":
+            return factory > value
+        if token == ">=":
+            return factory >= value
+        if token == "<":
+            return factory < value
+        return factory <= value
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_normalized(notation: str) -> BaseDice:
+    return intern(_Parser(notation).parse())
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse(notation: str) -> BaseDice:
+    """
+    Parse dice notation (e.g. `2d20kh + 1d4 + 3`, `d6x6`, `(d20 - 4) > 0`) into a dice tree.
+
+    Parsed trees are kept in a bounded LRU cache, keyed both by the raw string and by its
+    normalized form (whitespace removed, lowercase), so repeated notations cost a dict lookup.
+    Returned trees are interned, so equal subexpressions of different notations are shared too.
+    """
+    return _parse_normalized(normalize(notation))
+
+
+def parse_cache_clear() -> None:
+    parse.cache_clear()
+    _parse_normalized.cache_clear()
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+import numpy as np
+
+from .core import BaseDice, Cumulants, DiceMany, Scalar, _count_loop, _generate_operand, _inner_rolls
+from .explode import BaseExplode
+
+if TYPE_CHECKING:
+    from dyce import H
+    from dyce.evaluation import HResult
+
+
+def _positions(rows: np.ndarray, sizes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Columns for the new dices of the (sorted) `rows`, appended after `sizes` dices already in each row,
+    # and amount of the new dices in each row
+    counts = np.bincount(rows, minlength=len(sizes))
+    first = np.cumsum(counts) - counts
+    return sizes[rows] + np.arange(len(rows)) - first[rows], counts
+
+
+@dataclass(slots=True, frozen=True)
+class PoolRolls:
+    """
+    Rolled pools: `values` is (items, max pool size) matrix, padded with zeros, `mask` marks rolled dices.
+    Dices of each pool are packed to the left, in the order they were rolled.
+    """
+
+    values: np.ndarray
+    mask: np.ndarray
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self.mask.sum(axis=1)
+
+    @property
+    def offsets(self) -> np.ndarray:
+        # CSR-style: dices of the pool `i` are `flat[offsets[i]:offsets[i + 1]]`
+        return np.concatenate([[0], np.cumsum(self.sizes)])
+
+    @property
+    def flat(self) -> np.ndarray:
+        return self.values[self.mask]
+
+    def total(self) -> np.ndarray:
+        return self.values.sum(axis=1)
+
+    def count(self, at_least: int | None = None, at_most: int | None = None) -> np.ndarray:
+        selected = self.mask.copy()
+        if at_least is not None:
+            selected &= self.values >= at_least
+        if at_most is not None:
+            selected &= self.values <= at_most
+        return selected.sum(axis=1)
+
+    def highest(self) -> np.ndarray:
+        # Empty pools are 0
+        lowest = np.iinfo(self.values.dtype).min
+        return np.where(self.sizes > 0, np.where(self.mask, self.values, lowest).max(axis=1, initial=lowest), 0)
+
+    def set_sizes(self) -> np.ndarray:
+        """
+        Sizes of the groups of equal dices: (items, max pool size) matrix, each group is counted at its first
+        (sorted) position, other positions are 0.
+        """
+        items, width = self.values.shape
+        if width == 0:
+            return np.zeros((items, 0), dtype=np.int_)
+        # Padding is sorted to the end of the row
+        sizes = self.sizes
+        valid = np.arange(width) < sizes[:, None]
+        ordered = np.sort(np.where(self.mask, self.values, np.iinfo(self.values.dtype).max), axis=1)
+        same = ordered[:, 1:] == ordered[:, :-1]
+        starts, ends = valid.copy(), valid.copy()
+        starts[:, 1:] &= ~same
+        ends[:, :-1] &= ~same
+        # Starts and ends of the groups come in pairs (row by row)
+        result = np.zeros((items, width), dtype=np.int_)
+        result[starts] = np.flatnonzero(ends) - np.flatnonzero(starts) + 1
+        return result
+
+    def largest_set(self) -> np.ndarray:
+        return self.set_sizes().max(axis=1, initial=0)
+
+    def sets(self, size: int = 2) -> np.ndarray:
+        return (self.set_sizes() >= size).sum(axis=1)
+
+
+def _roll_sets(roll: tuple[int, ...]) -> list[int]:
+    return [roll.count(value) for value in set(roll)]
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class Pool(BaseDice):
+    """
+    `total` dices, kept as separate dices instead of a sum. Explosions of the exploding `dice` add new dices
+    to the pool (e.g. "10s explode" in success-counting systems), rerolls replace dices as usual.
+
+    As a dice, pool is the sum of all its dices. Use `roll_pool` for the rolled dices, or reducers
+    (`successes`, `botches`, `sets`, `largest_set`, `highest`) for the dices of counts.
+    """
+
+    total: BaseDice
+    dice: BaseDice
+
+    def __post_init__(self):
+        if isinstance(self.total, int):
+            object.__setattr__(self, "total", Scalar(self.total))
+
+    @property
+    def _explode(self) -> BaseExplode | None:
+        return self.dice if isinstance(self.dice, BaseExplode) else None
+
+    @property
+    def _base(self) -> BaseDice:
+        # Dice rolled for every pool member, including ones added by explosions
+        explode = self._explode
+        return explode.dice if explode is not None else self.dice
+
+    def __str__(self) -> str:
+        return f"pool({self.total}{self.dice})"
+
+    def max(self) -> int:
+        return self.dice.max() * self.total.max()
+
+    def min(self) -> int:
+        return self.dice.min() * self.total.min()
+
+    def max_size(self) -> int:
+        explode = self._explode
+        return self.total.max() * (explode.explode_depth if explode is not None else 1)
+
+    def histogram(self) -> H:
+        # Sum of the pool is the sum of exploding dices
+        return DiceMany(self.total, self.dice).histogram()
+
+    def _cumulants(self) -> Cumulants | None:
+        return DiceMany(self.total, self.dice)._cumulants()
+
+    def roll_pool(self, items: int) -> PoolRolls:
+        explode = self._explode
+        if isinstance(self.total, Scalar) and explode is None:
+            size = max(self.total.value, 0)
+            with _inner_rolls():
+                values = np.reshape(self.dice.generate(items * size), (items, size))
+            return PoolRolls(values, np.ones((items, size), dtype=bool))
+
+        # First dices are packed to the left row by row, added dices are (row, column, value) batches
+        totals = np.maximum(np.broadcast_to(_generate_operand(self.total, items), items), 0).astype(np.int_)
+        first_width = int(totals.max(initial=0))
+        first_mask = np.arange(first_width) < totals[:, None]
+        with _inner_rolls():
+            rolled = np.asarray(self._base.generate(int(totals.sum())))
+        first = np.zeros((items, first_width), dtype=np.int_)
+        first[first_mask] = rolled
+
+        sizes, rows = totals, np.repeat(np.arange(items), totals)
+        batches = []
+        with _inner_rolls():
+            for _ in range(explode.explode_depth - 1 if explode is not None else 0):
+                _count_loop()
+                compare = _generate_operand(explode.compare, len(rolled))  # type: ignore
+                exploding = np.asarray(explode._calculate_explode_mask(rolled, compare), dtype=bool)  # type: ignore
+                if not exploding.any():
+                    break
+                rows = rows[exploding]
+                columns, counts = _positions(rows, sizes)
+                sizes = sizes + counts
+                rolled = np.asarray(self._base.generate(len(rows)))
+                batches.append((rows, columns, rolled))
+
+        width = int(sizes.max(initial=0))
+        values = np.zeros((items, width), dtype=np.int_)
+        values[:, :first_width] = first
+        for rows, columns, rolled in batches:
+            values[rows, columns] = rolled
+        return PoolRolls(values, np.arange(width) < sizes[:, None])
+
+    def generate(self, items: int) -> np.ndarray:
+        return self.roll_pool(items).total()
+
+    # Reducers
+
+    def successes(self, at_least: int, botch: int | None = None) -> BaseDice:
+        return Successes(self, at_least, botch)
+
+    def botches(self, at_most: int = 1) -> BaseDice:
+        return Botches(self, at_most)
+
+    def sets(self, size: int = 2) -> BaseDice:
+        return Sets(self, size)
+
+    def largest_set(self) -> BaseDice:
+        return LargestSet(self)
+
+    def highest(self) -> BaseDice:
+        return Highest(self)
+
+    # Histograms of the reducers
+
+    def _chain_histogram(self, score: Callable[[int], int], combine: Callable[[int, H], H]) -> H:
+        # Histogram of the score of one pool member together with dices added by its explosions
+        base = self._base.histogram()
+        explode = self._explode
+        if explode is None:
+            return base.umap(score)
+
+        from dyce.evaluation import expandable
+
+        @expandable(sentinel=base.umap(score))
+        def _chain(compare: HResult, dice: HResult):
+            value = score(dice.outcome)  # type: ignore
+            if explode._compare_histogram_outcome(dice.outcome, compare.outcome):  # type: ignore
+                return combine(value, _chain(compare.h, dice.h))  # type: ignore
+            return value
+
+        return _chain(explode.compare.histogram(), base, limit=explode.explode_depth - 1)  # type: ignore
+
+    def _count_histogram(self, score: Callable[[int], int]) -> H:
+        from dyce import H
+        from dyce.evaluation import expandable
+
+        chain = self._chain_histogram(score, lambda value, rest: rest + value)
+
+        @expandable
+        def _count(total: HResult, chain: HResult):
+            return total.outcome @ chain.h if total.outcome > 0 else H({0: 1})  # type: ignore
+
+        return _count(self.total.histogram(), chain)
+
+    def _highest_histogram(self) -> H:
+        from dyce import H, P
+        from dyce.evaluation import expandable
+
+        chain = self._chain_histogram(int, lambda value, rest: rest.umap(lambda other: max(value, other)))
+
+        @expandable
+        def _highest(total: HResult, chain: HResult):
+            return (total.outcome @ P(chain.h)).h(-1) if total.outcome > 0 else H({0: 1})  # type: ignore
+
+        return _highest(self.total.histogram(), chain)
+
+    def _sets_histogram(self, reduce: Callable[[list[int]], int]) -> H:
+        from dyce import H, P
+        from dyce.evaluation import expandable
+
+        if self._explode is not None:
+            raise ValueError(f"Histogram of the sets is not supported for exploding pool '{self}'")
+
+        @expandable
+        def _sets(total: HResult, dice: HResult):
+            if total.outcome <= 0:  # type: ignore
+                return H({reduce([]): 1})
+            counts: dict[int, int] = {}
+            for roll, count in (total.outcome @ P(dice.h)).rolls_with_counts():  # type: ignore
+                outcome = reduce(_roll_sets(roll))
+                counts[outcome] = counts.get(outcome, 0) + count
+            return H(counts)
+
+        return _sets(self.total.histogram(), self.dice.histogram())
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class Successes(BaseDice):
+    # Dices >= `at_least`, minus dices <= `botch` (if set)
+    pool: Pool
+    at_least: int
+    botch: int | None = None
+
+    def __str__(self) -> str:
+        botch = f", botch={self.botch}" if self.botch is not None else ""
+        return f"successes({self.pool}, {self.at_least}{botch})"
+
+    def max(self) -> int:
+        return self.pool.max_size()
+
+    def min(self) -> int:
+        return -self.pool.max_size() if self.botch is not None else 0
+
+    def _score(self, value: int) -> int:
+        return int(value >= self.at_least) - int(self.botch is not None and value <= self.botch)
+
+    def histogram(self) -> H:
+        return self.pool._count_histogram(self._score)
+
+    def generate(self, items: int) -> np.ndarray:
+        rolls = self.pool.roll_pool(items)
+        successes = rolls.count(at_least=self.at_least)
+        if self.botch is not None:
+            successes -= rolls.count(at_most=self.botch)
+        return successes
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class Botches(BaseDice):
+    pool: Pool
+    at_most: int = 1
+
+    def __str__(self) -> str:
+        return f"botches({self.pool}, {self.at_most})"
+
+    def max(self) -> int:
+        return self.pool.max_size()
+
+    def min(self) -> int:
+        return 0
+
+    def histogram(self) -> H:
+        return self.pool._count_histogram(lambda value: int(value <= self.at_most))
+
+    def generate(self, items: int) -> np.ndarray:
+        return self.pool.roll_pool(items).count(at_most=self.at_most)
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class Sets(BaseDice):
+    # Amount of groups of at least `size` equal dices
+    pool: Pool
+    size: int = 2
+
+    def __str__(self) -> str:
+        return f"sets({self.pool}, {self.size})"
+
+    def max(self) -> int:
+        return self.pool.max_size() // self.size
+
+    def min(self) -> int:
+        return 0
+
+    def histogram(self) -> H:
+        return self.pool._sets_histogram(lambda sizes: sum(size >= self.size for size in sizes))
+
+    def generate(self, items: int) -> np.ndarray:
+        return self.pool.roll_pool(items).sets(self.size)
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class LargestSet(BaseDice):
+    pool: Pool
+
+    def __str__(self) -> str:
+        return f"largest_set({self.pool})"
+
+    def max(self) -> int:
+        return self.pool.max_size()
+
+    def min(self) -> int:
+        return min(self.pool.total.min(), 1)
+
+    def histogram(self) -> H:
+        return self.pool._sets_histogram(lambda sizes: max(sizes, default=0))
+
+    def generate(self, items: int) -> np.ndarray:
+        return self.pool.roll_pool(items).largest_set()
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class Highest(BaseDice):
+    pool: Pool
+
+    def __str__(self) -> str:
+        return f"highest({self.pool})"
+
+    def max(self) -> int:
+        return self.pool._base.max()
+
+    def min(self) -> int:
+        return self.pool._base.min() if self.pool.total.min() > 0 else min(self.pool._base.min(), 0)
+
+    def histogram(self) -> H:
+        return self.pool._highest_histogram()
+
+    def generate(self, items: int) -> np.ndarray:
+        return self.pool.roll_pool(items).highest()
+
+
+def pool(total: int | BaseDice, dice: int | BaseDice) -> Pool:
+    if isinstance(total, int):
+        total = Scalar(total)
+    if not isinstance(total, BaseDice):
+        raise ValueError(f"'total' suppose to be int or BaseDice, not {type(total)}")
+    if isinstance(dice, int):
+        dice = Scalar(dice)
+    if not isinstance(dice, BaseDice):
+        raise ValueError(f"'dice' suppose to be int or BaseDice, not {type(dice)}")
+    return Pool(total, dice)
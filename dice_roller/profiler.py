@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Callable, Iterator, TextIO
+
+from . import core
+from .core import BaseDice
+
+
+@dataclass(slots=True, eq=False)
+class NodeStats:
+    """
+    Calls of one method of the dice node at some position of the expression tree.
+
+    `time` includes nested calls of the children, `bytes` is the size of the generated results and
+    `loops` counts iterations of explode, reroll and dice amount of dices loops.
+    """
+
+    dice: BaseDice | None
+    method: str
+    calls: int = 0
+    items: int = 0
+    time: float = 0.0
+    bytes: int = 0
+    loops: int = 0
+    children: dict[tuple[str, BaseDice], NodeStats] = field(default_factory=dict)
+
+    @property
+    def self_time(self) -> float:
+        return self.time - sum(child.time for child in self.children.values())
+
+    def child(self, method: str, dice: BaseDice) -> NodeStats:
+        # Equal subexpressions under the same parent (e.g. both dices of `d20 + d20`) share the record
+        key = (method, dice)
+        stats = self.children.get(key)
+        if stats is None:
+            stats = self.children[key] = NodeStats(dice, method)
+        return stats
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024  # type: ignore
+    return f"{size:.1f}GiB"
+
+
+class Profiler:
+    """
+    Records calls of `generate` and `histogram` for every node of the evaluated expressions.
+
+    Created by `dice_profiler()`. Not thread-safe: profile expressions evaluated in a single thread.
+    """
+
+    def __init__(self) -> None:
+        self.root = NodeStats(None, "")
+        self._stack = [self.root]
+
+    def call(self, dice: BaseDice, method: Callable, args: tuple):
+        stats = self._stack[-1].child(method.__name__, dice)
+        self._stack.append(stats)
+        start = perf_counter()
+        try:
+            result = method(dice, *args)
+        finally:
+            stats.time += perf_counter() - start
+            self._stack.pop()
+        stats.calls += 1
+        if args:
+            stats.items += int(args[0])
+        stats.bytes += getattr(result, "nbytes", 0)
+        return result
+
+    def count_loop(self) -> None:
+        self._stack[-1].loops += 1
+
+    def stats(self) -> list[NodeStats]:
+        return list(self.root.children.values())
+
+    def report(self, file: TextIO | None = None) -> None:
+        print(self.format(), file=file or sys.stdout)
+
+    def format(self) -> str:
+        lines = []
+        for stats in self.root.children.values():
+            self._format(stats, "", "", lines)
+        return "\n".join(lines)
+
+    def _format(self, stats: NodeStats, prefix: str, child_prefix: str, lines: list[str]) -> None:
+        info = [f"calls={stats.calls}"]
+        if stats.method == "generate":
+            info.append(f"items={stats.items}")
+        info.append(f"time={_format_time(stats.time)}")
+        if stats.children:
+            info.append(f"self={_format_time(stats.self_time)}")
+        if stats.bytes:
+            info.append(f"bytes={_format_bytes(stats.bytes)}")
+        if stats.loops:
+            info.append(f"loops={stats.loops}")
+        lines.append(f"{prefix}{stats.method} {stats.dice} [{type(stats.dice).__name__}] {' '.join(info)}")
+
+        children = list(stats.children.values())
+        for i, child in enumerate(children):
+            last = i == len(children) - 1
+            self._format(child, child_prefix + ("└─ " if last else "├─ "), child_prefix + ("   " if last else "│  "), lines)
+
+    def __str__(self) -> str:
+        return self.format()
+
+
+@contextmanager
+def dice_profiler() -> Iterator[Profiler]:
+    """
+    Profile dice evaluated inside the block:
+
+        with dice_profiler() as p:
+            (2@d(20)).kh().generate(1000)
+        p.report()
+
+    When no profiler is active the hooks only check a module variable, so they stay in place in production.
+    """
+    profiler = Profiler()
+    previous, core._profiler = core._profiler, profiler
+    try:
+        yield profiler
+    finally:
+        core._profiler = previous
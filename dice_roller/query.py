@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from .cache import Distribution, DistributionCache
+from .core import BaseDice
+
+CDF_CACHE_SIZE = 256
+
+
+@dataclass(slots=True, frozen=True)
+class CdfTable:
+    """
+    Cumulative probabilities of consecutive outcomes, starting from `offset`: `lower[i]` is P(X <= offset + i)
+    and `upper[i]` is P(X >= offset + i). Both tails are summed separately, so small tail probabilities keep
+    their precision.
+
+    Queries accept scalars or arrays of any shape and return floats or arrays of the same shape.
+    """
+
+    offset: int
+    lower: np.ndarray
+    upper: np.ndarray
+
+    @classmethod
+    def from_distribution(cls, distribution: Distribution) -> CdfTable:
+        probabilities = np.asarray(distribution.probabilities, dtype=np.float64)
+        lower = np.cumsum(probabilities)
+        upper = np.cumsum(probabilities[::-1])[::-1]
+        for table in (lower, upper):
+            table.flags.writeable = False
+        return cls(distribution.offset, lower, upper)
+
+    def outcomes(self) -> np.ndarray:
+        return np.arange(self.offset, self.offset + len(self.lower))
+
+    def prob_le(self, thresholds: ArrayLike) -> np.ndarray | float:
+        # Outcomes are consecutive integers, so the table is indexed directly instead of searching outcomes
+        index = np.floor(np.asarray(thresholds, dtype=np.float64)) - self.offset
+        result = np.where(index < 0, 0.0, self.lower[np.clip(index, 0, len(self.lower) - 1).astype(np.intp)])
+        return _unwrap(result)
+
+    def prob_ge(self, thresholds: ArrayLike) -> np.ndarray | float:
+        index = np.ceil(np.asarray(thresholds, dtype=np.float64)) - self.offset
+        n = len(self.upper)
+        result = np.where(index >= n, 0.0, self.upper[np.clip(index, 0, n - 1).astype(np.intp)])
+        return _unwrap(result)
+
+    def quantile(self, qs: ArrayLike) -> np.ndarray | int:
+        """
+        Smallest outcome `x` with P(X <= x) >= q.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if np.any((qs < 0) | (qs > 1)):
+            raise ValueError("'qs' suppose to be in [0, 1] range")
+        # Rounding can leave the last cumulative value slightly below 1
+        index = np.minimum(np.searchsorted(self.lower, qs, side="left"), len(self.lower) - 1)
+        result = index + self.offset
+        return int(result) if result.ndim == 0 else result
+
+
+def _unwrap(result: np.ndarray) -> np.ndarray | float:
+    return float(result) if result.ndim == 0 else result
+
+
+# Keyed by the dice itself (structural equality): callbacks and operators are compared by identity and kept alive
+# by the key, so different ones never share a table
+_tables: OrderedDict[BaseDice, CdfTable] = OrderedDict()
+_lock = threading.Lock()
+
+
+def cdf(dice: BaseDice, cache: DistributionCache | None = None) -> CdfTable:
+    """
+    Cumulative table of the dice, built from `histogram()` (or persistent `cache`) once and kept in bounded
+    LRU cache keyed by the expression structure (trees with unhashable fields are not cached).
+    Outcomes must be integers (ValueError otherwise).
+    """
+    if not _hashable(dice):
+        distribution = cache.distribution(dice) if cache is not None else Distribution.from_histogram(dice.histogram())
+        return CdfTable.from_distribution(distribution)
+    with _lock:
+        if (table := _tables.get(dice)) is not None:
+            _tables.move_to_end(dice)
+            return table
+
+    distribution = cache.distribution(dice) if cache is not None else Distribution.from_histogram(dice.histogram())
+    return _cache_table(dice, distribution)
+
+
+def _cache_table(dice: BaseDice, distribution: Distribution) -> CdfTable:
+    table = CdfTable.from_distribution(distribution)
+    if not _hashable(dice):
+        return table
+    with _lock:
+        _tables[dice] = table
+        if len(_tables) > CDF_CACHE_SIZE:
+            _tables.popitem(last=False)
+    return table
+
+
+def _hashable(dice: BaseDice) -> bool:
+    try:
+        hash(dice)
+    except TypeError:
+        return False
+    return True
+
+
+def clear_cdf_cache() -> None:
+    with _lock:
+        _tables.clear()
+
+
+def prob_le(dice: BaseDice, thresholds: ArrayLike) -> np.ndarray | float:
+    return cdf(dice).prob_le(thresholds)
+
+
+def prob_ge(dice: BaseDice, thresholds: ArrayLike) -> np.ndarray | float:
+    return cdf(dice).prob_ge(thresholds)
+
+
+def quantile(dice: BaseDice, qs: ArrayLike) -> np.ndarray | int:
+    return cdf(dice).quantile(qs)
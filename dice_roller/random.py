@@ -1,3 +1,7 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
 import numpy as np
 
 
@@ -23,16 +27,38 @@ class SingletonMeta(type):
 
 class Rng(metaclass=SingletonMeta):
     def __init__(self) -> None:
+        # Process wide generator, and generators of `use_rng` blocks, which only apply to their own thread
         self._rng: np.random.Generator = None  # type: ignore
+        self._local = threading.local()
 
     @property
     def rng(self) -> np.random.Generator:
-        if self._rng is None:
+        rng = getattr(self._local, "rng", None)
+        if rng is None:
+            rng = self._rng
+        if rng is None:
             raise RuntimeError("No RNG generator ")
-        return self._rng
+        return rng
 
     def set_rng(self, rng: np.random.Generator):
         self._rng = rng
 
 
+@contextmanager
+def use_rng(rng: np.random.Generator | np.random.SeedSequence | int | None) -> Iterator[np.random.Generator]:
+    """
+    Temporarily replace generator used by all dices rolled in the current thread, other threads keep their
+    generators. Integer, `SeedSequence` (or None) is used as a seed for a new generator.
+    """
+    if rng is None or isinstance(rng, (int, np.integer, np.random.SeedSequence)):
+        rng = np.random.default_rng(rng)
+    local = Rng()._local
+    previous = getattr(local, "rng", None)
+    local.rng = rng
+    try:
+        yield rng
+    finally:
+        local.rng = previous
+
+
 Rng().set_rng(np.random.default_rng())
@@ -1,17 +1,33 @@
+from __future__ import annotations
+
 from dataclasses import dataclass, field
 from functools import partial
-from typing import Protocol
+from typing import TYPE_CHECKING, Protocol
 
 import numpy as np
-from dyce import H
-from dyce.evaluation import HResult, expandable
 from numpy.typing import ArrayLike
 
-from .core import BaseDice
+from .backend import kernels
+from .core import (
+    BaseDice,
+    _count_loop,
+    _cumulative_at,
+    _from_sparse,
+    _generate_operand,
+    _inner_rolls,
+    _sparse_counts,
+)
 from .misc import DiceModifier, _wrap_scalar
 
+if TYPE_CHECKING:
+    from dyce import H
+    from dyce.evaluation import HResult
+
+# Compare outcomes can not reach these bounds
+_LOW, _HIGH = np.iinfo(np.int64).min // 4, np.iinfo(np.int64).max // 4
 
-@dataclass(slots=True)
+
+@dataclass(slots=True, frozen=True, eq=False)
 class BaseReroll(BaseDice, Protocol):
     dice: BaseDice
     compare: BaseDice
@@ -23,6 +39,11 @@ class BaseReroll(BaseDice, Protocol):
     @staticmethod
     def _calculate_reroll_mask(roll_values: ArrayLike, cmp_values: ArrayLike) -> ArrayLike: ...
 
+    @staticmethod
+    def _reroll_range(outcomes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Bounds (inclusive) of compare outcomes, for which dice outcomes are rerolled
+        ...
+
     def max(self) -> int:
         return self.dice.max()
 
@@ -30,7 +51,13 @@ class BaseReroll(BaseDice, Protocol):
         return self.dice.min()
 
     def histogram(self) -> H:
+        from dyce.evaluation import expandable
+
         dice_hist = self.dice.histogram()
+        compare_hist = self.compare.histogram()
+        dice, compare = _sparse_counts(dice_hist), _sparse_counts(compare_hist)
+        if dice is not None and compare is not None:
+            return self._sparse_histogram(*dice, *compare)
 
         @expandable(sentinel=dice_hist)
         def _reroll(compare: HResult, dice: HResult):
@@ -40,24 +67,45 @@ class BaseReroll(BaseDice, Protocol):
             else:
                 return dice.outcome
 
-        return _reroll(self.compare.histogram(), dice_hist, limit=self.reroll_limit - 1)  # type: ignore
+        # Non-integer outcomes are enumerated pair by pair
+        return _reroll(compare_hist, dice_hist, limit=self.reroll_limit)  # type: ignore
+
+    def _sparse_histogram(
+        self, outcomes: np.ndarray, dice: np.ndarray, compare_outcomes: np.ndarray, compare: np.ndarray
+    ) -> H:
+        # Only fresh rolls are compared (each with a new compare roll), so the result is the first kept roll of
+        # up to `reroll_limit` rerolls, or the last roll. With T, U totals of dice and compare counts, R(x) counts of
+        # compare outcomes rerolling x and S = sum(dice(x) * R(x)) rerolled pairs, counts over (TU)^(L+1) are
+        #   dice(x) * (U - R(x)) * sum(S^k (TU)^(L-k), k < L) + dice(x) * U * S^L
+        low, high = self._reroll_range(outcomes)
+        rerolled = _cumulative_at(compare_outcomes, compare, high) - _cumulative_at(compare_outcomes, compare, low - 1)
+        pairs = int(dice.sum()) * int(compare.sum())
+        total, repeated = int(compare.sum()), int((dice * rerolled).sum())
+        kept = sum(repeated**k * pairs ** (self.reroll_limit - k) for k in range(self.reroll_limit))
+        return _from_sparse(outcomes, dice * (total - rerolled) * kept + dice * total * repeated**self.reroll_limit)
 
     def generate(self, items: int) -> ArrayLike:
-        result = self.dice.generate(items)
-        for _ in range(self.reroll_limit):
-            compare_values = self.compare.generate(items)
-            reroll_mask = self._calculate_reroll_mask(result, compare_values)
+        # All rolls inside are independent of shared nodes
+        with _inner_rolls():
+            result = np.array(self.dice.generate(items), dtype=np.int_)
+            # Items rolled in the last round and their rolls, only they can be rerolled again
+            rolled, current_rolls = np.arange(items), result
+            for _ in range(self.reroll_limit):
+                _count_loop()
+                compare_values = _generate_operand(self.compare, len(rolled))
+                reroll_mask = np.asarray(self._calculate_reroll_mask(current_rolls, compare_values), dtype=bool)
 
-            if not np.any(reroll_mask):
-                break
+                if not np.any(reroll_mask):
+                    break
 
-            rerolls = self.dice.generate(np.sum(reroll_mask))
-            result[reroll_mask] = rerolls  # type: ignore
+                rolled = rolled[reroll_mask]
+                current_rolls = np.asarray(self.dice.generate(len(rolled)), dtype=np.int_)
+                kernels().scatter(result, rolled, current_rolls)
 
-        return result
+            return result
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class RerollEq(BaseReroll):
     def __str__(self) -> str:
         return f"{self.dice}r{self.compare}"
@@ -66,12 +114,16 @@ class RerollEq(BaseReroll):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice == compare
 
+    @staticmethod
+    def _reroll_range(outcomes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return outcomes, outcomes
+
     @staticmethod
     def _calculate_reroll_mask(roll_values: ArrayLike, cmp_values: ArrayLike) -> ArrayLike:
         return roll_values == cmp_values
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class RerollIfGreater(BaseReroll):
     def __str__(self) -> str:
         return f"{self.dice}r>{self.compare}"
@@ -80,12 +132,16 @@ class RerollIfGreater(BaseReroll):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice > compare
 
+    @staticmethod
+    def _reroll_range(outcomes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return np.full_like(outcomes, _LOW), outcomes - 1
+
     @staticmethod
     def _calculate_reroll_mask(roll_values: ArrayLike, cmp_values: ArrayLike) -> ArrayLike:
         return roll_values > cmp_values  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class RerollIfGreaterOrEq(BaseReroll):
     def __str__(self) -> str:
         return f"{self.dice}r>={self.compare}"
@@ -94,12 +150,16 @@ class RerollIfGreaterOrEq(BaseReroll):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice >= compare
 
+    @staticmethod
+    def _reroll_range(outcomes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return np.full_like(outcomes, _LOW), outcomes
+
     @staticmethod
     def _calculate_reroll_mask(roll_values: ArrayLike, cmp_values: ArrayLike) -> ArrayLike:
         return roll_values >= cmp_values  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class RerollIfLess(BaseReroll):
     def __str__(self) -> str:
         return f"{self.dice}r<{self.compare}"
@@ -108,12 +168,16 @@ class RerollIfLess(BaseReroll):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice < compare
 
+    @staticmethod
+    def _reroll_range(outcomes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return outcomes + 1, np.full_like(outcomes, _HIGH)
+
     @staticmethod
     def _calculate_reroll_mask(roll_values: ArrayLike, cmp_values: ArrayLike) -> ArrayLike:
         return roll_values < cmp_values  # type: ignore
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class RerollIfLessOrEq(BaseReroll):
     def __str__(self) -> str:
         return f"{self.dice}r<={self.compare}"
@@ -122,6 +186,10 @@ class RerollIfLessOrEq(BaseReroll):
     def _compare_histogram_outcome(dice: int, compare: int) -> bool:
         return dice <= compare
 
+    @staticmethod
+    def _reroll_range(outcomes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return outcomes, np.full_like(outcomes, _HIGH)
+
     @staticmethod
     def _calculate_reroll_mask(roll_values: ArrayLike, cmp_values: ArrayLike) -> ArrayLike:
         return roll_values <= cmp_values  # type: ignore
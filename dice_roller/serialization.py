@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import json
+import operator
+import struct
+from dataclasses import fields
+from importlib import import_module
+from typing import Any
+
+import numpy as np
+
+from .cache import Distribution
+from .core import BaseDice
+
+VERSION = 1
+FORMATS = ("binary", "json")
+
+# Node types by tag. Tags are part of the format: new types are appended, existing ones never move
+_NODE_TYPES = (
+    ("core", "Scalar"),
+    ("core", "Dice"),
+    ("core", "RangeDice"),
+    ("core", "FacesDice"),
+    ("core", "WeightedDice"),
+    ("core", "DiceMany"),
+    ("math", "DiceAdd"),
+    ("math", "DiceSub"),
+    ("math", "DiceMul"),
+    ("math", "DiceDiv"),
+    ("compare", "Lt"),
+    ("compare", "Le"),
+    ("compare", "Gt"),
+    ("compare", "Ge"),
+    ("explode", "ExplodeEq"),
+    ("explode", "ExplodeIfGreater"),
+    ("explode", "ExplodeIfGreaterOrEq"),
+    ("explode", "ExplodeIfLess"),
+    ("explode", "ExplodeIfLessOrEq"),
+    ("reroll", "RerollEq"),
+    ("reroll", "RerollIfGreater"),
+    ("reroll", "RerollIfGreaterOrEq"),
+    ("reroll", "RerollIfLess"),
+    ("reroll", "RerollIfLessOrEq"),
+    ("transformations", "KeepHighest"),
+    ("transformations", "KeepLowest"),
+    ("transformations", "DropHighest"),
+    ("transformations", "DropLowest"),
+    ("pools", "Pool"),
+    ("pools", "Successes"),
+    ("pools", "Botches"),
+    ("pools", "Sets"),
+    ("pools", "LargestSet"),
+    ("pools", "Highest"),
+    ("shared", "Shared"),
+)
+# Operators of `<amount>@<dice>` (see `many`)
+_OPERATORS = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "mul": operator.mul,
+    "floordiv": operator.floordiv,
+    "max": np.maximum,
+    "min": np.minimum,
+}
+_OPERATOR_NAMES = {id(function): name for name, function in _OPERATORS.items()}
+
+_MAGIC = b"DRX"
+# Binary value tags
+_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STR, _NODE, _TUPLE, _OPERATOR = range(9)
+_DOUBLE = struct.Struct("<d")
+
+_types: list[type] = []
+_tags: dict[type, int] = {}
+
+
+def _node_types() -> list[type]:
+    # Modules are imported on the first use, as in the package namespace
+    if not _types:
+        for module, name in _NODE_TYPES:
+            cls = getattr(import_module(f".{module}", __package__), name)
+            _tags[cls] = len(_types)
+            _types.append(cls)
+    return _types
+
+
+def _flatten(dice: BaseDice) -> list[tuple[int, list[Any]]]:
+    # Nodes in post-order as (type tag, init field values), children are referenced by node index.
+    # Nodes referenced several times (interned trees share subexpressions) are stored once
+    _node_types()
+    nodes: list[tuple[int, list[Any]]] = []
+    index: dict[int, int] = {}
+
+    def value(item: Any) -> Any:
+        # Checked by exact types: isinstance against the BaseDice protocol is slow
+        if item is None or type(item) in (bool, int, float, str):
+            return item
+        # Numpy scalars (e.g. sides from numpy arrays) are encoded as Python ones
+        if isinstance(item, np.bool_):
+            return bool(item)
+        if isinstance(item, np.integer):
+            return int(item)
+        if isinstance(item, np.floating):
+            return float(item)
+        if type(item) is tuple:
+            return ("tuple", [value(i) for i in item])
+        if type(item) in _tags:
+            return ("node", visit(item))
+        if isinstance(item, BaseDice):
+            raise TypeError(f"Dice of type {type(item).__name__} can not be serialized")
+        if callable(item):
+            if id(item) not in _OPERATOR_NAMES:
+                raise TypeError(f"Operator {item!r} can not be serialized")
+            return ("operator", _OPERATOR_NAMES[id(item)])
+        raise TypeError(f"Value {item!r} of type {type(item).__name__} can not be serialized")
+
+    def visit(node: BaseDice) -> int:
+        if (known := index.get(id(node))) is not None:
+            return known
+        tag = _tags.get(type(node))
+        if tag is None:
+            raise TypeError(f"Dice of type {type(node).__name__} can not be serialized")
+        values = [value(getattr(node, f.name)) for f in fields(node) if f.init]  # type: ignore
+        nodes.append((tag, values))
+        index[id(node)] = len(nodes) - 1
+        return len(nodes) - 1
+
+    visit(dice)
+    return nodes
+
+
+def _build(nodes: list[tuple[int, list[Any]]]) -> BaseDice:
+    from .interning import intern
+
+    types = _node_types()
+    built: list[BaseDice] = []
+
+    def value(item: Any) -> Any:
+        if isinstance(item, tuple):
+            kind, payload = item
+            if kind == "node":
+                return built[payload]
+            if kind == "tuple":
+                return tuple(value(i) for i in payload)
+            return _OPERATORS[payload]
+        return item
+
+    for tag, values in nodes:
+        if not 0 <= tag < len(types):
+            raise ValueError(f"Unknown dice type tag {tag}, data is written by newer version")
+        built.append(types[tag](*(value(i) for i in values)))
+    if not built:
+        raise ValueError("Serialized dice has no nodes")
+    return intern(built[-1])
+
+
+# Binary format: magic, version, varint amount of nodes, nodes (varint type tag, varint amount of values,
+# tagged values), distribution flag and optional distribution (zigzag varint offset, varint size, float64 values)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _write_value(out: bytearray, item: Any) -> None:
+    if item is None:
+        out.append(_NONE)
+    elif item is True or item is False:
+        out.append(_TRUE if item else _FALSE)
+    elif isinstance(item, int):
+        out.append(_INT)
+        _write_varint(out, _zigzag(item))
+    elif isinstance(item, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(item)
+    elif isinstance(item, str):
+        encoded = item.encode()
+        out.append(_STR)
+        _write_varint(out, len(encoded))
+        out += encoded
+    else:
+        kind, payload = item
+        if kind == "node":
+            out.append(_NODE)
+            _write_varint(out, payload)
+        elif kind == "tuple":
+            out.append(_TUPLE)
+            _write_varint(out, len(payload))
+            for i in payload:
+                _write_value(out, i)
+        else:
+            out.append(_OPERATOR)
+            _write_value(out, payload)
+
+
+def _read_value(data: bytes, position: int) -> tuple[Any, int]:
+    tag = data[position]
+    position += 1
+    if tag == _NONE:
+        return None, position
+    if tag in (_TRUE, _FALSE):
+        return tag == _TRUE, position
+    if tag == _INT:
+        value, position = _read_varint(data, position)
+        return _unzigzag(value), position
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(data, position)[0], position + _DOUBLE.size
+    if tag == _STR:
+        size, position = _read_varint(data, position)
+        return data[position : position + size].decode(), position + size
+    if tag == _NODE:
+        value, position = _read_varint(data, position)
+        return ("node", value), position
+    if tag == _TUPLE:
+        size, position = _read_varint(data, position)
+        items = []
+        for _ in range(size):
+            item, position = _read_value(data, position)
+            items.append(item)
+        return ("tuple", items), position
+    if tag == _OPERATOR:
+        name, position = _read_value(data, position)
+        return ("operator", name), position
+    raise ValueError(f"Unknown value tag {tag}")
+
+
+def _to_binary(nodes: list[tuple[int, list[Any]]], distribution: Distribution | None) -> bytes:
+    out = bytearray(_MAGIC)
+    out.append(VERSION)
+    _write_varint(out, len(nodes))
+    for tag, values in nodes:
+        _write_varint(out, tag)
+        _write_varint(out, len(values))
+        for item in values:
+            _write_value(out, item)
+    out.append(distribution is not None)
+    if distribution is not None:
+        _write_varint(out, _zigzag(distribution.offset))
+        _write_varint(out, len(distribution.probabilities))
+        out += np.ascontiguousarray(distribution.probabilities, dtype="<f8").tobytes()
+    return bytes(out)
+
+
+def _from_binary(data: bytes) -> tuple[list[tuple[int, list[Any]]], Distribution | None]:
+    if data[: len(_MAGIC)] != _MAGIC:
+        raise ValueError("Data is not a serialized dice")
+    if data[len(_MAGIC)] != VERSION:
+        raise ValueError(f"Unsupported serialized dice version {data[len(_MAGIC)]}, supported {VERSION}")
+    count, position = _read_varint(data, len(_MAGIC) + 1)
+    nodes = []
+    for _ in range(count):
+        tag, position = _read_varint(data, position)
+        size, position = _read_varint(data, position)
+        values = []
+        for _ in range(size):
+            item, position = _read_value(data, position)
+            values.append(item)
+        nodes.append((tag, values))
+    distribution = None
+    if data[position]:
+        offset, position = _read_varint(data, position + 1)
+        size, position = _read_varint(data, position)
+        probabilities = np.frombuffer(data, dtype="<f8", count=size, offset=position).astype(np.float64)
+        distribution = Distribution(_unzigzag(offset), probabilities)
+    return nodes, distribution
+
+
+# JSON format: {"version": 1, "nodes": [[type tag, [values]], ...], "distribution": {"offset", "probabilities"}},
+# references are {"node": index}, tuples are {"tuple": [...]}, operators are {"operator": name}
+
+
+def _json_value(item: Any) -> Any:
+    if isinstance(item, tuple):
+        kind, payload = item
+        return {kind: [_json_value(i) for i in payload] if kind == "tuple" else payload}
+    return item
+
+
+def _from_json_value(item: Any) -> Any:
+    if isinstance(item, dict):
+        ((kind, payload),) = item.items()
+        return (kind, [_from_json_value(i) for i in payload] if kind == "tuple" else payload)
+    return item
+
+
+def _to_json(nodes: list[tuple[int, list[Any]]], distribution: Distribution | None) -> str:
+    document: dict[str, Any] = {
+        "version": VERSION,
+        "nodes": [[tag, [_json_value(i) for i in values]] for tag, values in nodes],
+    }
+    if distribution is not None:
+        document["distribution"] = {
+            "offset": distribution.offset,
+            "probabilities": np.asarray(distribution.probabilities).tolist(),
+        }
+    return json.dumps(document, separators=(",", ":"))
+
+
+def _from_json(data: str) -> tuple[list[tuple[int, list[Any]]], Distribution | None]:
+    document = json.loads(data)
+    if not isinstance(document, dict) or "nodes" not in document:
+        raise ValueError("Data is not a serialized dice")
+    if document.get("version") != VERSION:
+        raise ValueError(f"Unsupported serialized dice version {document.get('version')}, supported {VERSION}")
+    nodes = [(tag, [_from_json_value(i) for i in values]) for tag, values in document["nodes"]]
+    distribution = None
+    if (table := document.get("distribution")) is not None:
+        distribution = Distribution(table["offset"], np.array(table["probabilities"], dtype=np.float64))
+    return nodes, distribution
+
+
+def dumps(dice: BaseDice, format: str = "binary", *, distribution: bool | Distribution = False) -> bytes | str:
+    """
+    Encode dice tree into compact versioned binary (bytes) or JSON (str) form, see `loads`.
+
+    With `distribution=True` the distribution of the dice (computed with `histogram()`) is attached, so
+    loading side gets probability queries (`cdf`, `prob_ge`, ...) without computing the histogram again.
+    Already computed `Distribution` can be passed instead. Trees with custom callbacks or operators can not
+    be encoded (TypeError).
+    """
+    if format not in FORMATS:
+        raise ValueError(f"'format' suppose to be one of {FORMATS}, not {format!r}")
+    nodes = _flatten(dice)
+    table = distribution if isinstance(distribution, Distribution) else None
+    if distribution is True:
+        table = Distribution.from_histogram(dice.histogram())
+    return _to_binary(nodes, table) if format == "binary" else _to_json(nodes, table)
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> BaseDice:
+    """
+    Decode dice tree, encoded with `dumps` (format is detected by the data type). Result is interned, attached
+    distribution is put into the query cache (see `dice_roller.query.cdf`).
+    """
+    if isinstance(data, str):
+        nodes, distribution = _from_json(data)
+    else:
+        nodes, distribution = _from_binary(bytes(data))
+    dice = _build(nodes)
+    if distribution is not None:
+        from .query import _cache_table
+
+        _cache_table(dice, distribution)
+    return dice
+
+
+def _reduce(dice: BaseDice) -> tuple | None:
+    # Pickle support: trees are pickled as their binary encoding, None for trees which can't be encoded
+    try:
+        return loads, (dumps(dice),)
+    except TypeError:
+        return None
@@ -0,0 +1,375 @@
+"""
+Local roll server: owns the generators and keeps rolls of registered expressions prefilled in shared memory
+ring buffers, so worker processes skip import and warm-up costs and read rolls without copying.
+
+    python -m dice_roller.server --socket /tmp/dice_roller.sock --capacity 4194304 --seed 42
+
+Clients (see `dice_roller.client.RollClient`) talk JSON lines over the Unix socket:
+
+- `{"op": "register", "expression": "2d20kh + 5"}` - parse expression and create its ring (once per expression),
+  responds with ring `id`, shared memory `name`, `capacity`, `max_claim`, `dtype` and server `pid`
+- `{"op": "claim", "id": 0, "count": 1000}` - lease `count` rolls, responds with `lease` and `segments`
+  (`[start, length]` pairs of ring positions, two when the lease wraps around the ring end)
+- `{"op": "release", "lease": 3}` - return leased rolls, so the server can refill them
+- `{"op": "stats"}` - state of all rings
+
+Responses have `"ok": true`, or `"ok": false` with `error` and `kind` ("value" or "timeout"). Leases of
+disconnected clients are released by the server. Expressions are checked (bounds and a probe roll) on register,
+if refilling of a ring still fails, the ring stops and its claims respond with the error.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+from collections import deque
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+import numpy as np
+
+from .bulk import _check_dtype
+from .core import BaseDice
+from .parser import parse
+from .random import use_rng
+
+DEFAULT_CAPACITY = 1 << 22
+DEFAULT_BLOCK_SIZE = 1 << 16
+DEFAULT_TIMEOUT = 30.0
+DTYPE = np.dtype("<i8")
+# Rolls generated on register to check the expression before its ring is created
+_PROBE = 16
+
+
+class _Ring:
+    # Ring of `blocks` blocks: empty blocks are refilled, filled blocks are handed out in order, handed out
+    # blocks are empty again when all their leases are released
+
+    def __init__(self, id: int, expression: str, dice: BaseDice, blocks: int, block_size: int) -> None:
+        self.id = id
+        self.expression = expression
+        self.dice = dice
+        self.block_size = block_size
+        self.capacity = blocks * block_size
+        # The first filled block can be partially handed out, so one block is never fully available
+        self.max_claim = self.capacity - block_size
+        self.shm = SharedMemory(create=True, size=self.capacity * DTYPE.itemsize)
+        self.data = np.ndarray((self.capacity,), dtype=DTYPE, buffer=self.shm.buf)
+        self.empty = deque(range(blocks))
+        self.filled: deque[int] = deque()
+        # Handed out items of the first filled block
+        self.position = 0
+        self.leases = [0] * blocks
+        self.consumed = [False] * blocks
+        self.generated = 0
+        self.served = 0
+        # Refill failure, the ring is not refilled anymore
+        self.error: str | None = None
+
+    def available(self) -> int:
+        return len(self.filled) * self.block_size - self.position
+
+    def refillable(self) -> bool:
+        return bool(self.empty) and self.error is None
+
+    def take(self, count: int) -> tuple[list[int], list[list[int]]]:
+        blocks, segments = [], []
+        while count > 0:
+            block = self.filled[0]
+            length = min(count, self.block_size - self.position)
+            start = block * self.block_size + self.position
+            if segments and segments[-1][0] + segments[-1][1] == start:
+                segments[-1][1] += length
+            else:
+                segments.append([start, length])
+            blocks.append(block)
+            self.leases[block] += 1
+            self.position += length
+            count -= length
+            if self.position == self.block_size:
+                self.filled.popleft()
+                self.consumed[block] = True
+                self.position = 0
+        self.served += sum(length for _, length in segments)
+        return blocks, segments
+
+    def release(self, blocks: list[int]) -> None:
+        for block in blocks:
+            self.leases[block] -= 1
+            if self.leases[block] == 0 and self.consumed[block]:
+                self.consumed[block] = False
+                self.empty.append(block)
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "expression": self.expression,
+            "capacity": self.capacity,
+            "available": self.available(),
+            "leased_blocks": sum(1 for leases in self.leases if leases),
+            "generated": self.generated,
+            "served": self.served,
+            "error": self.error,
+        }
+
+    def close(self) -> None:
+        del self.data
+        self.shm.close()
+        self.shm.unlink()
+
+
+class RollServer:
+    """
+    Roll server, listening on the Unix socket `path`. Every registered expression gets its own ring of `capacity`
+    rolls (rounded up to `block_size`, at least two blocks), refilled by one background thread with the server
+    generator. One claim can take up to `capacity - block_size` rolls.
+
+    Use `python -m dice_roller.server` to run it as a daemon, or `start()`/`close()` (or `with`) to run it
+    in the background threads of the current process.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        capacity: int = DEFAULT_CAPACITY,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        seed: int | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        if capacity <= 0 or block_size <= 0:
+            raise ValueError("'capacity' and 'block_size' suppose to be positive")
+        self.path = Path(path)
+        self.blocks = max(2, -(-capacity // block_size))
+        self.block_size = block_size
+        self.timeout = timeout
+        self._generator = np.random.default_rng(seed)
+        self._rings: list[_Ring] = []
+        self._by_key: dict[str, _Ring] = {}
+        self._leases: dict[int, tuple[_Ring, list[int]]] = {}
+        self._lease_ids = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._serving = False
+
+        if self.path.exists():
+            self.path.unlink()
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.path), self._handler())
+        self._server.daemon_threads = True
+        self._refiller = threading.Thread(target=self._refill, name="roll-server-refill", daemon=True)
+        self._refiller.start()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> RollServer:
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def start(self) -> RollServer:
+        self._serving = True
+        self._thread = threading.Thread(target=self.serve_forever, name="roll-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._serving = True
+        self._server.serve_forever()
+
+    def close(self) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        if self._serving:
+            self._server.shutdown()
+        self._server.server_close()
+        self._refiller.join()
+        for ring in self._rings:
+            ring.close()
+        self.path.unlink(missing_ok=True)
+
+    # Requests
+
+    def register(self, expression: str) -> dict:
+        dice = parse(expression)
+        key = repr(dice)
+        if key not in self._by_key:
+            _probe(dice)
+        with self._condition:
+            ring = self._by_key.get(key)
+            if ring is None:
+                ring = _Ring(len(self._rings), expression, dice, self.blocks, self.block_size)
+                self._rings.append(ring)
+                self._by_key[key] = ring
+                self._condition.notify_all()
+        return {
+            "id": ring.id,
+            "name": ring.shm.name,
+            "capacity": ring.capacity,
+            "max_claim": ring.max_claim,
+            "dtype": DTYPE.str,
+            "pid": os.getpid(),
+        }
+
+    def claim(self, id: int, count: int) -> dict:
+        ring = self._ring(id)
+        if not 0 < count <= ring.max_claim:
+            raise ValueError(f"'count' suppose to be in 1..{ring.max_claim}, not {count}")
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._closed or ring.error is not None or ring.available() >= count, self.timeout
+            ):
+                raise TimeoutError(f"Not enough rolls of '{ring.expression}' after {self.timeout}s, release leases")
+            if self._closed:
+                raise ValueError("Server is closed")
+            if ring.available() < count:
+                raise ValueError(f"Rolling '{ring.expression}' failed: {ring.error}")
+            blocks, segments = ring.take(count)
+            lease = next(self._lease_ids)
+            self._leases[lease] = (ring, blocks)
+            self._condition.notify_all()
+        return {"lease": lease, "segments": segments}
+
+    def release(self, lease: int) -> dict:
+        with self._condition:
+            if lease not in self._leases:
+                raise ValueError(f"Unknown lease {lease}")
+            ring, blocks = self._leases.pop(lease)
+            ring.release(blocks)
+            self._condition.notify_all()
+        return {}
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {"rings": [ring.stats() for ring in self._rings], "leases": len(self._leases)}
+
+    def _ring(self, id: int) -> _Ring:
+        with self._condition:
+            if not 0 <= id < len(self._rings):
+                raise ValueError(f"Unknown expression id {id}")
+            return self._rings[id]
+
+    # Refill thread
+
+    def _next_block(self) -> tuple[_Ring, int] | None:
+        rings = [ring for ring in self._rings if ring.refillable()]
+        if not rings:
+            return None
+        # The emptiest ring goes first
+        ring = min(rings, key=_Ring.available)
+        return ring, ring.empty.popleft()
+
+    def _refill(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or any(ring.refillable() for ring in self._rings))
+                if self._closed:
+                    return
+                ring, block = self._next_block()  # type: ignore
+
+            # Block is neither filled nor leased, so it is written without the lock
+            start = block * ring.block_size
+            try:
+                with use_rng(self._generator):
+                    ring.data[start : start + ring.block_size] = ring.dice.generate(ring.block_size)
+            except Exception as error:
+                # Only this ring stops, its claims report the error
+                with self._condition:
+                    ring.empty.appendleft(block)
+                    ring.error = f"{type(error).__name__}: {error}"
+                    self._condition.notify_all()
+                continue
+
+            with self._condition:
+                ring.filled.append(block)
+                ring.generated += ring.block_size
+                self._condition.notify_all()
+
+    def _handler(self) -> type[socketserver.StreamRequestHandler]:
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                leases: set[int] = set()
+                try:
+                    for line in self.rfile:
+                        response = server._dispatch(json.loads(line), leases)
+                        self.wfile.write(json.dumps(response).encode() + b"\n")
+                        self.wfile.flush()
+                except (ConnectionError, ValueError):
+                    pass
+                finally:
+                    # Leases of the disconnected client
+                    for lease in leases:
+                        try:
+                            server.release(lease)
+                        except ValueError:
+                            pass
+
+        return Handler
+
+    def _dispatch(self, request: dict, leases: set[int]) -> dict:
+        try:
+            op = request.get("op")
+            if op == "register":
+                response = self.register(str(request["expression"]))
+            elif op == "claim":
+                response = self.claim(int(request["id"]), int(request["count"]))
+                leases.add(response["lease"])
+            elif op == "release":
+                leases.discard(int(request["lease"]))
+                response = self.release(int(request["lease"]))
+            elif op == "stats":
+                response = self.stats()
+            else:
+                raise ValueError(f"Unknown op {op!r}")
+        except TimeoutError as error:
+            return {"ok": False, "kind": "timeout", "error": str(error)}
+        except (KeyError, TypeError, ValueError) as error:
+            return {"ok": False, "kind": "value", "error": str(error)}
+        return {"ok": True, **response}
+
+
+def _probe(dice: BaseDice) -> None:
+    # Expression is rolled by the shared refill thread, so it is checked before it gets a ring
+    _check_dtype(dice, DTYPE)
+    try:
+        with use_rng(np.random.default_rng()):
+            np.asarray(dice.generate(_PROBE)).astype(DTYPE)
+    except (ArithmeticError, TypeError, ValueError) as error:
+        raise ValueError(f"Expression '{dice}' can not be rolled: {error}") from error
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default="/tmp/dice_roller.sock", help="Unix socket path")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="rolls per expression ring")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="rolls per refill")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="claim timeout in seconds")
+    parser.add_argument("--register", nargs="*", default=[], metavar="EXPRESSION", help="expressions to prefill")
+    args = parser.parse_args(argv)
+
+    server = RollServer(args.socket, args.capacity, args.block_size, args.seed, args.timeout)
+    for expression in args.register:
+        server.register(expression)
+    # Terminated daemon still unlinks its shared memory
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Serving on {server.path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
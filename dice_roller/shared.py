@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Mapping
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from . import core
+from .core import BaseDice, Cumulants
+
+if TYPE_CHECKING:
+    from dyce import H
+
+
+@dataclass(slots=True)
+class _Session:
+    items: int
+    rolls: dict[Shared, np.ndarray] = field(default_factory=dict)
+
+
+# Active `generate_many` call, shared nodes are rolled once per session
+_session: _Session | None = None
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class Shared(BaseDice):
+    """
+    Subexpression, rolled once per sample for all its references inside `generate_many`, so all outputs using it
+    are correlated. Shared nodes are matched by value: equal expressions with equal names are the same roll.
+
+    Sharing works for the rolls made once per sample (as a part of sums, limits, keep/drop amounts, ...).
+    Inside explodes, rerolls, pools and the dice of `<amount>@<dice>` (rolled for a part of the samples or
+    several times per sample) and outside of `generate_many`, it is rolled as usual. Histograms and statistics
+    treat every reference as an independent dice.
+    """
+
+    dice: BaseDice
+    name: str = ""
+
+    def __str__(self) -> str:
+        return str(self.dice)
+
+    def max(self) -> int:
+        return self.dice.max()
+
+    def min(self) -> int:
+        return self.dice.min()
+
+    def histogram(self) -> H:
+        return self.dice.histogram()
+
+    def _cumulants(self) -> Cumulants:
+        return self.dice.cumulants()
+
+    def generate(self, items: int) -> ArrayLike:
+        session = _session
+        if session is None or core._inner_depth or items != session.items:
+            return self.dice.generate(items)
+        rolls = session.rolls.get(self)
+        if rolls is None:
+            rolls = session.rolls[self] = np.asarray(self.dice.generate(items))
+        # Dices modify generated arrays in place
+        return rolls.copy()
+
+
+def generate_many(outputs: Mapping[str, BaseDice], items: int) -> dict[str, np.ndarray]:
+    """
+    Generate `items` samples of every output, with shared subexpressions rolled once per sample.
+
+    Result contains arrays of `outputs` under their names, and rolls of the named shared nodes
+    (unless outputs use the same names).
+    """
+    global _session
+
+    previous, _session = _session, _Session(items)
+    try:
+        result = {name: np.asarray(dice.generate(items)) for name, dice in outputs.items()}
+        session = _session
+    finally:
+        _session = previous
+    for shared, rolls in session.rolls.items():
+        if shared.name:
+            result.setdefault(shared.name, rolls)
+    return result
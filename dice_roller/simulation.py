@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Callable
+
+import numpy as np
+
+from .core import BaseDice
+from .random import use_rng
+
+_METHODS = ("independent", "antithetic", "sobol")
+
+# Sobol direction numbers (Joe and Kuo): degree and coefficients of the primitive polynomial, initial numbers.
+# First dimension is van der Corput sequence.
+_SOBOL_PARAMETERS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+)
+SOBOL_DIMENSIONS = len(_SOBOL_PARAMETERS) + 1
+_SOBOL_BITS = 32
+
+
+def _direction_numbers(degree: int, coefficients: int, initial: tuple[int, ...]) -> np.ndarray:
+    m = list(initial)
+    for k in range(degree, _SOBOL_BITS):
+        value = m[k - degree] ^ (m[k - degree] << degree)
+        for j in range(1, degree):
+            if (coefficients >> (degree - 1 - j)) & 1:
+                value ^= m[k - j] << j
+        m.append(value)
+    return np.array([m[k] << (_SOBOL_BITS - 1 - k) for k in range(_SOBOL_BITS)], dtype=np.uint64)
+
+
+def _sobol_directions() -> np.ndarray:
+    first = np.array([1 << (_SOBOL_BITS - 1 - k) for k in range(_SOBOL_BITS)], dtype=np.uint64)
+    return np.stack([first] + [_direction_numbers(*parameters) for parameters in _SOBOL_PARAMETERS])
+
+
+_SOBOL_DIRECTIONS = _sobol_directions()
+
+
+def sobol(points: int, dimension: int, shift: int = 0) -> np.ndarray:
+    """
+    First `points` coordinates of the Sobol sequence in `dimension`, randomized with digital `shift`.
+    """
+    index = np.arange(points, dtype=np.uint64)
+    values = np.full(points, shift, dtype=np.uint64)
+    for bit, direction in enumerate(_SOBOL_DIRECTIONS[dimension]):
+        values ^= np.where((index >> np.uint64(bit)) & np.uint64(1), direction, np.uint64(0))
+    return values / float(1 << _SOBOL_BITS)
+
+
+class _UniformSource:
+    """
+    Replacement of `np.random.Generator` for the leaf dices, which maps uniform numbers to outcomes.
+
+    Outcomes are monotone in the uniform numbers, so the same (or mirrored) numbers give similar rolls
+    for different dices.
+    """
+
+    def __init__(self, uniforms: Callable[[int], np.ndarray]) -> None:
+        self._uniforms = uniforms
+
+    def random(self, size: int) -> np.ndarray:
+        return self._uniforms(int(size))
+
+    def integers(self, low: int, high: int, size: int) -> np.ndarray:
+        span = high - low
+        return low + np.minimum((self.random(size) * span).astype(np.int64), span - 1)
+
+    def choice(self, a, size: int, replace: bool = True) -> np.ndarray:
+        values = np.asarray(a)
+        return values[np.minimum((self.random(size) * len(values)).astype(np.int64), len(values) - 1)]
+
+
+class _Recorder:
+    def __init__(self, rng: np.random.Generator) -> None:
+        self.rng = rng
+        self.chunks: list[np.ndarray] = []
+
+    def __call__(self, size: int) -> np.ndarray:
+        chunk = self.rng.random(size)
+        self.chunks.append(chunk)
+        return chunk
+
+
+class _Antithetic:
+    # Replays recorded stream of uniform numbers mirrored (1 - u), continues with fresh numbers when it runs out
+    def __init__(self, recorded: list[np.ndarray], rng: np.random.Generator) -> None:
+        self.stream = np.concatenate(recorded) if recorded else np.empty(0)
+        self.position = 0
+        self.rng = rng
+
+    def __call__(self, size: int) -> np.ndarray:
+        chunk = 1.0 - self.stream[self.position : self.position + size]
+        self.position += len(chunk)
+        if len(chunk) < size:
+            chunk = np.concatenate([chunk, self.rng.random(size - len(chunk))])
+        return chunk
+
+
+class _Sobol:
+    # Every draw of one die per item takes the next Sobol dimension. Other draws (pools, exploded dices, ...)
+    # and draws over available dimensions are pseudo-random, which keeps estimates unbiased.
+    def __init__(self, items: int, rng: np.random.Generator) -> None:
+        self.items = items
+        self.rng = rng
+        self.dimension = 0
+
+    def __call__(self, size: int) -> np.ndarray:
+        if size != self.items or self.dimension >= SOBOL_DIMENSIONS:
+            return self.rng.random(size)
+        shift = int(self.rng.integers(0, 1 << _SOBOL_BITS, dtype=np.uint64))
+        self.dimension += 1
+        return sobol(size, self.dimension - 1, shift)
+
+
+def _t_quantile(probability: float, degrees: int) -> float:
+    # Cornish-Fisher expansion of Student's t quantile
+    z = NormalDist().inv_cdf(probability)
+    return (
+        z
+        + (z**3 + z) / (4 * degrees)
+        + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * degrees**2)
+        + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * degrees**3)
+    )
+
+
+@dataclass(slots=True, frozen=True)
+class SimulationResult:
+    """
+    Estimated mean with its standard error and confidence interval, calculated from independent replicates.
+    """
+
+    mean: float
+    stderr: float
+    low: float
+    high: float
+    samples: int
+
+    @classmethod
+    def from_replicates(cls, means: np.ndarray, samples: int, confidence: float) -> SimulationResult:
+        mean = float(np.mean(means))
+        stderr = float(np.std(means, ddof=1) / math.sqrt(len(means)))
+        half_width = _t_quantile((1 + confidence) / 2, len(means) - 1) * stderr
+        return cls(mean, stderr, mean - half_width, mean + half_width, samples)
+
+
+@dataclass(slots=True, frozen=True)
+class Simulation:
+    dices: tuple[BaseDice, ...]
+    # Mean of each dice (rows) in each replicate (columns)
+    replicate_means: np.ndarray
+    samples: int
+    confidence: float
+
+    @property
+    def results(self) -> list[SimulationResult]:
+        return [SimulationResult.from_replicates(means, self.samples, self.confidence) for means in self.replicate_means]
+
+    def difference(self, first: int = 0, second: int = 1) -> SimulationResult:
+        """
+        Estimated mean of `dices[first] - dices[second]`. Paired by replicate, so common random numbers
+        shrink its interval.
+        """
+        means = self.replicate_means[first] - self.replicate_means[second]
+        return SimulationResult.from_replicates(means, self.samples, self.confidence)
+
+
+def _replicate_mean(dice: BaseDice, items: int, method: str, seed: np.random.SeedSequence) -> float:
+    rng = np.random.default_rng(seed)
+    if method == "independent":
+        with use_rng(_UniformSource(rng.random)):  # type: ignore
+            return float(np.mean(dice.generate(items)))
+    if method == "sobol":
+        with use_rng(_UniformSource(_Sobol(items, rng))):  # type: ignore
+            return float(np.mean(dice.generate(items)))
+
+    half = max(items // 2, 1)
+    recorder = _Recorder(rng)
+    with use_rng(_UniformSource(recorder)):  # type: ignore
+        first = np.mean(dice.generate(half))
+    with use_rng(_UniformSource(_Antithetic(recorder.chunks, rng))):  # type: ignore
+        second = np.mean(dice.generate(half))
+    return float((first + second) / 2)
+
+
+def simulate(
+    *dices: BaseDice,
+    items: int,
+    method: str = "independent",
+    common: bool = True,
+    replicates: int = 16,
+    confidence: float = 0.95,
+    seed: int | None = None,
+) -> Simulation:
+    """
+    Estimate means of the dices from `items` rolls each, split into `replicates` independent batches.
+
+    Variance reduction:
+    - `common` - all dices of a replicate use the same random numbers (common random numbers), so differences
+      between similar dices are estimated much more precisely (see `Simulation.difference`)
+    - "antithetic" method - half of the rolls reuse mirrored random numbers of the other half
+    - "sobol" method - leaf dices rolled once per item take coordinates of randomly shifted Sobol sequence
+      (up to `SOBOL_DIMENSIONS`) instead of pseudo-random numbers
+    """
+    if method not in _METHODS:
+        raise ValueError(f"'method' suppose to be one of {_METHODS}, not {method!r}")
+    if not dices:
+        raise ValueError("At least one dice is required")
+    if replicates < 2:
+        raise ValueError("At least 2 replicates are required for confidence intervals")
+    per_replicate = max(items // replicates, 2)
+
+    means = np.empty((len(dices), replicates))
+    for replicate, replicate_seed in enumerate(np.random.SeedSequence(seed).spawn(replicates)):
+        seeds = [replicate_seed] * len(dices) if common else replicate_seed.spawn(len(dices))
+        for i, dice in enumerate(dices):
+            means[i, replicate] = _replicate_mean(dice, per_replicate, method, seeds[i])
+    return Simulation(dices, means, per_replicate * replicates, confidence)
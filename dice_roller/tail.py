@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import math
+import warnings
+from contextlib import nullcontext
+from dataclasses import dataclass
+from operator import add
+from statistics import NormalDist
+
+import numpy as np
+
+from .compare import BaseCompare
+from .core import BaseDice, Dice, DiceMany, FacesDice, RangeDice, Scalar, WeightedDice, _generate_operand
+from .explode import BaseExplode, ExplodeEq, ExplodeIfGreater, ExplodeIfGreaterOrEq
+from .math import DiceAdd, DiceSub
+from .random import Rng, use_rng
+from .reroll import BaseReroll
+from .transformations import DropHighest, DropLowest, KeepHighest, KeepLowest
+
+_PILOT_SAMPLES = 4_000
+_PILOT_STEPS = 30
+# Cross-entropy method: fraction of the best pilot rolls used to update the tilt, and iterations limit
+_ELITE = 0.1
+_CE_ITERATIONS = 20
+_MAX_THETA = 64.0
+# Less effective samples in the tail make the estimate and its interval unreliable
+_MIN_EFFECTIVE = 30.0
+
+# Rolls, log likelihood ratios and sufficient statistics (sum of leaf rolls in the tilt direction)
+Tilted = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _tilted_faces(faces: np.ndarray, probabilities: np.ndarray, items: int, theta: float, direction: int) -> Tilted:
+    # Faces, tilted: q(k) ~ p(k) * exp(theta * direction * k). Log likelihood ratio is log p(k) - log q(k).
+    exponents = np.log(probabilities) + theta * direction * faces
+    log_normalizer = np.logaddexp.reduce(exponents)
+    tilted = np.exp(exponents - log_normalizer)
+    index = np.searchsorted(np.cumsum(tilted), Rng().rng.random(items) * tilted.sum(), side="right")
+    values = faces[np.minimum(index, len(faces) - 1)]
+    statistic = direction * values
+    return values, log_normalizer - theta * statistic, statistic
+
+
+def _leaf_faces(dice: BaseDice) -> tuple[np.ndarray, np.ndarray] | None:
+    # Faces and their probabilities of the leaf dices
+    if isinstance(dice, WeightedDice):
+        return dice._values, dice.probabilities()
+    if isinstance(dice, Dice):
+        faces = np.arange(dice.minimal, dice.sides + 1)
+    elif isinstance(dice, RangeDice):
+        faces = np.arange(dice.min_value, dice.max_value, dice.step_value)
+    elif isinstance(dice, FacesDice):
+        faces = dice._values
+    else:
+        return None
+    return faces, np.full(len(faces), 1 / len(faces))
+
+
+def _untilted(dice: BaseDice, items: int) -> Tilted:
+    return np.asarray(dice.generate(items)), np.zeros(items), np.zeros(items)
+
+
+def _tilted(dice: BaseDice, items: int, theta: float, direction: int = 1) -> Tilted:
+    """
+    Roll the dice with leaf dices tilted towards bigger (`direction` 1) or smaller (-1) outcomes.
+    Nodes which can't be tilted in a known direction are rolled as usual.
+    """
+    if items == 0:
+        return _untilted(dice, items)
+    if (leaf := _leaf_faces(dice)) is not None:
+        return _tilted_faces(*leaf, items, theta, direction)
+    if isinstance(dice, (DiceAdd, DiceSub)):
+        values, log_ratio, statistic = _tilted(dice.items[0], items, theta, direction)
+        sign = 1 if isinstance(dice, DiceAdd) else -1
+        for item in dice.items[1:]:
+            item_values, item_ratio, item_statistic = _tilted(item, items, theta, sign * direction)
+            values, log_ratio, statistic = values + sign * item_values, log_ratio + item_ratio, statistic + item_statistic
+        return values, log_ratio, statistic
+    if isinstance(dice, DiceMany) and dice._operator is add:
+        return _tilted_many(dice, items, theta, direction)
+    if isinstance(dice, BaseExplode):
+        return _tilted_explode(dice, items, theta, direction)
+    if isinstance(dice, BaseReroll):
+        return _tilted_reroll(dice, items, theta, direction)
+    if isinstance(dice, BaseCompare):
+        values, log_ratio, statistic = _tilted(dice.dice, items, theta, direction)
+        return np.asarray(dice._with_cap(values, _generate_operand(dice.compare, items))), log_ratio, statistic
+    if isinstance(dice, (KeepHighest, KeepLowest, DropHighest, DropLowest)) and isinstance(dice.of, Scalar):
+        of = dice.of.value
+        values, log_ratio, statistic = _tilted(dice.dice, items * of, theta, direction)
+        # Same layout as `_sorted_pools`: one pool per row
+        pools = np.sort(np.reshape(values, (items, of)), axis=1)
+        return (
+            dice._reduce(pools),
+            np.reshape(log_ratio, (items, of)).sum(axis=1),
+            np.reshape(statistic, (items, of)).sum(axis=1),
+        )
+    return _untilted(dice, items)
+
+
+def _tilted_many(dice: DiceMany, items: int, theta: float, direction: int) -> Tilted:
+    if isinstance(dice.total, Scalar):
+        total = dice.total.value
+        values, log_ratio, statistic = _tilted(dice.dice, items * total, theta, direction)
+        return (
+            np.reshape(values, (total, items)).sum(axis=0) + dice._neutral_element,
+            np.reshape(log_ratio, (total, items)).sum(axis=0),
+            np.reshape(statistic, (total, items)).sum(axis=0),
+        )
+    # More dices make bigger sums (for non-negative amounts), so the amount is tilted too
+    totals, log_ratio, statistic = _tilted(dice.total, items, theta, direction)
+    values = np.full(items, dice._neutral_element, dtype=np.int_)
+    for roll_count in range(1, int(np.max(totals, initial=0)) + 1):
+        mask = totals >= roll_count
+        rolls, rolls_ratio, rolls_statistic = _tilted(dice.dice, int(mask.sum()), theta, direction)
+        values[mask] += rolls
+        log_ratio[mask] += rolls_ratio
+        statistic[mask] += rolls_statistic
+    return values, log_ratio, statistic
+
+
+def _explodes_high(dice: BaseExplode) -> bool:
+    # Explosions on the biggest faces only: tilting towards bigger rolls makes them more frequent, towards smaller
+    # ones rarer, so the tilt moves the result the same way in both directions
+    if isinstance(dice, (ExplodeIfGreater, ExplodeIfGreaterOrEq)):
+        return True
+    return isinstance(dice, ExplodeEq) and isinstance(dice.compare, Scalar) and dice.compare.value >= dice.dice.max()
+
+
+def _tilted_explode(dice: BaseExplode, items: int, theta: float, direction: int) -> Tilted:
+    if not _explodes_high(dice):
+        # Tilting towards bigger rolls would suppress explosions on small faces (and vice versa)
+        return _untilted(dice, items)
+    values, log_ratio, statistic = _tilted(dice.dice, items, theta, direction)
+    values = values.copy()
+    rolled, current = np.arange(items), values.copy()
+    for _ in range(dice.explode_depth - 1):
+        mask = np.asarray(dice._calculate_explode_mask(current, _generate_operand(dice.compare, len(rolled))), dtype=bool)
+        if not mask.any():
+            break
+        rolled = rolled[mask]
+        current, rolls_ratio, rolls_statistic = _tilted(dice.dice, len(rolled), theta, direction)
+        values[rolled] += current
+        log_ratio[rolled] += rolls_ratio
+        statistic[rolled] += rolls_statistic
+    return values, log_ratio, statistic
+
+
+def _tilted_reroll(dice: BaseReroll, items: int, theta: float, direction: int) -> Tilted:
+    # Rerolls are rolled as usual: the tilt would shift the first rolls away from (or into) the rerolled faces and
+    # the kept and discarded rolls in opposite ways, which misleads the tilt search
+    return _untilted(dice, items)
+
+
+def _solve_theta(dice: BaseDice, direction: int, target: float) -> float:
+    # Tilt, which makes the mean of the sufficient statistic equal to the target (bisection over pilot runs)
+    def mean_statistic(theta: float) -> float:
+        return float(np.mean(_tilted(dice, _PILOT_SAMPLES, theta, direction)[2]))
+
+    if mean_statistic(0.0) >= target:
+        # Untilted rolls already reach the target (or nothing in the expression is tilted)
+        return 0.0
+    low, high = 0.0, 1.0 / max(dice.max() - dice.min(), 1)
+    while mean_statistic(high) < target:
+        low, high = high, high * 2
+        if high > _MAX_THETA:
+            return low
+    for _ in range(_PILOT_STEPS):
+        middle = (low + high) / 2
+        low, high = (middle, high) if mean_statistic(middle) < target else (low, middle)
+    return (low + high) / 2
+
+
+def _choose_theta(dice: BaseDice, threshold: int, direction: int) -> float:
+    # Cross-entropy method: move the tilt towards the rolls reaching the (gradually raised) level, until the level
+    # reaches the threshold
+    theta = 0.0
+    for _ in range(_CE_ITERATIONS):
+        values, log_ratio, statistic = _tilted(dice, _PILOT_SAMPLES, theta, direction)
+        scores = direction * values
+        level = min(direction * threshold, float(np.quantile(scores, 1 - _ELITE)))
+        elite = scores >= level
+        weights = np.exp(log_ratio[elite] - log_ratio[elite].max())
+        theta = _solve_theta(dice, direction, float(weights @ statistic[elite] / weights.sum()))
+        if level >= direction * threshold:
+            break
+    return theta
+
+
+@dataclass(slots=True, frozen=True)
+class TailEstimate:
+    probability: float
+    stderr: float
+    low: float
+    high: float
+    samples: int
+    theta: float
+    # Kish effective sample size of the weighted rolls in the tail, few effective samples mean unreliable stderr
+    effective_samples: float
+
+
+def tail_probability(
+    dice: BaseDice,
+    threshold: int,
+    *,
+    upper: bool = True,
+    samples: int = 100_000,
+    theta: float | None = None,
+    confidence: float = 0.95,
+    seed: int | None = None,
+) -> TailEstimate:
+    """
+    Estimate P(dice >= threshold) (or P(dice <= threshold) with `upper=False`) with importance sampling.
+
+    Leaf dices (and through them sums, pools, limits, explodes on the biggest faces, ...) are rolled from
+    exponentially tilted distributions, which make the tail common, and every roll is reweighted by its likelihood
+    ratio, so the estimate stays unbiased. Tilt strength `theta` is chosen by short pilot runs (cross-entropy
+    method), unless provided. Parts of the expression which can't be tilted in a known direction (products,
+    divisions, custom operators, rerolls, explodes on other faces) are rolled as usual. When too few weighted rolls
+    reach the tail, RuntimeWarning is issued and the interval is the whole [0, 1].
+    """
+    direction = 1 if upper else -1
+    with use_rng(seed) if seed is not None else nullcontext():
+        if theta is None:
+            theta = _choose_theta(dice, threshold, direction)
+        values, log_ratio, _ = _tilted(dice, samples, theta, direction)
+
+    hits = values >= threshold if upper else values <= threshold
+    weights = np.where(hits, np.exp(log_ratio), 0.0)
+    probability = float(weights.mean())
+    effective = float(weights.sum() ** 2 / np.sum(weights**2)) if hits.any() else 0.0
+    if effective < _MIN_EFFECTIVE:
+        # Few (or no) weighted rolls reached the tail: sample variance says nothing about the error
+        warnings.warn(
+            f"Only {effective:.1f} effective samples of {dice} {'>=' if upper else '<='} {threshold} "
+            f"(theta={theta:.3g}), the estimate is unreliable; roll more samples or pass smaller theta",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return TailEstimate(probability, math.inf, 0.0, 1.0, samples, theta, effective)
+    stderr = float(weights.std(ddof=1) / math.sqrt(samples))
+    half_width = NormalDist().inv_cdf((1 + confidence) / 2) * stderr
+    return TailEstimate(
+        probability, stderr, max(probability - half_width, 0.0), probability + half_width, samples, theta, effective
+    )
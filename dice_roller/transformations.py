@@ -1,16 +1,50 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
 import numpy as np
-from dyce import H, P
-from dyce.evaluation import HResult, expandable
 from numpy.typing import ArrayLike
 
-from .core import BaseDice, DiceMany, Scalar
+from .backend import kernels
+from .core import BaseDice, DiceMany, Scalar, _generate_operand, _inner_rolls
 
+if TYPE_CHECKING:
+    from dyce import H
+    from dyce.evaluation import HResult
 
-@dataclass(slots=True)
+
+def _sorted_pools(dice: BaseDice, of: int, items: int) -> np.ndarray:
+    # Fixed pool size: all pools are rolled at once as rows of (items, of) matrix, sorted ascending
+    with _inner_rolls():
+        rolls = dice.generate(items * of)
+    return np.sort(np.reshape(rolls, (items, of)), axis=1)
+
+
+def _sum_lowest(pools: np.ndarray, count: ArrayLike) -> np.ndarray:
+    if np.ndim(count) == 0:
+        return pools[:, :count].sum(axis=1)  # type: ignore
+    mask = np.arange(pools.shape[1]) < np.asarray(count)[:, None]
+    return np.where(mask, pools, 0).sum(axis=1)
+
+
+def _sum_highest(pools: np.ndarray, count: ArrayLike) -> np.ndarray:
+    return _sum_lowest(pools[:, ::-1], count)
+
+
+def _variable_pools(dice: BaseDice, of: BaseDice, items: int) -> tuple[np.ndarray, np.ndarray]:
+    # Rolled amount of dices: all pools are rolled at once, as consecutive segments of one array
+    counts = np.maximum(np.asarray(of.generate(items)), 0).astype(np.int_)
+    with _inner_rolls():
+        return np.asarray(dice.generate(int(counts.sum())), dtype=np.int_), counts
+
+
+def _keep_segments(values: np.ndarray, counts: np.ndarray, keep: ArrayLike, highest: bool) -> np.ndarray:
+    keep = np.clip(np.broadcast_to(keep, len(counts)), 0, counts).astype(np.int_)
+    return kernels().segment_keep(values, counts, keep, highest)
+
+
+@dataclass(slots=True, frozen=True, eq=False)
 class KeepHighest(BaseDice):
     dice: BaseDice
     keep: BaseDice = field(default_factory=lambda: Scalar(1))
@@ -18,12 +52,15 @@ class KeepHighest(BaseDice):
 
     def __post_init__(self):
         if isinstance(self.dice, DiceMany):
-            self.of = self.dice.total
-            self.dice = self.dice.dice
+            object.__setattr__(self, "of", self.dice.total)
+            object.__setattr__(self, "dice", self.dice.dice)
         if isinstance(self.keep, int):
-            self.keep = Scalar(self.keep)
+            object.__setattr__(self, "keep", Scalar(self.keep))
 
     def histogram(self) -> H:
+        from dyce import P
+        from dyce.evaluation import expandable
+
         @expandable
         def kh(dice: HResult, keep: HResult, of: HResult):
             return (of.outcome @ P(dice.h)).h(slice(-keep.outcome, None))  # type: ignore
@@ -46,23 +83,20 @@ class KeepHighest(BaseDice):
         # times the minimum number of keeps, as we're assuming the least favorable (lowest) high rolls are kept.
         return self.dice.min() * self.keep.min()
 
-    def generate(self, items: int) -> ArrayLike:
-        of_rolls = self.of.generate(items)
-        dice_rolls = self.dice.generate(np.sum(of_rolls))
-        keep_rolls = self.keep.generate(items)
-        results = np.empty(items, dtype=np.int_)
+    def _reduce(self, pools: np.ndarray) -> np.ndarray:
+        # Pools of the fixed size: (items, of) matrix, sorted ascending in each row
+        keep = np.clip(_generate_operand(self.keep, len(pools)), 0, pools.shape[1])
+        return _sum_highest(pools, keep)
 
-        start_idx = 0
-        for i in range(items):
-            num_rolls = of_rolls[i]  # type: ignore
-            keep = min(keep_rolls[i], num_rolls)  # type: ignore
-            results[i] = np.sum(np.sort(dice_rolls[start_idx : start_idx + num_rolls])[-keep:])  # type: ignore
-            start_idx += num_rolls  # type: ignore
+    def generate(self, items: int) -> ArrayLike:
+        if isinstance(self.of, Scalar):
+            return self._reduce(_sorted_pools(self.dice, self.of.value, items))
 
-        return results
+        values, counts = _variable_pools(self.dice, self.of, items)
+        return _keep_segments(values, counts, _generate_operand(self.keep, items), highest=True)
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class KeepLowest(BaseDice):
     dice: BaseDice
     keep: BaseDice = field(default_factory=lambda: Scalar(1))
@@ -70,12 +104,15 @@ class KeepLowest(BaseDice):
 
     def __post_init__(self):
         if isinstance(self.dice, DiceMany):
-            self.of = self.dice.total
-            self.dice = self.dice.dice
+            object.__setattr__(self, "of", self.dice.total)
+            object.__setattr__(self, "dice", self.dice.dice)
         if isinstance(self.keep, int):
-            self.keep = Scalar(self.keep)
+            object.__setattr__(self, "keep", Scalar(self.keep))
 
     def histogram(self) -> H:
+        from dyce import P
+        from dyce.evaluation import expandable
+
         @expandable
         def kl(dice: HResult, keep: HResult, of: HResult):
             return (of.outcome @ P(dice.h)).h(slice(None, keep.outcome))  # type: ignore
@@ -97,23 +134,19 @@ class KeepLowest(BaseDice):
         # The minimum is the dice's minimum value times the number of keeps, assuming the lowest possible outcomes are kept.
         return self.dice.min() * self.keep.min()
 
-    def generate(self, items: int) -> ArrayLike:
-        of_rolls = self.of.generate(items)
-        dice_rolls = self.dice.generate(np.sum(of_rolls))
-        keep_rolls = self.keep.generate(items)
-        results = np.empty(items, dtype=np.int_)
+    def _reduce(self, pools: np.ndarray) -> np.ndarray:
+        keep = np.clip(_generate_operand(self.keep, len(pools)), 0, pools.shape[1])
+        return _sum_lowest(pools, keep)
 
-        start_idx = 0
-        for i in range(items):
-            num_rolls = of_rolls[i]  # type: ignore
-            keep = min(keep_rolls[i], num_rolls)  # type: ignore
-            results[i] = np.sum(np.sort(dice_rolls[start_idx : start_idx + num_rolls])[:keep])  # type: ignore
-            start_idx += num_rolls  # type: ignore
+    def generate(self, items: int) -> ArrayLike:
+        if isinstance(self.of, Scalar):
+            return self._reduce(_sorted_pools(self.dice, self.of.value, items))
 
-        return results
+        values, counts = _variable_pools(self.dice, self.of, items)
+        return _keep_segments(values, counts, _generate_operand(self.keep, items), highest=False)
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class DropHighest(BaseDice):
     dice: BaseDice
     drop: BaseDice = field(default_factory=lambda: Scalar(1))
@@ -121,15 +154,19 @@ class DropHighest(BaseDice):
 
     def __post_init__(self):
         if isinstance(self.dice, DiceMany):
-            self.of = self.dice.total
-            self.dice = self.dice.dice
+            object.__setattr__(self, "of", self.dice.total)
+            object.__setattr__(self, "dice", self.dice.dice)
         if isinstance(self.drop, int):
-            self.drop = Scalar(self.drop)
+            object.__setattr__(self, "drop", Scalar(self.drop))
 
     def histogram(self) -> H:
+        from dyce import H, P
+        from dyce.evaluation import expandable
+
         @expandable
         def dh(dice: HResult, drop: HResult, of: HResult):
-            return (of.outcome @ P(dice.h)).h(slice(None, drop.outcome))  # type: ignore
+            # Rolls are sorted ascending; dropping everything sums to 0 as in `generate`
+            return (of.outcome @ P(dice.h)).h(slice(None, max(0, of.outcome - drop.outcome))) or H({0: 1})  # type: ignore
 
         return dh(self.dice.histogram(), self.drop.histogram(), self.of.histogram())
 
@@ -147,28 +184,20 @@ class DropHighest(BaseDice):
         # Minimum possible value after dropping the highest rolls
         return self.dice.min() * max(0, self.of.min() - self.drop.max())
 
-    def generate(self, items: int) -> np.ndarray:
-        of_rolls = self.of.generate(items)
-        drop_rolls = self.drop.generate(items)
-        dice_rolls = self.dice.generate(np.sum(of_rolls))
-
-        # Initialize results array
-        results = np.empty(items, dtype=np.int_)
+    def _reduce(self, pools: np.ndarray) -> np.ndarray:
+        drop = np.clip(_generate_operand(self.drop, len(pools)), 0, pools.shape[1])
+        return _sum_lowest(pools, pools.shape[1] - drop)
 
-        start_idx = 0
-        for i in range(items):
-            num_rolls = of_rolls[i]  # type: ignore
-            drop = min(num_rolls, drop_rolls[i])  # type: ignore
-
-            sorted_rolls = np.sort(dice_rolls[start_idx : start_idx + num_rolls])  # type: ignore
-            results[i] = np.sum(sorted_rolls[:-drop] if drop > 0 else sorted_rolls)  # type: ignore
-
-            start_idx += num_rolls  # type: ignore
+    def generate(self, items: int) -> np.ndarray:
+        if isinstance(self.of, Scalar):
+            return self._reduce(_sorted_pools(self.dice, self.of.value, items))
 
-        return results
+        values, counts = _variable_pools(self.dice, self.of, items)
+        drop = np.clip(_generate_operand(self.drop, items), 0, counts)
+        return _keep_segments(values, counts, counts - drop, highest=False)
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True, eq=False)
 class DropLowest(BaseDice):
     dice: BaseDice
     drop: BaseDice = field(default_factory=lambda: Scalar(1))
@@ -176,17 +205,20 @@ class DropLowest(BaseDice):
 
     def __post_init__(self):
         if isinstance(self.dice, DiceMany):
-            self.of = self.dice.total
-            self.dice = self.dice.dice
+            object.__setattr__(self, "of", self.dice.total)
+            object.__setattr__(self, "dice", self.dice.dice)
         if isinstance(self.drop, int):
-            self.drop = Scalar(self.drop)
+            object.__setattr__(self, "drop", Scalar(self.drop))
 
     def histogram(self) -> H:
+        from dyce import H, P
+        from dyce.evaluation import expandable
+
         @expandable
-        def dh(dice: HResult, drop: HResult, of: HResult):
-            return (of.outcome @ P(dice.h)).h(slice(-drop.outcome, None))  # type: ignore
+        def dl(dice: HResult, drop: HResult, of: HResult):
+            return (of.outcome @ P(dice.h)).h(slice(max(0, drop.outcome), None)) or H({0: 1})  # type: ignore
 
-        return dh(self.dice.histogram(), self.drop.histogram(), self.of.histogram())
+        return dl(self.dice.histogram(), self.drop.histogram(), self.of.histogram())
 
     def __str__(self) -> str:
         drop = str(self.drop)
@@ -204,21 +236,14 @@ class DropLowest(BaseDice):
         # Adjusted to consider the effect of dropping the lowest possible rolls.
         return self.dice.min() * max(0, self.of.min() - self.drop.max())
 
-    def generate(self, items: int) -> np.ndarray:
-        of_rolls = self.of.generate(items)
-        drop_rolls = self.drop.generate(items)
-        dice_rolls = self.dice.generate(np.sum(of_rolls))
-
-        results = np.empty(items, dtype=np.int_)
+    def _reduce(self, pools: np.ndarray) -> np.ndarray:
+        drop = np.clip(_generate_operand(self.drop, len(pools)), 0, pools.shape[1])
+        return _sum_highest(pools, pools.shape[1] - drop)
 
-        start_idx = 0
-        for i in range(items):
-            num_rolls = of_rolls[i]  # type: ignore
-            drop = min(num_rolls, drop_rolls[i])  # type: ignore
-
-            sorted_rolls = np.sort(dice_rolls[start_idx : start_idx + num_rolls])  # type: ignore
-            results[i] = np.sum(sorted_rolls[drop:] if drop > 0 else sorted_rolls)  # type: ignore
-
-            start_idx += num_rolls  # type: ignore
+    def generate(self, items: int) -> np.ndarray:
+        if isinstance(self.of, Scalar):
+            return self._reduce(_sorted_pools(self.dice, self.of.value, items))
 
-        return results
+        values, counts = _variable_pools(self.dice, self.of, items)
+        drop = np.clip(_generate_operand(self.drop, items), 0, counts)
+        return _keep_segments(values, counts, counts - drop, highest=True)
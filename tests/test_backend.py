@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from dice_roller import d, rng
+from dice_roller.backend import NUMPY_KERNELS, kernels, use_backend
+from dice_roller.random import use_rng
+
+SEED = 20240501
+
+CASES = [
+    d(6).explode(explode_depth=20) >= rng(5, 7),
+    (d(6).explode(explode_depth=10) == 6).explode(explode_depth=5) >= 8,
+    d(6).explode(explode_depth=10) < 2,
+    d(20).reroll(reroll_limit=5) <= d(4),
+    (d(6).r == 1).reroll(reroll_limit=3) < 3,
+    d(4) @ d(6),
+    d(6) @ (d(6).explode(explode_depth=10) == 6),
+    (d(6) @ d(20)).kh(2),
+    (d(6) @ d(20)).kl(d(3)),
+    (d(6) @ d(20)).dh(),
+    (d(8) @ d(10)).dl(d(4)),
+]
+
+
+def _generate(dice, backend: str) -> np.ndarray:
+    with use_backend(backend), use_rng(SEED):
+        return np.asarray(dice.generate(10_000))
+
+
+@pytest.mark.parametrize("dice", CASES, ids=str)
+def test_numba_matches_numpy(dice):
+    pytest.importorskip("numba")
+    np.testing.assert_array_equal(_generate(dice, "numba"), _generate(dice, "numpy"))
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_kernels_match_reference(backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    with use_backend(backend):
+        backend_kernels = kernels()
+    random = np.random.default_rng(SEED)
+    counts = random.integers(0, 12, size=200)
+    values = random.integers(-50, 50, size=int(counts.sum()))
+    keep = np.minimum(random.integers(0, 12, size=200), counts)
+    segments = np.split(values, np.cumsum(counts)[:-1])
+
+    np.testing.assert_array_equal(backend_kernels.segment_sum(values, counts), [s.sum() for s in segments])
+    for highest in (True, False):
+        expected = [np.sort(s)[len(s) - k :].sum() if highest else np.sort(s)[:k].sum() for s, k in zip(segments, keep)]
+        np.testing.assert_array_equal(backend_kernels.segment_keep(values, counts, keep, highest), expected)
+
+    index = random.permutation(len(values))[: len(values) // 2]
+    updates = random.integers(-5, 5, size=len(index))
+    expected, actual = values.copy(), values.copy()
+    expected[index] += updates
+    backend_kernels.scatter_add(actual, index, updates)
+    np.testing.assert_array_equal(actual, expected)
+    expected[index] = updates
+    backend_kernels.scatter(actual, index, updates)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_numpy_backend_selected():
+    with use_backend("numpy"):
+        assert kernels() is NUMPY_KERNELS
@@ -0,0 +1,25 @@
+import pytest
+from dyce import H
+
+from dice_roller import DistributionCache, d
+from dice_roller.cache import Distribution
+
+
+def test_from_histogram_normalized():
+    distribution = Distribution.from_histogram((d(6) - 3).histogram())
+    assert distribution.offset == -2
+    assert distribution.probabilities.sum() == pytest.approx(1.0)
+
+
+def test_from_histogram_rejects_non_integer_outcomes():
+    with pytest.raises(ValueError, match="integer outcomes"):
+        Distribution.from_histogram(H({0.5: 1, 1: 1, 1.5: 1}))
+
+
+def test_cache_preloads_current_version_only(tmp_path):
+    old = DistributionCache(tmp_path, version="0.1")
+    old.distribution(d(6) + 1)
+    cache = DistributionCache(tmp_path, version="0.2")
+    assert cache.preload() == 0
+    assert cache.distribution(d(6) + 1).mean() == pytest.approx(4.5)
+    assert cache.preload() == 1
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from dice_roller import d
+from dice_roller.random import use_rng
+
+CASES = [
+    (4 @ d(6)).dl(),
+    (4 @ d(6)).dh(),
+    (4 @ d(6)).dl(2),
+    (3 @ d(6)).dh(3),
+    d(6) // 2,
+    (2 @ d(6)) // d(3),
+    (d(10) - 5) // 3,
+]
+
+
+@pytest.mark.parametrize("dice", CASES, ids=str)
+def test_mean_matches_histogram(dice):
+    assert dice.mean() == pytest.approx(float(dice.histogram().mean()))
+
+
+@pytest.mark.parametrize("dice", CASES, ids=str)
+def test_mean_matches_sampling(dice):
+    with use_rng(np.random.default_rng(1)):
+        samples = dice.generate(200_000)
+    assert samples.mean() == pytest.approx(dice.mean(), abs=5 * samples.std() / np.sqrt(len(samples)) + 1e-9)
+    assert samples.var() == pytest.approx(dice.variance(), rel=0.05, abs=1e-9)
@@ -0,0 +1,38 @@
+import pytest
+
+from dice_roller import d, parse
+from dice_roller.core import DiceMany, Scalar
+
+
+@pytest.mark.parametrize(
+    "notation, expected",
+    [
+        ("10d10x>=8", 10 @ (d(10).x >= 8)),
+        ("2d6x", 2 @ (d(6).x == 6)),
+        ("2d6!", 2 @ (d(6).x == 6)),
+        ("3d6r<3", 3 @ (d(6).r < 3)),
+        ("4d6r1kh3", (4 @ (d(6).r == 1)).kh(3)),
+        ("2d6r1x", 2 @ ((d(6).r == 1).x == 6)),
+        ("d6x", d(6).x == 6),
+        ("(2d6)x", (2 @ d(6)).x == 12),
+    ],
+)
+def test_tree(notation, expected):
+    assert parse(notation) == expected
+
+
+def test_per_dice_explode_mean():
+    dice = parse("10d10x>=8")
+    assert isinstance(dice, DiceMany) and dice.total == Scalar(10)
+    # Every d10 explodes with probability 0.3: 5.5 / (1 - 0.3) per dice
+    expected = 10 * 5.5 / 0.7
+    assert abs(dice.generate(200_000).mean() - expected) < 0.5
+
+
+def test_per_dice_reroll_mean():
+    dice = parse("4d6r1")
+    # One d6 rerolling ones once: the first roll is kept with 5/6 (mean 4), rerolled with 1/6 (mean 3.5)
+    expected = 4 * (5 / 6 * 4 + 1 / 6 * 3.5)
+    h = dice.histogram()
+    assert sum(outcome * count for outcome, count in h.items()) / h.total == pytest.approx(expected)
+    assert abs(dice.generate(200_000).mean() - expected) < 0.05
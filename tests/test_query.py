@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+
+import pytest
+from dyce import H
+
+from dice_roller import d
+from dice_roller.core import BaseDice
+from dice_roller.query import cdf, clear_cdf_cache, prob_ge
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class Opaque(BaseDice):
+    faces: tuple
+
+    def histogram(self) -> H:
+        return H(self.faces)
+
+    def max(self) -> int:
+        return max(self.faces)
+
+    def min(self) -> int:
+        return min(self.faces)
+
+    def __repr__(self) -> str:
+        return "Opaque"
+
+
+@pytest.fixture(autouse=True)
+def _clear():
+    clear_cdf_cache()
+    yield
+    clear_cdf_cache()
+
+
+def test_cdf_cached_by_structure():
+    assert cdf(d(6) + 1) is cdf(d(6) + 1)
+    assert prob_ge(d(6), 4) == pytest.approx(0.5)
+
+
+def test_cdf_same_repr_not_shared():
+    assert prob_ge(Opaque((1, 2)), 2) == pytest.approx(0.5)
+    assert prob_ge(Opaque((2, 3)), 2) == pytest.approx(1.0)
+
+
+def test_cdf_rejects_non_integer_outcomes():
+    with pytest.raises(ValueError, match="integer outcomes"):
+        prob_ge(Opaque((0.5, 1.5)), 1)
+
+
+def test_cdf_unhashable_tree_not_cached():
+    dice = Opaque([1, 2])
+    assert prob_ge(dice, 2) == pytest.approx(0.5)
+    assert cdf(dice) is not cdf(dice)
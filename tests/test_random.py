@@ -0,0 +1,33 @@
+import threading
+
+import numpy as np
+
+from dice_roller import d
+from dice_roller.random import Rng, use_rng
+
+
+def test_use_rng_is_thread_local():
+    default = Rng().rng
+    entered, release = threading.Event(), threading.Event()
+
+    def worker():
+        with use_rng(np.random.default_rng(0)):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    entered.wait(5)
+    try:
+        assert Rng().rng is default
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_use_rng_seed_repeats_rolls():
+    with use_rng(5):
+        first = d(20).generate(100)
+    with use_rng(5):
+        second = d(20).generate(100)
+    assert np.array_equal(first, second)
@@ -0,0 +1,38 @@
+import pytest
+
+from dice_roller import d, parse, prob_ge, tail_probability
+from dice_roller.reroll import RerollIfLessOrEq
+
+
+@pytest.mark.parametrize(
+    "dice, threshold",
+    [
+        (RerollIfLessOrEq(d(6), d(4), 3), 6),
+        (RerollIfLessOrEq(d(6), d(4)), 6),
+        (parse("d6r<3"), 6),
+        (d(6).explode(explode_depth=6) <= 2, 10),
+        (d(6).explode(explode_depth=6) < d(3), 8),
+        (d(6).explode(explode_depth=6) == 6, 20),
+        (parse("10d6"), 50),
+        (parse("4d6kh3") + (d(6).explode(explode_depth=6) == 6), 30),
+    ],
+    ids=str,
+)
+def test_matches_exact_probability(dice, threshold):
+    estimate = tail_probability(dice, threshold, seed=1)
+    exact = prob_ge(dice, threshold)
+    assert estimate.stderr > 0
+    assert abs(estimate.probability - exact) <= 5 * estimate.stderr
+
+
+def test_lower_tail():
+    dice = parse("10d6")
+    estimate = tail_probability(dice, 15, upper=False, seed=1)
+    exact = 1 - prob_ge(dice, 16)
+    assert abs(estimate.probability - exact) <= 5 * estimate.stderr
+
+
+def test_collapsed_effective_samples_warns():
+    with pytest.warns(RuntimeWarning, match="effective samples"):
+        estimate = tail_probability(d(6) + d(6), 12, theta=0.0, samples=20, seed=1)
+    assert (estimate.low, estimate.high) == (0.0, 1.0)